@@ -0,0 +1,33 @@
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main", "tableSummary"))
+
+from tableEncoder import encode_table
+from tokenBudget import estimate_tokens
+
+DEFAULT_SAMPLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "sample_origin_tables.json")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="统计紧凑编码相对原始表格JSON的字节与token缩减")
+    parser.add_argument("input", nargs="?", default=DEFAULT_SAMPLE, help="_origin_tables.json文件路径")
+    args = parser.parse_args()
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        tables = [t for t in json.load(f) if t.get('type') == 'table']
+
+    raw_bytes = raw_tokens = enc_bytes = enc_tokens = 0
+    for table in tables:
+        raw = json.dumps(table, ensure_ascii=False)
+        encoded = encode_table(table)
+        raw_bytes += len(raw.encode('utf-8'))
+        enc_bytes += len(encoded.encode('utf-8'))
+        raw_tokens += estimate_tokens(raw)
+        enc_tokens += estimate_tokens(encoded)
+
+    print(f"表格数: {len(tables)}")
+    print(f"字节: {raw_bytes} -> {enc_bytes} (减少 {1 - enc_bytes / max(raw_bytes, 1):.1%})")
+    print(f"估算token: {raw_tokens} -> {enc_tokens} (减少 {1 - enc_tokens / max(raw_tokens, 1):.1%})")
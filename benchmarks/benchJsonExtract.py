@@ -0,0 +1,100 @@
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main", "tableSummary"))
+
+from jsonExtract import extract_json_from_response
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "malformed_responses.json")
+
+_LEGACY_GREEDY = re.compile(r'{[\s\S]*}')
+
+
+def legacy_greedy_search(text):
+    """旧实现策略3的贪婪正则，用于对比耗时"""
+    return _LEGACY_GREEDY.search(text)
+
+
+def extract_or_none(text, field):
+    try:
+        return extract_json_from_response(text, field)
+    except ValueError:
+        return None
+
+
+def check_corpus():
+    """校验语料库中每条响应的提取结果，返回失败用例名列表"""
+    with open(CORPUS_PATH, 'r', encoding='utf-8') as f:
+        cases = json.load(f)
+    failures = [case["name"] for case in cases
+                if extract_or_none(case["response"], case["field"]) != case["expected"]]
+    print(f"语料库: {len(cases) - len(failures)}/{len(cases)} 通过" + (f"，失败: {failures}" if failures else ""))
+    return failures
+
+
+def fuzz(iterations, seed):
+    """随机包裹、截断和注入噪声，验证提取器只抛ValueError且能找回被包裹的对象"""
+    rng = random.Random(seed)
+    noise = ["好的，", "```json\n", "\n```", "}", "{", "]", "\"", "注：单位为千元。", "\n", "{'x': 1}"]
+    recovered = crashes = 0
+    for _ in range(iterations):
+        payload = {"summaries": {str(i): "摘要" * rng.randint(1, 20) + rng.choice(["{", "}", "\\\"", ""])
+                                 for i in range(rng.randint(1, 8))}}
+        body = json.dumps(payload, ensure_ascii=False)
+        prefix = "".join(rng.choice(noise) for _ in range(rng.randint(0, 3))).replace("{", "")
+        suffix = "".join(rng.choice(noise) for _ in range(rng.randint(0, 3)))
+        text = prefix + body + suffix
+        if rng.random() < 0.2:
+            text = text[:rng.randint(0, len(text))]
+        try:
+            result = extract_or_none(text, "summaries")
+        except Exception as e:
+            crashes += 1
+            print(f"异常 {type(e).__name__}: {text[:80]!r}")
+            continue
+        if result == payload["summaries"]:
+            recovered += 1
+    print(f"模糊测试: {iterations} 次，完整还原 {recovered} 次，非ValueError异常 {crashes} 次")
+    return crashes
+
+
+def benchmark(size):
+    """对比病态长输入上的耗时"""
+    cases = {
+        "大量未闭合括号": "{" * size,
+        "长文本+末尾对象": "分析" * size + json.dumps({"summary": "摘要"}, ensure_ascii=False),
+        "长合法对象": json.dumps({"summaries": {str(i): "摘要内容" * 10 for i in range(size // 40)}}, ensure_ascii=False),
+        "普通代码块响应": "```json\n" + json.dumps({"summary": "该表展示" * 50}, ensure_ascii=False) + "\n```",
+        "前后说明文字": "好的，结果如下：" + json.dumps({"summary": "该表展示" * 50}, ensure_ascii=False) + "\n以上。",
+        "深层嵌套数组": "[" * size,
+        "深层嵌套对象": '{"a":' * size,
+    }
+    for name, text in cases.items():
+        start_time = time.perf_counter()
+        extract_or_none(text, "summary")
+        new_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        legacy_greedy_search(text)
+        legacy_time = time.perf_counter() - start_time
+        print(f"{name:<12s} 长度={len(text):<8d} 新实现={new_time * 1000:8.2f}ms 旧贪婪正则={legacy_time * 1000:10.2f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="JSON提取器语料校验、模糊测试与性能对比")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--size", type=int, default=20000)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.CRITICAL)
+
+    failed = check_corpus()
+    crashes = fuzz(args.iterations, args.seed)
+    benchmark(args.size)
+    sys.exit(1 if failed or crashes else 0)
@@ -0,0 +1,256 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for sub_dir in ("common", "convertPDF", "tableSummary", "convertHTML"):
+    sys.path.insert(0, os.path.join(ROOT_DIR, "main", sub_dir))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stubServer import StubOpenAIServer
+from syntheticPdf import build_pdf
+from metrics import registry
+from extractTables import stream_extract_tables
+import getTitles
+import getSummaries
+from toMarkdown import json_to_markdown
+
+STAGES = ("process_pdf", "extract_tables", "titles", "summaries", "json_to_markdown")
+
+
+def pipeline_responder(messages):
+    """按prompt类型返回标题、单表摘要或批量摘要"""
+    content = messages[-1]["content"]
+    if match := re.search(r"请为以下(\d+)个财务表格生成唯一标题", content):
+        count = int(match.group(1))
+        return json.dumps({"titles": {str(i): f"合成财务表格标题{i}" for i in range(count)}}, ensure_ascii=False)
+    if match := re.search(r"分别分析以下(\d+)个", content):
+        count = int(match.group(1))
+        return json.dumps({"summaries": {str(i): "该表展示了合成测试摘要" for i in range(count)}}, ensure_ascii=False)
+    return json.dumps({"summary": "该表展示了合成测试摘要"}, ensure_ascii=False)
+
+
+def git_commit():
+    """当前仓库的提交哈希（含未提交修改时加"-dirty"），非git环境返回None"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                                check=True, capture_output=True, text=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT_DIR,
+                               check=True, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{commit}-dirty" if dirty else commit
+
+
+def peak_rss_mb():
+    # Linux上ru_maxrss单位为KB，macOS上为字节
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+
+def measure(results, name, func, unit):
+    """
+    执行单个阶段并记录耗时、吞吐量和内存
+
+    Args:
+        results (dict): 各阶段结果，按阶段名写入
+        name (str): 阶段名
+        func (callable): 无参函数，返回处理的条目数
+        unit (str): 条目单位（page/table）
+
+    Returns:
+        任意: func的返回值
+    """
+    tracemalloc.reset_peak()
+    start_time = time.perf_counter()
+    items = func()
+    seconds = time.perf_counter() - start_time
+    results[name] = {
+        "status": "ok",
+        "seconds": round(seconds, 4),
+        "items": items,
+        "unit": unit,
+        "throughput": round(items / seconds, 2) if seconds > 0 else None,
+        "peak_traced_mb": round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+    return items
+
+
+def run_benchmark(work_dir, pages, tables, rows, seed, use_mineru):
+    """
+    在work_dir中生成合成PDF并依次执行各阶段
+
+    Returns:
+        dict: 各阶段结果
+    """
+    pdf_path = os.path.join(work_dir, "synthetic.pdf")
+    pdf_bytes, synthetic_content = build_pdf(pages, tables, rows=rows, seed=seed)
+    with open(pdf_path, 'wb') as f:
+        f.write(pdf_bytes)
+
+    results = {}
+    content_list_path = os.path.join(work_dir, "synthetic_content_list.json")
+    mineru = None
+    if use_mineru:
+        try:
+            import useMinerU as mineru
+        except ImportError as e:
+            results["process_pdf"] = {"status": "skipped", "reason": f"MinerU不可用: {e}"}
+    else:
+        results["process_pdf"] = {"status": "skipped", "reason": "--no-mineru"}
+
+    if mineru is not None:
+        # 输出写入临时目录，避免污染Results
+        mineru.RESULTS_DIR = os.path.join(work_dir, "Results")
+
+        def parse():
+            output_dir = mineru.process_pdf(pdf_path)
+            os.replace(os.path.join(output_dir, "synthetic_content_list.json"), content_list_path)
+            return pages
+        measure(results, "process_pdf", parse, "page")
+    else:
+        # 未解析PDF时使用生成器给出的content_list作为后续阶段的输入
+        with open(content_list_path, 'w', encoding='utf-8') as f:
+            json.dump(synthetic_content, f, ensure_ascii=False)
+
+    origin_path = os.path.join(work_dir, "synthetic_origin_tables.json")
+    titles_path = os.path.join(work_dir, "synthetic_table_titles.json")
+    summaries_path = os.path.join(work_dir, "synthetic_table_summaries.json")
+    markdown_path = os.path.join(work_dir, "synthetic_表格.md")
+
+    measure(results, "extract_tables", lambda: stream_extract_tables(content_list_path, origin_path), "table")
+
+    def titles():
+        titled = getTitles.generate_table_summary(origin_path)
+        with open(titles_path, 'w', encoding='utf-8') as f:
+            json.dump({"tables": titled}, f, ensure_ascii=False, indent=2)
+        return len(titled)
+    measure(results, "titles", titles, "table")
+
+    def summaries():
+        summarized = getSummaries.generate_table_summary(titles_path)
+        with open(summaries_path, 'w', encoding='utf-8') as f:
+            json.dump({"tables": summarized}, f, ensure_ascii=False, indent=2)
+        return len(summarized)
+    measure(results, "summaries", summaries, "table")
+
+    def markdown():
+        json_to_markdown(summaries_path, markdown_path)
+        return tables
+    measure(results, "json_to_markdown", markdown, "table")
+    return results
+
+
+def compare(report, baseline, threshold):
+    """
+    与基线报告逐阶段对比耗时，打印变化并返回超过阈值的阶段
+
+    Args:
+        report (dict): 本次报告
+        baseline (dict): 基线报告
+        threshold (float): 允许的变慢百分比
+
+    Returns:
+        list: 变慢超过阈值的阶段名
+    """
+    regressions = []
+    print(f"对比基线 {baseline.get('commit')} -> {report.get('commit')}")
+    for name in STAGES:
+        current = report["stages"].get(name, {})
+        previous = baseline.get("stages", {}).get(name, {})
+        if current.get("status") != "ok" or previous.get("status") != "ok":
+            print(f"  {name:<18s} 跳过（缺少可对比的数据）")
+            continue
+        change = (current["seconds"] - previous["seconds"]) / previous["seconds"] * 100 if previous["seconds"] else 0.0
+        rss_change = current["peak_rss_mb"] - previous["peak_rss_mb"]
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  <-- 变慢"
+        print(f"  {name:<18s} {previous['seconds']:8.3f}s -> {current['seconds']:8.3f}s "
+              f"({change:+6.1f}%)  峰值RSS {rss_change:+7.1f}MB{flag}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="全流程基准测试：合成PDF + 本地桩服务器，输出JSON报告")
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--tables", type=int, default=40)
+    parser.add_argument("--rows", type=int, default=6, help="每个表格的数据行数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.2, help="桩服务器每次请求的延迟（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="桩服务器注入错误的比例")
+    parser.add_argument("--error-status", type=int, default=429)
+    parser.add_argument("--workers", type=int, default=8, help="api.max_workers")
+    parser.add_argument("--batch", action="store_true", help="摘要使用批量模式")
+    parser.add_argument("--no-mineru", action="store_true", help="跳过PDF解析，直接使用合成content_list")
+    parser.add_argument("-o", "--output", default=None, help="JSON报告路径，默认输出到标准输出")
+    parser.add_argument("--compare", default=None, help="基线JSON报告路径")
+    parser.add_argument("--threshold", type=float, default=10.0, help="--compare时允许的变慢百分比")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    tracemalloc.start()
+    registry.reset()
+    with StubOpenAIServer(latency=args.latency, responder=pipeline_responder,
+                          error_rate=args.error_rate, error_status=args.error_status) as server, \
+            tempfile.TemporaryDirectory() as work_dir:
+        with open(os.path.join(work_dir, "config.yaml"), 'w') as f:
+            f.write(
+                f"api:\n  key: stub\n  base_url: {server.base_url}\n  max_workers: {args.workers}\n"
+                f"  retry:\n    base_delay: 0.05\n    max_delay: 1.0\n"
+                f"summary:\n  batch_mode: {str(args.batch).lower()}\n"
+            )
+        cwd = os.getcwd()
+        os.chdir(work_dir)
+        try:
+            start_time = time.perf_counter()
+            stages = run_benchmark(work_dir, args.pages, args.tables, args.rows, args.seed,
+                                   use_mineru=not args.no_mineru)
+            wall_seconds = time.perf_counter() - start_time
+        finally:
+            os.chdir(cwd)
+        requests, errors = server.request_count, server.error_count
+    tracemalloc.stop()
+
+    report = {
+        "commit": git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {
+            "pages": args.pages, "tables": args.tables, "rows": args.rows, "seed": args.seed,
+            "latency": args.latency, "error_rate": args.error_rate, "workers": args.workers,
+            "batch": args.batch,
+        },
+        "wall_seconds": round(wall_seconds, 4),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "stages": stages,
+        "llm": registry.summary()["llm"],
+        "stub_server": {"requests": requests, "injected_errors": errors},
+    }
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print(f"以下阶段变慢超过{args.threshold}%: {', '.join(regressions)}")
+            sys.exit(1)
@@ -0,0 +1,50 @@
+import argparse
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main", "tableSummary"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stubServer import StubOpenAIServer
+from llmClient import CircuitBreaker, RateLimitedClient
+
+
+def run(client, requests, workers):
+    """并发发送请求，返回(成功数, 失败数, 耗时)"""
+    def send(_):
+        try:
+            client.create(model="stub", messages=[{"role": "user", "content": "测试"}])
+            return True
+        except Exception:
+            return False
+
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(send, range(requests)))
+    return results.count(True), results.count(False), time.time() - start_time
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="在注入错误的桩服务器上验证限流、重试与熔断")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--error-rate", type=float, default=0.3)
+    parser.add_argument("--error-status", type=int, default=429)
+    parser.add_argument("--retry-after", type=float, default=None)
+    parser.add_argument("--rpm", type=int, default=None)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    with StubOpenAIServer(latency=0.05, error_rate=args.error_rate, error_status=args.error_status,
+                          retry_after=args.retry_after) as server:
+        client = RateLimitedClient(
+            api_key="stub", base_url=server.base_url, rpm=args.rpm,
+            base_delay=0.05, max_delay=1.0,
+            breaker=CircuitBreaker(failure_threshold=20, reset_timeout=1.0)
+        )
+        success, failed, elapsed = run(client, args.requests, args.workers)
+        print(f"成功={success} 失败={failed} 重试={client.retry_count} "
+              f"服务端请求={server.request_count} 注入错误={server.error_count} 耗时={elapsed:.2f}s")
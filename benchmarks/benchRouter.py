@@ -0,0 +1,114 @@
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main", "tableSummary"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stubServer import StubOpenAIServer
+from modelRouter import ModelRouter
+
+SMALL_PROMPT = "项目|2024|2023\n" * 5
+LARGE_PROMPT = "项目|2024|2023|2022|变动\n" * 400
+
+
+def write_config(path, servers, args):
+    """生成路由配置：小表格走快速端点，大表格走大模型，均可转移到备用端点"""
+    fast, slow, backup = (server.base_url for server in servers)
+    with open(path, 'w') as f:
+        f.write(
+            f"api:\n  key: stub\n  base_url: {fast}\n"
+            f"  retry:\n    max_retries: 0\n"
+            f"  circuit_breaker:\n    failure_threshold: 1000\n"
+            f"router:\n"
+            f"  min_samples: 5\n  window: 20\n  max_error_rate: 0.3\n"
+            f"  max_latency: {args.max_latency}\n  probe_interval: {args.probe_interval}\n"
+            f"  endpoints:\n"
+            f"    slow: {{base_url: {slow}}}\n"
+            f"    backup: {{base_url: {backup}}}\n"
+            f"  routes:\n"
+            f"    summary:\n"
+            f"      - max_prompt_tokens: 500\n"
+            f"        models: [small-model, small-model@backup]\n"
+            f"      - models: [large-model@slow, large-model@backup]\n"
+        )
+
+
+def run_phase(router, requests, workers, prompt):
+    """并发发送请求，返回(成功数, 失败数, 耗时)"""
+    def send(_):
+        try:
+            router.create(task="summary", model="unused", messages=[{"role": "user", "content": prompt}])
+            return True
+        except Exception:
+            return False
+
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(send, range(requests)))
+    return results.count(True), results.count(False), time.time() - start_time
+
+
+def print_counts(phase, servers, before):
+    counts = [server.request_count - count for server, count in zip(servers, before)]
+    print(f"  {phase:<28s} fast={counts[0]:<4d} slow={counts[1]:<4d} backup={counts[2]:<4d}")
+    return [server.request_count for server in servers]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="在多个不同延迟的桩服务器上验证模型路由与故障转移")
+    parser.add_argument("--requests", type=int, default=40, help="每个阶段的请求数")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--fast-latency", type=float, default=0.02)
+    parser.add_argument("--slow-latency", type=float, default=0.3)
+    parser.add_argument("--backup-latency", type=float, default=0.1)
+    parser.add_argument("--max-latency", type=float, default=1.0, help="router.max_latency")
+    parser.add_argument("--probe-interval", type=float, default=0.5, help="router.probe_interval")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    servers = [
+        StubOpenAIServer(latency=args.fast_latency, error_status=503),
+        StubOpenAIServer(latency=args.slow_latency, error_status=503),
+        StubOpenAIServer(latency=args.backup_latency, error_status=503),
+    ]
+    for server in servers:
+        server.start()
+    try:
+        with tempfile.TemporaryDirectory() as work_dir:
+            config_path = os.path.join(work_dir, "config.yaml")
+            write_config(config_path, servers, args)
+            router = ModelRouter.from_config(config_path=config_path)
+
+            counts = [0, 0, 0]
+            print("请求分布：")
+            for phase, prompt in (("小表格", SMALL_PROMPT), ("大表格", LARGE_PROMPT)):
+                success, failed, elapsed = run_phase(router, args.requests, args.workers, prompt)
+                counts = print_counts(f"{phase} 成功={success} 失败={failed}", servers, counts)
+
+            # 快速端点全部返回503：应在min_samples次失败后降级，流量转到备用端点
+            servers[0].error_rate = 1.0
+            success, failed, elapsed = run_phase(router, args.requests, args.workers, SMALL_PROMPT)
+            counts = print_counts(f"快速端点故障 成功={success} 失败={failed}", servers, counts)
+
+            # 快速端点恢复：等待试探间隔后应重新承接流量
+            servers[0].error_rate = 0.0
+            time.sleep(args.probe_interval)
+            success, failed, elapsed = run_phase(router, args.requests, args.workers, SMALL_PROMPT)
+            counts = print_counts(f"快速端点恢复 成功={success} 失败={failed}", servers, counts)
+
+            # 慢速端点延迟超过max_latency：大表格转到备用端点
+            servers[1].latency = args.max_latency * 1.5
+            success, failed, elapsed = run_phase(router, args.requests, args.workers, LARGE_PROMPT)
+            counts = print_counts(f"慢速端点超时 成功={success} 失败={failed}", servers, counts)
+
+            print("路由状态：")
+            for candidate, stats in router.status().items():
+                print(f"  {candidate:<24s} {stats}")
+    finally:
+        for server in servers:
+            server.stop()
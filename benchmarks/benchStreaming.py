@@ -0,0 +1,74 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "main", "common"))
+sys.path.insert(0, os.path.join(ROOT_DIR, "main", "convertPDF"))
+
+from jsonStream import JsonArrayWriter
+
+
+def write_synthetic_content_list(path, items):
+    """流式生成合成content_list：大量文本条目，每20条夹一个表格"""
+    with JsonArrayWriter(path) as writer:
+        for i in range(items):
+            if i % 20 == 0:
+                writer.write({
+                    "type": "table",
+                    "img_path": f"images/{i:064x}.jpg",
+                    "table_caption": [f"表{i}"],
+                    "table_body": "<html><body><table>" + "<tr><td>收入</td><td>1,234</td></tr>" * 30 + "</table></body></html>",
+                    "table_footnote": [],
+                    "page_idx": i // 40,
+                })
+            else:
+                writer.write({"type": "text", "text": "本集团的主要业务为方便面及饮料的生产和销售。" * 10, "page_idx": i // 40})
+
+
+def run_extract(mode, input_path, output_path):
+    """在当前进程中执行提取，返回峰值RSS（MB）"""
+    if mode == "load":
+        from extractTables import extract_tables
+        with open(input_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(extract_tables(data), f, ensure_ascii=False, indent=4)
+    else:
+        from extractTables import stream_extract_tables
+        stream_extract_tables(input_path, output_path)
+    # Linux上ru_maxrss单位为KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="对比整体加载与流式提取的峰值内存")
+    parser.add_argument("--items", type=int, default=300000, help="合成content_list的条目数")
+    parser.add_argument("--mode", choices=["load", "stream"], help=argparse.SUPPRESS)
+    parser.add_argument("--input", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        # 子进程：执行单次测量
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            print(run_extract(args.mode, args.input, os.path.join(tmp_dir, "out.json")))
+        sys.exit(0)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        input_path = os.path.join(tmp_dir, "synthetic_content_list.json")
+        write_synthetic_content_list(input_path, args.items)
+        size_mb = os.path.getsize(input_path) / 1024 / 1024
+        print(f"合成content_list: {args.items} 条, {size_mb:.1f}MB")
+
+        for mode in ("load", "stream"):
+            start_time = time.time()
+            output = subprocess.run(
+                [sys.executable, __file__, "--mode", mode, "--input", input_path],
+                check=True, capture_output=True, text=True
+            ).stdout
+            print(f"{mode:<6s} 峰值RSS={float(output.strip()):8.1f}MB 耗时={time.time() - start_time:6.2f}s")
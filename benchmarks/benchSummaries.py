@@ -0,0 +1,78 @@
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main", "tableSummary"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stubServer import StubOpenAIServer
+import getSummaries
+
+
+def make_tables(count):
+    """生成指定数量的合成表格"""
+    return [
+        {
+            "type": "table",
+            "table_caption": [f"表{i + 1}"],
+            "table_body": f"<html><body><table><tr><td>项目</td><td>2024</td></tr><tr><td>收入</td><td>{i}</td></tr></table></body></html>",
+            "page_idx": i,
+        }
+        for i in range(count)
+    ]
+
+
+def batch_responder(messages):
+    """按prompt类型返回单表或批量摘要"""
+    content = messages[-1]["content"]
+    if match := re.search(r"分别分析以下(\d+)个", content):
+        count = int(match.group(1))
+        return json.dumps({"summaries": {str(i): "该表展示了测试摘要" for i in range(count)}}, ensure_ascii=False)
+    return json.dumps({"summary": "该表展示了测试摘要"}, ensure_ascii=False)
+
+
+def run(tables, workers, batch_mode=False):
+    """在临时目录中运行摘要生成并返回耗时"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        input_path = os.path.join(tmp_dir, "tables.json")
+        with open(input_path, 'w', encoding='utf-8') as f:
+            json.dump({"tables": tables}, f, ensure_ascii=False)
+
+        start_time = time.time()
+        result = getSummaries.generate_table_summary(input_path, max_workers=workers, batch_mode=batch_mode)
+        elapsed = time.time() - start_time
+
+    assert [t["page_idx"] for t in result] == list(range(len(tables))), "输出顺序与输入不一致"
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="摘要生成吞吐量基准测试")
+    parser.add_argument("--tables", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--batch", action="store_true", help="同时测量批量摘要模式")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    with StubOpenAIServer(latency=args.latency, responder=batch_responder) as server:
+        work_dir = tempfile.mkdtemp()
+        with open(os.path.join(work_dir, "config.yaml"), 'w') as f:
+            f.write(f"api:\n  key: stub\n  base_url: {server.base_url}\n")
+        os.chdir(work_dir)
+
+        tables = make_tables(args.tables)
+        baseline = None
+        for batch_mode in ([False, True] if args.batch else [False]):
+            for workers in args.workers:
+                requests_before = server.request_count
+                elapsed = run(tables, workers, batch_mode)
+                baseline = baseline or elapsed
+                print(f"batch={str(batch_mode):<5s} workers={workers:<3d} 耗时={elapsed:6.2f}s "
+                      f"请求数={server.request_count - requests_before:<4d} "
+                      f"吞吐={len(tables) / elapsed:6.2f} table/s 加速比={baseline / elapsed:5.2f}x")
@@ -0,0 +1,141 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def default_responder(messages):
+    """默认响应：返回固定的摘要JSON"""
+    return json.dumps({"summary": "该表展示了桩服务器生成的测试摘要"}, ensure_ascii=False)
+
+
+class StubOpenAIServer:
+    """
+    本地OpenAI兼容桩服务器，用于基准测试
+
+    Args:
+        latency (float): 每个请求的模拟延迟（秒）
+        responder (callable, optional): 根据messages生成响应文本的函数
+        host (str): 监听地址
+        port (int): 监听端口，0表示随机分配
+        error_rate (float): 注入错误的概率
+        error_status (int): 注入错误的HTTP状态码（如429/500/503）
+        retry_after (float, optional): 注入错误时返回的Retry-After秒数
+    """
+
+    def __init__(self, latency=0.5, responder=None, host="127.0.0.1", port=0,
+                 error_rate=0.0, error_status=429, retry_after=None):
+        self.latency = latency
+        self.responder = responder or default_responder
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.request_count = 0
+        self.error_count = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                with stub._lock:
+                    stub.request_count += 1
+                    inject_error = random.random() < stub.error_rate
+                    if inject_error:
+                        stub.error_count += 1
+                time.sleep(stub.latency)
+
+                if inject_error:
+                    self._send_error()
+                    return
+
+                messages = body.get("messages", [])
+                content = stub.responder(messages)
+                prompt_chars = sum(len(m.get("content", "")) for m in messages)
+                payload = {
+                    "id": f"stub-{stub.request_count}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "stub"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {
+                        "prompt_tokens": prompt_chars,
+                        "completion_tokens": len(content),
+                        "total_tokens": prompt_chars + len(content),
+                    },
+                }
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_error(self):
+                data = json.dumps({"error": {"message": "injected error", "type": "stub_error"}}).encode("utf-8")
+                self.send_response(stub.error_status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                if stub.retry_after is not None:
+                    self.send_header("Retry-After", str(stub.retry_after))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="启动本地OpenAI兼容桩服务器")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=429)
+    parser.add_argument("--retry-after", type=float, default=None)
+    args = parser.parse_args()
+
+    server = StubOpenAIServer(
+        latency=args.latency, port=args.port, error_rate=args.error_rate,
+        error_status=args.error_status, retry_after=args.retry_after
+    ).start()
+    print(f"桩服务器已启动: {server.base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,178 @@
+import hashlib
+import random
+import zlib
+
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+MARGIN = 50
+ROW_HEIGHT = 16
+MAX_TABLES_PER_PAGE = 5
+
+_ROW_LABELS = [
+    "Revenue", "Cost of sales", "Gross profit", "Other income", "Distribution costs",
+    "Administrative expenses", "Operating profit", "Finance costs", "Profit before tax",
+    "Income tax", "Profit for the year", "Segment revenue",
+]
+_TABLE_NAMES = [
+    "Consolidated statement of profit or loss", "Consolidated balance sheet",
+    "Consolidated cash flow statement", "Segment information", "Revenue by product line",
+]
+_PARAGRAPH = ("The Group is principally engaged in the manufacture and sale of instant noodles "
+              "and beverages. Revenue for the year was driven by volume growth and pricing.")
+
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _text(x, y, text, size=9):
+    return f"BT /F1 {size} Tf {x:.1f} {y:.1f} Td ({_escape(text)}) Tj ET"
+
+
+def _format_amount(value):
+    return f"({abs(value):,})" if value < 0 else f"{value:,}"
+
+
+def make_table(table_no, rng, rows=6, years=(2024, 2023, 2022)):
+    """生成单个合成表格：表题、行标签和带千分位/括号负数的金额"""
+    header = ["RMB'000"] + [str(year) for year in years]
+    body = []
+    for label in rng.sample(_ROW_LABELS, rows):
+        values = [rng.randint(-50000, 9000000) for _ in years]
+        body.append([label] + [_format_amount(value) for value in values])
+    return {
+        "caption": f"Table {table_no + 1}: {rng.choice(_TABLE_NAMES)}",
+        "rows": [header] + body,
+    }
+
+
+def _table_html(rows):
+    cells = "".join("<tr>" + "".join(f"<td>{cell}</td>" for cell in row) + "</tr>" for row in rows)
+    return f"<html><body><table>{cells}</table></body></html>"
+
+
+def _draw_table(table, top):
+    """绘制带网格线的表格，返回(绘制指令列表, 表格底部y坐标)"""
+    rows = table["rows"]
+    col_widths = [180] + [(PAGE_WIDTH - 2 * MARGIN - 180) / (len(rows[0]) - 1)] * (len(rows[0]) - 1)
+    ops = [_text(MARGIN, top, table["caption"], size=10)]
+    y = top - 8
+    bottom = y - ROW_HEIGHT * len(rows)
+    # 横线
+    for row_idx in range(len(rows) + 1):
+        line_y = y - row_idx * ROW_HEIGHT
+        ops.append(f"{MARGIN} {line_y:.1f} m {PAGE_WIDTH - MARGIN} {line_y:.1f} l S")
+    # 竖线
+    x = MARGIN
+    for width in col_widths + [0]:
+        ops.append(f"{x:.1f} {y:.1f} m {x:.1f} {bottom:.1f} l S")
+        x += width
+    # 单元格文字（数字右对齐近似）
+    for row_idx, row in enumerate(rows):
+        text_y = y - (row_idx + 1) * ROW_HEIGHT + 4
+        x = MARGIN
+        for col_idx, cell in enumerate(row):
+            offset = 4 if col_idx == 0 else col_widths[col_idx] - 4 - len(cell) * 4.6
+            ops.append(_text(x + offset, text_y, cell))
+            x += col_widths[col_idx]
+    return ops, bottom
+
+
+def build_pdf(pages, tables, rows=6, seed=0):
+    """
+    生成含指定页数和表格数的合成财报PDF（仅用标准库）
+
+    表格均匀分布在各页，带网格线和数字，可被pageSelect的表格预扫描识别；
+    没有表格的页面只有正文段落。同时返回与MinerU输出格式一致的content_list，
+    在未安装MinerU时可直接作为后续阶段的输入。
+
+    Args:
+        pages (int): 页数
+        tables (int): 表格总数
+        rows (int): 每个表格的数据行数（不超过12）
+        seed (int): 随机种子，相同参数生成相同文件
+
+    Returns:
+        tuple: (PDF字节串, content_list)
+    """
+    if tables > pages * MAX_TABLES_PER_PAGE:
+        raise ValueError(f"每页最多{MAX_TABLES_PER_PAGE}个表格，请增加页数")
+    rng = random.Random(seed)
+    per_page = [[] for _ in range(pages)]
+    for table_no in range(tables):
+        per_page[table_no * pages // tables].append(make_table(table_no, rng, rows=rows))
+
+    content_list = []
+    page_streams = []
+    for page_idx, page_tables in enumerate(per_page):
+        ops = ["0.5 w"]
+        top = PAGE_HEIGHT - MARGIN
+        paragraph = f"{_PARAGRAPH} (page {page_idx + 1})"
+        ops.append(_text(MARGIN, top, paragraph[:110]))
+        content_list.append({"type": "text", "text": paragraph, "page_idx": page_idx})
+        top -= 30
+        for table in page_tables:
+            table_ops, bottom = _draw_table(table, top)
+            ops.extend(table_ops)
+            top = bottom - 30
+            html = _table_html(table["rows"])
+            content_list.append({
+                "type": "table",
+                "img_path": f"images/{hashlib.sha256(html.encode('utf-8')).hexdigest()}.jpg",
+                "table_caption": [table["caption"]],
+                "table_footnote": [],
+                "table_body": html,
+                "page_idx": page_idx,
+            })
+        page_streams.append(zlib.compress("\n".join(ops).encode("latin-1")))
+
+    # 对象编号：1目录 2页面树 3字体，其后每页依次为页面对象和内容流
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        ("<< /Type /Pages /Kids [" + " ".join(f"{4 + 2 * i} 0 R" for i in range(pages))
+         + f"] /Count {pages} >>").encode("ascii"),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, stream in enumerate(page_streams):
+        objects.append((
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>"
+        ).encode("ascii"))
+        objects.append(
+            f"<< /Length {len(stream)} /Filter /FlateDecode >>\nstream\n".encode("ascii") + stream + b"\nendstream"
+        )
+
+    output = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n".encode("ascii") + body + b"\nendobj\n"
+    xref_offset = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("ascii")
+    for offset in offsets:
+        output += f"{offset:010d} 00000 n \n".encode("ascii")
+    output += (f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+               f"startxref\n{xref_offset}\n%%EOF\n").encode("ascii")
+    return bytes(output), content_list
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="生成合成财报PDF")
+    parser.add_argument("output", help="输出PDF路径")
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--tables", type=int, default=30)
+    parser.add_argument("--rows", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--content-list", default=None, help="同时写出对应的content_list.json")
+    args = parser.parse_args()
+
+    pdf_bytes, synthetic_content = build_pdf(args.pages, args.tables, rows=args.rows, seed=args.seed)
+    with open(args.output, 'wb') as f:
+        f.write(pdf_bytes)
+    if args.content_list:
+        with open(args.content_list, 'w', encoding='utf-8') as f:
+            json.dump(synthetic_content, f, ensure_ascii=False, indent=4)
+    print(f"已生成 {args.output}：{args.pages}页，{args.tables}个表格，{len(pdf_bytes)}字节")
@@ -0,0 +1,99 @@
+import re
+from html.parser import HTMLParser
+
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def collapse_whitespace(text):
+    """合并连续空白为单个空格并去除首尾空白"""
+    return _WHITESPACE_PATTERN.sub(' ', text).strip()
+
+
+class _TableHTMLParser(HTMLParser):
+    """收集<tr>/<td>/<th>结构及单元格的rowspan/colspan"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows = []  # 每行为[(text, rowspan, colspan), ...]
+        self._row = None
+        self._cell = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'tr':
+            self._row = []
+        elif tag in ('td', 'th') and self._row is not None:
+            attrs = dict(attrs)
+            self._cell = {
+                "text": [],
+                "rowspan": _span_value(attrs.get('rowspan')),
+                "colspan": _span_value(attrs.get('colspan')),
+            }
+        elif tag == 'br' and self._cell is not None:
+            self._cell["text"].append(' ')
+
+    def handle_endtag(self, tag):
+        if tag in ('td', 'th') and self._cell is not None:
+            text = collapse_whitespace(''.join(self._cell["text"]))
+            self._row.append((text, self._cell["rowspan"], self._cell["colspan"]))
+            self._cell = None
+        elif tag == 'tr' and self._row is not None:
+            self.rows.append(self._row)
+            self._row = None
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell["text"].append(data)
+
+
+def _span_value(value):
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        return 1
+
+
+def parse_table_html(html, fill_spans=True):
+    """
+    将MinerU输出的HTML表格解析为二维单元格网格，展开rowspan/colspan
+
+    Args:
+        html (str): table_body中的HTML字符串
+        fill_spans (bool): 为True时合并单元格覆盖的位置复制原值，否则留空
+
+    Returns:
+        list: 行列表，每行为等长的字符串列表
+    """
+    parser = _TableHTMLParser()
+    parser.feed(html or "")
+    parser.close()
+
+    grid = []
+    pending = {}  # (row, col) -> 被上方rowspan占用的文本
+    for row_idx, cells in enumerate(parser.rows):
+        row = []
+        col_idx = 0
+        cell_iter = iter(cells)
+        while True:
+            if (row_idx, col_idx) in pending:
+                row.append(pending.pop((row_idx, col_idx)))
+                col_idx += 1
+                continue
+            cell = next(cell_iter, None)
+            if cell is None:
+                break
+            text, rowspan, colspan = cell
+            filler = text if fill_spans else ""
+            for span_col in range(colspan):
+                row.append(text if span_col == 0 else filler)
+                for span_row in range(1, rowspan):
+                    pending[(row_idx + span_row, col_idx + span_col)] = filler
+            col_idx += colspan
+        # 行尾仍被上方rowspan占用的位置
+        while (row_idx, col_idx) in pending:
+            row.append(pending.pop((row_idx, col_idx)))
+            col_idx += 1
+        grid.append(row)
+
+    # 补齐为矩形网格
+    width = max((len(row) for row in grid), default=0)
+    return [row + [""] * (width - len(row)) for row in grid]
@@ -0,0 +1,215 @@
+import json
+import os
+
+try:
+    import ijson  # 可选依赖，安装后使用其C后端解析
+except ImportError:
+    ijson = None
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = ' \t\r\n'
+# 合法JSON中一个值之后可能出现的字符
+_VALUE_TERMINATORS = _WHITESPACE + ',:]}'
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+
+class _StreamBuffer:
+    """按块读取文本文件的缓冲区，已消费部分会被及时丢弃"""
+
+    def __init__(self, file, chunk_size):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, min_chars=0):
+        """
+        读取下一块，返回是否读到新数据
+
+        Args:
+            min_chars (int): 持续读取直到未消费部分至少有这么多字符或文件结束，各块只拼接一次
+        """
+        if self.eof:
+            return False
+        chunks = [self.text[self.pos:]]
+        size = len(chunks[0])
+        while True:
+            chunk = self.file.read(self.chunk_size)
+            if not chunk:
+                self.eof = True
+                break
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= min_chars:
+                break
+        if len(chunks) == 1:
+            return False
+        # 丢弃已消费的部分，保持内存占用与单个条目大小相当
+        self.text = "".join(chunks)
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """跳过空白并返回下一个非空白字符，文件结束返回空字符串"""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"JSON流格式错误：期望 {char!r}，位置 {self.pos}")
+        self.pos += 1
+
+    def decode(self):
+        """
+        解析下一个完整的JSON值，数据不足时继续读取
+
+        解析失败或结果可能不完整时，先把当前值起点之后的缓冲读到已尝试长度的两倍再重试，
+        一个值跨越很多块时重复解析的总量与值的大小成线性关系，而不是每读一块都从头解析。
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.text, self.pos)
+                # 数值可能被块边界截断（如"1.5"只读到"1"或"1."），其后必须是值的结束符或已到文件末尾
+                if self.eof or (end < len(self.text) and self.text[end] in _VALUE_TERMINATORS):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # 记录已尝试解析的长度，读到其两倍后再重试；文件结束时下一轮按最终数据解析或报错
+            self.fill(min_chars=2 * (len(self.text) - self.pos))
+
+
+def _iter_array(buffer):
+    buffer.expect('[')
+    if buffer.peek() == ']':
+        buffer.pos += 1
+        return
+    while True:
+        yield buffer.decode()
+        char = buffer.peek()
+        buffer.pos += 1
+        if char == ']':
+            return
+        if char != ',':
+            raise ValueError(f"JSON流格式错误：数组元素后出现 {char!r}")
+
+
+def _seek_key(buffer, key):
+    """在顶层对象中定位到指定键的值起始处，跳过之前的键值对"""
+    buffer.expect('{')
+    while buffer.peek() not in ('}', ''):
+        name = buffer.decode()
+        buffer.expect(':')
+        if name == key:
+            return True
+        buffer.decode()
+        if buffer.peek() == ',':
+            buffer.pos += 1
+    return False
+
+
+def iter_json_array(path, key=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    增量读取JSON数组，逐个产出元素而不加载整个文件
+
+    Args:
+        path (str): JSON文件路径
+        key (str, optional): 顶层为对象时数组所在的键（如 "tables"）
+        chunk_size (int): 每次读取的字符数
+
+    Yields:
+        数组中的每个元素
+    """
+    if ijson is not None:
+        with open(path, 'rb') as f:
+            yield from ijson.items(f, f"{key}.item" if key else "item", use_float=True)
+        return
+
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = _StreamBuffer(f, chunk_size)
+        if key is not None and not _seek_key(buffer, key):
+            return
+        yield from _iter_array(buffer)
+
+
+class JsonArrayWriter:
+    """
+    增量写出JSON数组，可选包裹为 {key: [...]} 形式
+
+    先写入同目录下的临时文件，正常结束时才补全结尾并替换目标文件；
+    写出过程中出现异常时丢弃临时文件，不会留下看似完整的截断结果。
+
+    Args:
+        path (str): 输出文件路径
+        key (str, optional): 外层对象的键，为空时直接写出数组
+    """
+
+    def __init__(self, path, key=None):
+        self.path = path
+        self.key = key
+        self.count = 0
+        self._file = None
+
+    def __enter__(self):
+        self._tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        self._file = open(self._tmp_path, 'w', encoding='utf-8')
+        self._file.write(f'{{{json.dumps(self.key, ensure_ascii=False)}: [' if self.key else '[')
+        return self
+
+    def write(self, item):
+        if self.count:
+            self._file.write(',\n')
+        else:
+            self._file.write('\n')
+        self._file.write(json.dumps(item, ensure_ascii=False))
+        self.count += 1
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self._file.close()
+            os.remove(self._tmp_path)
+            return
+        self._file.write('\n]}' if self.key else '\n]')
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+
+class JsonlWriter:
+    """逐行追加写出JSON记录，每条记录写入后立即刷新"""
+
+    def __init__(self, path, mode='a'):
+        self._file = open(path, mode, encoding='utf-8')
+
+    def write(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def iter_jsonl(path):
+    """逐行读取JSONL记录，跳过空行和中断时残留的不完整行"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
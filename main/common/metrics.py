@@ -0,0 +1,254 @@
+import datetime
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+PROMETHEUS_PREFIX = "tablesnap"
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _prometheus_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in sorted(labels.items())) + "}"
+
+
+class Metrics:
+    """
+    线程安全的运行指标收集器：阶段耗时（span）、PDF页面解析路线和LLM调用
+
+    span按名称聚合次数/总耗时/最大耗时，并保留每次调用的明细；页面按解析路线
+    聚合页数和耗时；LLM调用按模型聚合次数、失败数、重试数、token用量和延迟分位数。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self.spans = []
+            self.pages = []
+            self.llm_calls = []
+
+    @contextmanager
+    def span(self, name, **labels):
+        """
+        记录代码块耗时，异常时同样记录并标记error
+
+        Args:
+            name (str): 阶段名，如"mineru.doc_analyze"
+            **labels: 附加标签（如文件名、页数）
+        """
+        start_time = time.perf_counter()
+        started_at = time.time()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            record = {
+                "name": name,
+                "seconds": round(time.perf_counter() - start_time, 6),
+                "started_at": round(started_at, 3),
+                "labels": labels,
+            }
+            if error:
+                record["error"] = error
+            with self._lock:
+                self.spans.append(record)
+
+    def record_page(self, page_idx, route, seconds, **fields):
+        """
+        记录单页的解析路线与耗时
+
+        Args:
+            page_idx (int): 原文档页索引（0开始）
+            route (str): 解析路线，"txt"或"ocr"
+            seconds (float): 该页耗时
+            **fields: 附加字段（如文字层字符数）
+        """
+        with self._lock:
+            self.pages.append({"page_idx": page_idx, "route": route, "seconds": round(seconds, 6), **fields})
+
+    def record_llm_call(self, model, seconds, prompt_tokens=0, completion_tokens=0, status="ok", retries=0):
+        """
+        记录一次LLM请求（含重试在内的完整耗时）
+
+        Args:
+            model (str): 模型名
+            seconds (float): 耗时
+            prompt_tokens (int): 输入token数（响应usage中的实际值）
+            completion_tokens (int): 输出token数
+            status (str): "ok"或异常类型名
+            retries (int): 本次请求的重试次数
+        """
+        with self._lock:
+            self.llm_calls.append({
+                "model": model or "",
+                "seconds": seconds,
+                "prompt_tokens": prompt_tokens or 0,
+                "completion_tokens": completion_tokens or 0,
+                "status": status,
+                "retries": retries,
+            })
+
+    def summary(self, prices=None):
+        """
+        汇总当前指标
+
+        Args:
+            prices (dict, optional): 模型单价 {model: {"prompt": 元/千token, "completion": 元/千token}}，
+                提供时计算费用估算
+
+        Returns:
+            dict: 可JSON序列化的汇总结果
+        """
+        with self._lock:
+            spans = list(self.spans)
+            pages = list(self.pages)
+            llm_calls = list(self.llm_calls)
+
+        span_summary = {}
+        for record in spans:
+            item = span_summary.setdefault(record["name"], {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+            item["count"] += 1
+            item["total_seconds"] += record["seconds"]
+            item["max_seconds"] = max(item["max_seconds"], record["seconds"])
+            if record.get("error"):
+                item["errors"] = item.get("errors", 0) + 1
+        for item in span_summary.values():
+            item["total_seconds"] = round(item["total_seconds"], 3)
+
+        page_summary = {}
+        for record in pages:
+            item = page_summary.setdefault(record["route"], {"pages": 0, "total_seconds": 0.0})
+            item["pages"] += 1
+            item["total_seconds"] += record["seconds"]
+        for item in page_summary.values():
+            item["total_seconds"] = round(item["total_seconds"], 3)
+
+        llm_summary = {}
+        latencies = {}
+        for call in llm_calls:
+            item = llm_summary.setdefault(call["model"], {
+                "calls": 0, "errors": 0, "retries": 0,
+                "prompt_tokens": 0, "completion_tokens": 0, "total_seconds": 0.0,
+            })
+            item["calls"] += 1
+            item["errors"] += call["status"] != "ok"
+            item["retries"] += call["retries"]
+            item["prompt_tokens"] += call["prompt_tokens"]
+            item["completion_tokens"] += call["completion_tokens"]
+            item["total_seconds"] += call["seconds"]
+            latencies.setdefault(call["model"], []).append(call["seconds"])
+        for model, item in llm_summary.items():
+            item["total_seconds"] = round(item["total_seconds"], 3)
+            item["p50_seconds"] = round(_percentile(latencies[model], 0.5), 3)
+            item["p95_seconds"] = round(_percentile(latencies[model], 0.95), 3)
+            if prices and model in prices:
+                price = prices[model]
+                item["estimated_cost"] = round(
+                    item["prompt_tokens"] / 1000 * price.get("prompt", 0)
+                    + item["completion_tokens"] / 1000 * price.get("completion", 0), 4
+                )
+
+        return {
+            "started_at": datetime.datetime.fromtimestamp(self.started_at).isoformat(timespec="seconds"),
+            "wall_seconds": round(time.time() - self.started_at, 3),
+            "spans": span_summary,
+            "pages": page_summary,
+            "llm": llm_summary,
+        }
+
+    def write_report(self, path, prices=None, **extra):
+        """
+        写出JSON运行报告（汇总 + 每个span和每页的明细）
+
+        Args:
+            path (str): 报告路径
+            prices (dict, optional): 模型单价，见summary
+            **extra: 附加到报告顶层的字段（如pdf路径、表格数）
+        """
+        report = self.summary(prices)
+        report.update(extra)
+        with self._lock:
+            report["span_events"] = list(self.spans)
+            report["page_events"] = sorted(self.pages, key=lambda record: record["page_idx"])
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        return path
+
+    def write_prometheus(self, path, **labels):
+        """
+        以Prometheus文本格式写出指标（供node_exporter textfile collector采集）
+
+        先写临时文件再原子替换，避免采集到写了一半的文件。
+
+        Args:
+            path (str): 输出路径，通常以.prom结尾
+            **labels: 附加到每个指标的标签（如document）
+        """
+        summary = self.summary()
+        prefix = PROMETHEUS_PREFIX
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for sample_labels, value in samples:
+                lines.append(f"{prefix}_{name}{_prometheus_labels({**labels, **sample_labels})} {value}")
+
+        spans = summary["spans"]
+        metric("span_seconds_total", "counter", "Total seconds spent per stage",
+               [({"span": name}, item["total_seconds"]) for name, item in spans.items()])
+        metric("span_count_total", "counter", "Number of times each stage ran",
+               [({"span": name}, item["count"]) for name, item in spans.items()])
+
+        pages = summary["pages"]
+        metric("pages_total", "counter", "PDF pages parsed per route",
+               [({"route": route}, item["pages"]) for route, item in pages.items()])
+        metric("page_seconds_total", "counter", "Seconds spent parsing pages per route",
+               [({"route": route}, item["total_seconds"]) for route, item in pages.items()])
+
+        llm = summary["llm"]
+        metric("llm_requests_total", "counter", "LLM requests per model",
+               [({"model": model}, item["calls"]) for model, item in llm.items()])
+        metric("llm_errors_total", "counter", "Failed LLM requests per model",
+               [({"model": model}, item["errors"]) for model, item in llm.items()])
+        metric("llm_retries_total", "counter", "LLM request retries per model",
+               [({"model": model}, item["retries"]) for model, item in llm.items()])
+        metric("llm_tokens_total", "counter", "LLM tokens per model and direction",
+               [({"model": model, "type": kind}, item[f"{kind}_tokens"])
+                for model, item in llm.items() for kind in ("prompt", "completion")])
+        metric("llm_latency_seconds", "gauge", "LLM request latency quantiles per model",
+               [({"model": model, "quantile": q}, item[f"p{int(float(q) * 100)}_seconds"])
+                for model, item in llm.items() for q in ("0.5", "0.95")])
+        metric("run_wall_seconds", "gauge", "Wall time of the run", [({}, summary["wall_seconds"])])
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, path)
+        return path
+
+
+# 进程内共享的默认收集器
+registry = Metrics()
+span = registry.span
+record_llm_call = registry.record_llm_call
@@ -0,0 +1,274 @@
+import re
+
+from htmlTable import collapse_whitespace, parse_table_html
+
+# 单元格内的中文数量单位及百分号
+_UNIT_MULTIPLIERS = {
+    "千": 1e3,
+    "万": 1e4,
+    "百万": 1e6,
+    "千万": 1e7,
+    "亿": 1e8,
+    "十亿": 1e9,
+    "%": 1e-2,
+    "％": 1e-2,
+}
+
+# 括号负数、正负号、货币符号、千分位、单位；千分位和空白在匹配前统一去除
+_NUMBER_REGEX = (
+    r'^(?P<open>[(（])?(?P<sign>[-+−–])?(?:[¥￥$]|HK\$|RMB)?'
+    r'(?P<digits>\d+(?:\.\d+)?|\.\d+)(?P<unit>百万|千万|十亿|千|万|亿|%|％)?(?P<close>[)）])?$'
+)
+_SEPARATOR_REGEX = r'[,，\s]'
+
+# 表头或表题中的金额单位，如"人民币千元"、"单位：百万元"
+_TABLE_UNIT_PATTERN = re.compile(r'(百万|千万|十亿|千|万|亿)(?:元|美元|港元|港币)')
+_YEAR_PATTERN = re.compile(r'((?:19|20)\d{2})')
+_YEAR_HEADER_PATTERN = re.compile(r'^(?:19|20)\d{2}(?:年度?)?$')
+
+MAX_HEADER_ROWS = 3
+
+
+def _require_numpy_pandas():
+    """按需导入numpy/pandas，未安装时给出明确提示"""
+    try:
+        import numpy as np
+        import pandas as pd
+    except ImportError as e:
+        raise ImportError("解析表格数值需要numpy和pandas：pip install numpy pandas") from e
+    return np, pd
+
+
+def parse_numbers(cells):
+    """
+    将单元格文本批量转换为数值，整列一次完成（pandas向量化字符串操作）
+
+    支持千分位（1,234）、括号负数（(12)）、正负号、货币符号、百分号（转换为小数）
+    及千/万/百万/亿等单位；无法识别的文本（含"—"等占位符）返回NaN。
+
+    Args:
+        cells (list): 单元格文本列表
+
+    Returns:
+        numpy.ndarray: 与输入等长的float数组
+    """
+    np, pd = _require_numpy_pandas()
+    series = pd.Series(list(cells), dtype=object).fillna("").astype(str)
+    parts = series.str.replace(_SEPARATOR_REGEX, '', regex=True).str.extract(_NUMBER_REGEX)
+
+    digits = pd.to_numeric(parts["digits"], errors="coerce").to_numpy(dtype=float)
+    multiplier = parts["unit"].map(_UNIT_MULTIPLIERS).fillna(1.0).to_numpy(dtype=float)
+    has_open = parts["open"].notna().to_numpy()
+    has_close = parts["close"].notna().to_numpy()
+    negative = has_open | parts["sign"].isin(["-", "−", "–"]).to_numpy()
+
+    values = digits * multiplier * np.where(negative, -1.0, 1.0)
+    # 括号不成对视为无效数值
+    values[has_open != has_close] = np.nan
+    return values
+
+
+class ParsedTable:
+    """
+    MinerU表格的结构化表示：展开合并单元格后的文本网格及对应的数值矩阵
+
+    数值矩阵在首次访问时由parse_numbers一次性计算，下游可直接做计算而无需
+    重新解析HTML。
+
+    Args:
+        grid (list): 行列表，每行为等长的字符串列表
+        caption (str): 表格标题，用于识别金额单位
+    """
+
+    def __init__(self, grid, caption=""):
+        self.grid = grid
+        self.caption = caption
+        self._values = None
+        self._header_rows = None
+
+    @classmethod
+    def from_html(cls, html, caption=""):
+        return cls(parse_table_html(html), caption=caption)
+
+    @classmethod
+    def from_table(cls, table):
+        """从MinerU表格字典创建"""
+        captions = table.get("table_caption") or []
+        return cls.from_html(table.get("table_body", ""), caption=" ".join(captions))
+
+    @property
+    def shape(self):
+        return len(self.grid), len(self.grid[0]) if self.grid else 0
+
+    @property
+    def values(self):
+        """与grid同形的float矩阵，非数值单元格为NaN"""
+        if self._values is None:
+            np, _ = _require_numpy_pandas()
+            rows, cols = self.shape
+            flat = [cell for row in self.grid for cell in row]
+            self._values = parse_numbers(flat).reshape(rows, cols) if flat else np.empty((rows, cols))
+        return self._values
+
+    @property
+    def header_rows(self):
+        """表头行数：开头不含数值（年份除外）的连续行，最多MAX_HEADER_ROWS行"""
+        if self._header_rows is None:
+            count = 0
+            for row_idx, row in enumerate(self.grid[:MAX_HEADER_ROWS]):
+                numeric = [
+                    not _YEAR_HEADER_PATTERN.match(cell)
+                    for col_idx, cell in enumerate(row[1:], start=1)
+                    if cell and self.values[row_idx, col_idx] == self.values[row_idx, col_idx]
+                ]
+                if any(numeric):
+                    break
+                count += 1
+            self._header_rows = count if count < len(self.grid) else 0
+        return self._header_rows
+
+    @property
+    def columns(self):
+        """各列的表头文本，多行表头以"/"连接并去重"""
+        columns = []
+        for col_idx in range(self.shape[1]):
+            parts = []
+            for row in self.grid[:self.header_rows]:
+                if row[col_idx] and row[col_idx] not in parts:
+                    parts.append(row[col_idx])
+            columns.append("/".join(parts))
+        return columns
+
+    @property
+    def labels(self):
+        """表体各行的行标签（首列文本）"""
+        return [collapse_whitespace(row[0]) if row else "" for row in self.grid[self.header_rows:]]
+
+    @property
+    def scale(self):
+        """表头或表题声明的金额单位倍数（如"人民币千元"为1000），未声明为1"""
+        header_text = " ".join([self.caption] + [cell for row in self.grid[:self.header_rows] for cell in row])
+        match = _TABLE_UNIT_PATTERN.search(header_text)
+        return _UNIT_MULTIPLIERS[match.group(1)] if match else 1.0
+
+    def to_dataframe(self, scaled=False):
+        """
+        表体数值转换为DataFrame，行索引为行标签，列为表头（不含首列）
+
+        Args:
+            scaled (bool): 是否乘以表格声明的金额单位
+
+        Returns:
+            pandas.DataFrame: 数值表，非数值单元格为NaN
+        """
+        _, pd = _require_numpy_pandas()
+        body = self.values[self.header_rows:, 1:]
+        if scaled:
+            body = body * self.scale
+        return pd.DataFrame(body, index=self.labels, columns=self.columns[1:])
+
+    def year_pairs(self):
+        """
+        找出最新年度与上一年度对应的列对
+
+        列表头去掉年份后的其余部分（如业务板块）相同才配对。
+
+        Returns:
+            list: [(本期列, 上期列, 本期年份, 上期年份), ...]
+        """
+        years = {}
+        for col_idx, header in enumerate(self.columns):
+            if col_idx == 0 or not (match := _YEAR_PATTERN.search(header)):
+                continue
+            key = header.replace(match.group(1), "", 1)
+            years.setdefault(key, []).append((int(match.group(1)), col_idx))
+
+        pairs = []
+        for candidates in years.values():
+            by_year = {}
+            for year, col_idx in candidates:
+                by_year.setdefault(year, col_idx)
+            latest = max(by_year)
+            if latest - 1 in by_year:
+                pairs.append((by_year[latest], by_year[latest - 1], latest, latest - 1))
+        return pairs
+
+    def _segment_label(self, col_idx):
+        """列表头中区分业务板块的部分：去掉年份及所有年份列共有的表头"""
+        year_columns = [header.split("/") for header in self.columns[1:] if _YEAR_PATTERN.search(header)]
+        common = set.intersection(*map(set, year_columns)) if year_columns else set()
+        return "/".join(
+            part for part in self.columns[col_idx].split("/")
+            if part not in common and not _YEAR_PATTERN.search(part)
+        )
+
+    def key_metrics(self, limit=None):
+        """
+        计算最新年度相对上年的同比变化
+
+        Args:
+            limit (int, optional): 最多返回的指标数
+
+        Returns:
+            list: 每项为 {"item", "column", "current_year", "previous_year", "current", "previous",
+                "change", "change_pct", "percent"}，
+                change_pct为相对变化（小数），上期为0时为None；percent表示该行为百分比数值
+        """
+        np, _ = _require_numpy_pandas()
+        metrics = []
+        body = self.values[self.header_rows:]
+        percent_rows = [
+            any(cell.endswith(("%", "％")) for cell in row[1:])
+            for row in self.grid[self.header_rows:]
+        ]
+        for current_col, previous_col, current_year, previous_year in self.year_pairs():
+            current = body[:, current_col]
+            previous = body[:, previous_col]
+            change = current - previous
+            with np.errstate(divide="ignore", invalid="ignore"):
+                change_pct = np.where(previous != 0, change / np.abs(previous), np.nan)
+            column = self._segment_label(current_col)
+            for row_idx in np.flatnonzero(~np.isnan(change)):
+                metrics.append({
+                    "item": self.labels[row_idx],
+                    "column": column,
+                    "current_year": current_year,
+                    "previous_year": previous_year,
+                    "current": float(current[row_idx]),
+                    "previous": float(previous[row_idx]),
+                    "change": float(change[row_idx]),
+                    "change_pct": None if np.isnan(change_pct[row_idx]) else float(change_pct[row_idx]),
+                    "percent": percent_rows[row_idx],
+                })
+        return metrics[:limit] if limit else metrics
+
+
+def _format_number(value):
+    value = value or 0.0  # 避免输出"-0"
+    return f"{value:,.0f}" if float(value).is_integer() else f"{value:,.2f}"
+
+
+def format_key_metrics(metrics):
+    """
+    将key_metrics结果格式化为紧凑文本，每个指标一行
+
+    Args:
+        metrics (list): ParsedTable.key_metrics的返回值
+
+    Returns:
+        str: 如"收入：2024年 6,136,241，2023年 8,514,358，同比-27.93%"
+    """
+    lines = []
+    for metric in metrics:
+        name = "/".join(part for part in (metric["column"], metric["item"]) if part)
+        if metric["percent"]:
+            current = f"{metric['current'] * 100:.2f}%"
+            previous = f"{metric['previous'] * 100:.2f}%"
+            change = f"{metric['change'] * 100:+.2f}个百分点"
+        else:
+            current = _format_number(metric["current"])
+            previous = _format_number(metric["previous"])
+            change = "无法计算" if metric["change_pct"] is None else f"{metric['change_pct'] * 100:+.2f}%"
+        lines.append(f"{name}：{metric['current_year']}年 {current}，"
+                     f"{metric['previous_year']}年 {previous}，同比{change}")
+    return "\n".join(lines)
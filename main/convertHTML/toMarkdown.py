@@ -1,54 +1,88 @@
-import json
+import os
 import re
+import sys
 
-def json_to_markdown(input_path, output_path):
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "common"))
+from jsonStream import iter_json_array
+from metrics import span
+
+def table_to_markdown(table):
     """
-    将JSON表格数据转换为Markdown格式
+    将单个表格转换为Markdown文本片段
     
     Args:
-        input_path (str): 输入JSON文件路径
-        output_path (str): 输出Markdown文件路径
-    """
-    with open(input_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+        table (dict): 含title/summary字段的表格
     
+    Returns:
+        list: Markdown文本片段列表
+    """
     md_content = []
     
-    for table in data.get("tables", []):
-        # 标题
-        md_content.append(f"# {table.get('title', '')}\n")
-        
-        # 总结
-        if summary := table.get("summary"):
-            md_content.append("## 表格总结\n")
-            md_content.append(f"{summary}\n\n")
-        
-        # 表格内容
-        md_content.append("## 表格内容\n")
-        
-        # 表格标题
-        if captions := table.get("table_caption"):
-            md_content.append(f"**表格标题：{captions[0].strip()}**\n\n")
-        
-        # 处理表格主体
-        table_body = table.get("table_body", "")
-        cleaned_table = re.sub(r'</?html>|</?body>', '', table_body).strip()
-        md_content.append(f"{cleaned_table}\n\n")
-        
-        # 脚注
-        if footnotes := table.get("table_footnote"):
-            md_content.append(f"**表格脚注：{footnotes[0].strip()}**\n\n")
-        
-        # 附加信息
-        img_path = table.get('img_path', '')
+    # 标题
+    md_content.append(f"# {table.get('title', '')}\n")
+    
+    # 总结
+    if summary := table.get("summary"):
+        md_content.append("## 表格总结\n")
+        md_content.append(f"{summary}\n\n")
+    
+    # 表格内容
+    md_content.append("## 表格内容\n")
+    
+    # 表格标题
+    if captions := table.get("table_caption"):
+        md_content.append(f"**表格标题：{captions[0].strip()}**\n\n")
+    
+    # 处理表格主体
+    table_body = table.get("table_body", "")
+    cleaned_table = re.sub(r'</?html>|</?body>', '', table_body).strip()
+    md_content.append(f"{cleaned_table}\n\n")
+    
+    # 脚注
+    if footnotes := table.get("table_footnote"):
+        md_content.append(f"**表格脚注：{footnotes[0].strip()}**\n\n")
+    
+    # 附加信息
+    # 跨页拼接的表格保留每个片段的截图
+    for img_path in table.get('source_images') or [table.get('img_path', '')]:
         if img_path:
             md_content.append(f"![表格截图]({img_path})\n\n")
-        
-        md_content.append(f"### *页码: {table.get('page_idx', 0) + 1}*\n\n")
-        md_content.append("---\n\n")
     
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.writelines(md_content)
+    source_pages = table.get('source_pages') or [table.get('page_idx', 0)]
+    page_label = f"{source_pages[0] + 1}" if len(source_pages) == 1 else f"{source_pages[0] + 1}-{source_pages[-1] + 1}"
+    md_content.append(f"### *页码: {page_label}*\n\n")
+    md_content.append("---\n\n")
+    
+    return md_content
+
+def tables_to_markdown(tables):
+    """
+    将表格数据列表转换为Markdown文本片段
+    
+    Args:
+        tables (list): 含title/summary字段的表格列表
+    
+    Returns:
+        list: Markdown文本片段列表
+    """
+    md_content = []
+    with span("markdown", tables=len(tables)):
+        for table in tables:
+            md_content.extend(table_to_markdown(table))
+    return md_content
+
+def json_to_markdown(input_path, output_path):
+    """
+    将JSON表格数据转换为Markdown格式
+    
+    Args:
+        input_path (str): 输入JSON文件路径
+        output_path (str): 输出Markdown文件路径
+    """
+    # 逐个读取表格并立即写出，避免将整个文件载入内存
+    with span("markdown", path=input_path), open(output_path, 'w', encoding='utf-8') as f:
+        for table in iter_json_array(input_path, key="tables"):
+            f.writelines(table_to_markdown(table))
 
 if __name__ == "__main__":
     input_json = "/home/curio/workspace/python-projects/TableSnap/output/20250425_183046_73b4d7c7/康师傅2024_table_summaries.json"
@@ -0,0 +1,260 @@
+import glob
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "common"))
+from jsonStream import iter_json_array
+from tableModel import ParsedTable
+
+SUMMARIES_SUFFIX = "_table_summaries.json"
+# 默认导出到Results/dataset，图片库垃圾回收扫描Results时会读取其中的图片引用
+DEFAULT_DATASET_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "Results", "dataset"
+)
+INDEX_FILE = "_index.arrow"
+FORMATS = ("arrow", "parquet")
+
+
+def _require_pyarrow():
+    """按需导入pyarrow，未安装时给出明确提示"""
+    try:
+        import pyarrow as pa
+        import pyarrow.compute  # noqa: F401
+        import pyarrow.ipc  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as e:
+        raise ImportError("导出列式数据需要pyarrow：pip install pyarrow") from e
+    return pa
+
+
+def _table_schema(pa):
+    return pa.schema([
+        ("doc_id", pa.string()),
+        ("table_no", pa.int32()),
+        ("page_idx", pa.int32()),
+        ("title", pa.string()),
+        ("summary", pa.string()),
+        ("caption", pa.string()),
+        ("footnote", pa.string()),
+        ("img_path", pa.string()),
+        ("source_images", pa.list_(pa.string())),
+        ("n_rows", pa.int32()),
+        ("n_cols", pa.int32()),
+        ("header_rows", pa.int32()),
+        ("cells", pa.list_(pa.list_(pa.string()))),
+        ("values", pa.list_(pa.list_(pa.float64()))),
+    ])
+
+
+def _index_schema(pa):
+    return pa.schema([
+        ("doc_id", pa.string()),
+        ("table_no", pa.int32()),
+        ("page_idx", pa.int32()),
+        ("title", pa.string()),
+        ("path", pa.string()),
+        ("batch", pa.int32()),
+    ])
+
+
+def document_id(summaries_path):
+    """
+    由_table_summaries.json路径生成文档ID："<结果目录名>_<文档名>"
+
+    结果目录名（时间戳_uuid）保证同名文档的不同运行不会互相覆盖。
+    """
+    name = os.path.basename(summaries_path)
+    if name.endswith(SUMMARIES_SUFFIX):
+        name = name[:-len(SUMMARIES_SUFFIX)]
+    run_dir = os.path.basename(os.path.dirname(os.path.abspath(summaries_path)))
+    return f"{run_dir}_{name}" if run_dir else name
+
+
+def find_summary_files(inputs):
+    """展开输入中的目录和通配符，返回所有_table_summaries.json路径"""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(glob.glob(os.path.join(item, "**", f"*{SUMMARIES_SUFFIX}"), recursive=True))
+        else:
+            paths.extend(glob.glob(item) or [item])
+    return sorted(set(paths))
+
+
+def table_record(table, doc_id, table_no):
+    """
+    将单个表格转换为一行列式记录，单元格已展开合并并解析数值
+
+    Args:
+        table (dict): 含title/summary字段的表格
+        doc_id (str): 文档ID
+        table_no (int): 表格在文档中的序号（0开始）
+
+    Returns:
+        dict: 与_table_schema对应的记录
+    """
+    parsed = ParsedTable.from_table(table)
+    n_rows, n_cols = parsed.shape
+    values = [
+        [None if value != value else float(value) for value in row]
+        for row in parsed.values.tolist()
+    ]
+    return {
+        "doc_id": doc_id,
+        "table_no": table_no,
+        "page_idx": table.get("page_idx", 0),
+        "title": table.get("title", ""),
+        "summary": table.get("summary", ""),
+        "caption": "\n".join(table.get("table_caption") or []),
+        "footnote": "\n".join(table.get("table_footnote") or []),
+        "img_path": table.get("img_path", ""),
+        # 跨页拼接的表格记录各片段的截图，未拼接的表格为空列表
+        "source_images": table.get("source_images") or [],
+        "n_rows": n_rows,
+        "n_cols": n_cols,
+        "header_rows": parsed.header_rows,
+        "cells": parsed.grid,
+        "values": values,
+    }
+
+
+def _write_document(pa, summaries_path, dataset_dir, doc_id, fmt):
+    """写出单个文档的分区文件，返回索引记录列表"""
+    partition_dir = os.path.join(dataset_dir, f"doc_id={doc_id}")
+    os.makedirs(partition_dir, exist_ok=True)
+    file_name = "tables.arrow" if fmt == "arrow" else "tables.parquet"
+    relative_path = os.path.join(f"doc_id={doc_id}", file_name)
+    schema = _table_schema(pa)
+
+    index_rows = []
+    tables = (t for t in iter_json_array(summaries_path, key="tables") if t.get("type") == "table")
+    if fmt == "arrow":
+        # 每个表格一个record batch，读取单表时按batch序号直接定位
+        with pa.ipc.new_file(os.path.join(dataset_dir, relative_path), schema) as writer:
+            for table_no, table in enumerate(tables):
+                record = table_record(table, doc_id, table_no)
+                writer.write_batch(pa.RecordBatch.from_pylist([record], schema=schema))
+                index_rows.append((record, table_no))
+    else:
+        records = [table_record(table, doc_id, table_no) for table_no, table in enumerate(tables)]
+        pa.parquet.write_table(pa.Table.from_pylist(records, schema=schema),
+                               os.path.join(dataset_dir, relative_path))
+        index_rows = [(record, record["table_no"]) for record in records]
+
+    return [
+        {
+            "doc_id": doc_id,
+            "table_no": record["table_no"],
+            "page_idx": record["page_idx"],
+            "title": record["title"],
+            "path": relative_path,
+            "batch": batch,
+        }
+        for record, batch in index_rows
+    ]
+
+
+def export_tables(summary_paths, dataset_dir, fmt="arrow"):
+    """
+    将一个或多个_table_summaries.json导出为按文档分区的列式数据集
+
+    目录结构为 dataset_dir/doc_id=<文档ID>/tables.arrow（或tables.parquet），
+    另有 dataset_dir/_index.arrow 记录每个表格的文档ID、序号、页码、标题和位置。
+    已导出的文档再次导出时覆盖其分区并更新索引，其余文档保持不变。
+
+    Args:
+        summary_paths (list): _table_summaries.json路径列表
+        dataset_dir (str): 数据集目录
+        fmt (str): "arrow"（Arrow IPC，支持内存映射零拷贝读取）或"parquet"（压缩存储）
+
+    Returns:
+        int: 导出的表格数量
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"不支持的导出格式: {fmt}")
+    pa = _require_pyarrow()
+    os.makedirs(dataset_dir, exist_ok=True)
+
+    new_rows = []
+    exported_docs = set()
+    for summaries_path in summary_paths:
+        doc_id = document_id(summaries_path)
+        new_rows.extend(_write_document(pa, summaries_path, dataset_dir, doc_id, fmt))
+        exported_docs.add(doc_id)
+
+    # 合并旧索引中未被本次覆盖的文档
+    index_rows = []
+    if os.path.exists(os.path.join(dataset_dir, INDEX_FILE)):
+        index_rows = [row for row in load_index(dataset_dir).to_pylist() if row["doc_id"] not in exported_docs]
+    index_rows.extend(new_rows)
+
+    index_path = os.path.join(dataset_dir, INDEX_FILE)
+    with pa.ipc.new_file(index_path + ".tmp", _index_schema(pa)) as writer:
+        writer.write_table(pa.Table.from_pylist(index_rows, schema=_index_schema(pa)))
+    os.replace(index_path + ".tmp", index_path)
+    return len(new_rows)
+
+
+def load_index(dataset_dir):
+    """
+    读取数据集索引
+
+    Returns:
+        pyarrow.Table: doc_id/table_no/page_idx/title/path/batch
+    """
+    pa = _require_pyarrow()
+    # 返回的表直接引用映射内存，映射随表的生命周期释放
+    return pa.ipc.open_file(pa.memory_map(os.path.join(dataset_dir, INDEX_FILE), 'r')).read_all()
+
+
+def load_table(dataset_dir, doc_id, table_no, index=None):
+    """
+    读取单个表格
+
+    Arrow格式通过内存映射直接定位对应的record batch，不解析其他表格，数据不复制；
+    Parquet格式按文档读取后筛选。
+
+    Args:
+        dataset_dir (str): 数据集目录
+        doc_id (str): 文档ID
+        table_no (int): 表格序号（0开始）
+        index (pyarrow.Table, optional): 已加载的索引，批量读取时可复用
+
+    Returns:
+        pyarrow.RecordBatch: 单行记录
+
+    Raises:
+        KeyError: 索引中不存在该表格
+    """
+    pa = _require_pyarrow()
+    index = index if index is not None else load_index(dataset_dir)
+    matches = [
+        row for row in index.filter(pa.compute.equal(index["doc_id"], doc_id)).to_pylist()
+        if row["table_no"] == table_no
+    ]
+    if not matches:
+        raise KeyError(f"数据集中不存在表格: {doc_id}#{table_no}")
+    entry = matches[0]
+    path = os.path.join(dataset_dir, entry["path"])
+
+    if path.endswith(".arrow"):
+        return pa.ipc.open_file(pa.memory_map(path, 'r')).get_batch(entry["batch"])
+    table = pa.parquet.read_table(path)
+    return table.slice(entry["batch"], 1).to_batches()[0]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="将表格摘要导出为按文档分区的Arrow/Parquet数据集")
+    parser.add_argument("inputs", nargs="+", help="_table_summaries.json文件、结果目录或通配符")
+    parser.add_argument("-o", "--output", default=DEFAULT_DATASET_DIR, help="数据集目录，默认为Results/dataset")
+    parser.add_argument("--format", choices=FORMATS, default="arrow", help="arrow支持零拷贝读取，parquet体积更小")
+    args = parser.parse_args()
+
+    paths = find_summary_files(args.inputs)
+    if not paths:
+        print("错误: 未找到_table_summaries.json文件")
+        sys.exit(1)
+    count = export_tables(paths, args.output, fmt=args.format)
+    print(f"{len(paths)}个文档共{count}个表格已导出至 {args.output}")
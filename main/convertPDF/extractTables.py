@@ -1,26 +1,60 @@
-import json
 import os
+import sys
 
-# 定义输入和输出路径
-input_json_path = '/home/curio/workspace/python-projects/TableSnap/output/20250425_183046_73b4d7c7/康师傅2024_content_list.json'
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "common"))
+from jsonStream import JsonArrayWriter, iter_json_array
+from metrics import span
 
-# 提取原名称并生成新的输出文件名
-base_name = os.path.basename(input_json_path)  # 获取文件名
-name_without_extension = os.path.splitext(base_name)[0]  # 去掉扩展名
-output_json_path = os.path.join(
-    os.path.dirname(input_json_path),  # 获取文件所在目录
-    f"{name_without_extension.split('_content_list')[0]}_origin_tables.json"  # 生成新文件名
-)
 
-# 读取输入JSON文件
-with open(input_json_path, 'r', encoding='utf-8') as file:
-    data = json.load(file)
+def extract_tables(content_list):
+    """
+    从MinerU的content_list中筛选表格条目
 
-# 提取所有表格数据
-tables = [item for item in data if item['type'] == 'table']
+    Args:
+        content_list (list): MinerU输出的内容列表
 
-# 将提取的表格数据保存到新的JSON文件
-with open(output_json_path, 'w', encoding='utf-8') as file:
-    json.dump(tables, file, ensure_ascii=False, indent=4)
+    Returns:
+        list: type为table的条目列表
+    """
+    with span("extract_tables", items=len(content_list)):
+        return [item for item in content_list if item['type'] == 'table']
 
-print(f"表格数据已成功提取并保存到 {output_json_path}")
+
+def stream_extract_tables(input_path, output_path):
+    """
+    流式读取content_list文件并逐条写出表格条目，内存占用与单个条目大小相当
+
+    Args:
+        input_path (str): content_list.json路径
+        output_path (str): 输出的_origin_tables.json路径
+
+    Returns:
+        int: 提取的表格数量
+    """
+    with span("extract_tables", path=input_path), JsonArrayWriter(output_path) as writer:
+        for item in iter_json_array(input_path):
+            if item['type'] == 'table':
+                writer.write(item)
+    return writer.count
+
+
+def origin_tables_path(content_list_path):
+    """根据content_list文件路径生成对应的_origin_tables.json路径"""
+    # 提取原名称并生成新的输出文件名
+    base_name = os.path.basename(content_list_path)  # 获取文件名
+    name_without_extension = os.path.splitext(base_name)[0]  # 去掉扩展名
+    return os.path.join(
+        os.path.dirname(content_list_path),  # 获取文件所在目录
+        f"{name_without_extension.split('_content_list')[0]}_origin_tables.json"  # 生成新文件名
+    )
+
+
+if __name__ == "__main__":
+    # 定义输入和输出路径
+    input_json_path = '/home/curio/workspace/python-projects/TableSnap/output/20250425_183046_73b4d7c7/康师傅2024_content_list.json'
+    output_json_path = origin_tables_path(input_json_path)
+
+    # 流式提取表格数据并保存到新的JSON文件
+    table_count = stream_extract_tables(input_json_path, output_json_path)
+
+    print(f"{table_count}个表格数据已成功提取并保存到 {output_json_path}")
@@ -0,0 +1,331 @@
+import hashlib
+import io
+import logging
+import os
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+# 默认图片库位置：Results/image_store，各次运行共享
+DEFAULT_STORE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "Results", "image_store"
+)
+# original保持MinerU输出的JPEG，webp重新编码（需要Pillow）
+IMAGE_FORMATS = ("original", "webp")
+DEFAULT_QUALITY = 80
+# 垃圾回收时不删除最近写入的图片，避免误删仍在运行的任务刚写入、结果文件尚未落盘的图片
+DEFAULT_GC_MIN_AGE_HOURS = 1.0
+
+# 结果文件中对图片库文件的引用：64位sha256 + 扩展名
+_STORED_NAME_PATTERN = re.compile(r'([0-9a-f]{64}\.(?:webp|jpg|jpeg|png))')
+_REFERENCE_SUFFIXES = (".md", ".json", ".jsonl")
+_COLUMNAR_SUFFIXES = (".parquet", ".arrow")
+# 列式文件中的图片引用列：img_path为字符串，source_images为跨页拼接表格各片段截图的列表
+_IMAGE_COLUMNS = ("img_path", "source_images")
+
+
+class ImageStore:
+    """
+    按内容哈希寻址的表格截图库，多次运行共享同一份图片
+
+    文件名为 sha256(原图字节 + 编码参数)，存放在 <root>/<前两位>/<哈希>.<扩展名>；
+    库中已有的图片不再编码和写盘。配置webp或max_side时用Pillow重新编码和缩小，
+    未安装Pillow时按原图保存。
+
+    Args:
+        root (str): 图片库目录
+        image_format (str): "original"保持原格式，"webp"转为WebP
+        quality (int): 有损编码质量（1-100）
+        lossless (bool): WebP是否使用无损编码
+        max_side (int, optional): 长边像素上限，超出时等比缩小
+    """
+
+    def __init__(self, root=DEFAULT_STORE_DIR, image_format="original", quality=DEFAULT_QUALITY, lossless=False,
+                 max_side=None):
+        if image_format not in IMAGE_FORMATS:
+            raise ValueError(f"不支持的图片格式: {image_format}")
+        self.root = root
+        self.image_format = image_format
+        self.quality = quality
+        self.lossless = lossless
+        self.max_side = max_side
+        self._pillow_missing = False
+        os.makedirs(root, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config_path="config.yaml"):
+        """从config.yaml的images节创建图片库，配置缺失时使用默认值"""
+        import yaml
+
+        try:
+            with open(config_path, 'r') as f:
+                images_config = (yaml.safe_load(f) or {}).get('images', {}) or {}
+        except Exception as e:
+            logger.warning(f"读取图片库配置失败，使用默认值: {str(e)}")
+            images_config = {}
+        return cls(
+            root=images_config.get("path", DEFAULT_STORE_DIR),
+            image_format=images_config.get("format", "original"),
+            quality=images_config.get("quality", DEFAULT_QUALITY),
+            lossless=images_config.get("lossless", False),
+            max_side=images_config.get("max_side"),
+        )
+
+    @property
+    def reencodes(self):
+        return self.image_format != "original" or bool(self.max_side)
+
+    def _stored_name(self, data, ext):
+        digest = hashlib.sha256(data)
+        if self.reencodes:
+            # 编码参数不同的结果是不同的文件
+            digest.update(f"|{self.image_format}|{self.quality}|{self.lossless}|{self.max_side}".encode("utf-8"))
+            if self.image_format == "webp":
+                ext = "webp"
+        digest = digest.hexdigest()
+        return os.path.join(digest[:2], f"{digest}.{ext}")
+
+    def _encode(self, data):
+        """按配置缩小和转码，失败或未安装Pillow时返回原图"""
+        try:
+            from PIL import Image
+        except ImportError:
+            if not self._pillow_missing:
+                logger.warning("未安装Pillow，图片按原格式保存（pip install Pillow 以启用WebP和缩小）")
+                self._pillow_missing = True
+            return data
+
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                source_format = image.format or "JPEG"
+                image.load()
+                if self.max_side and max(image.size) > self.max_side:
+                    image.thumbnail((self.max_side, self.max_side), Image.LANCZOS)
+                if image.mode not in ("RGB", "RGBA", "L"):
+                    image = image.convert("RGB")
+                output = io.BytesIO()
+                if self.image_format == "webp":
+                    image.save(output, "WEBP", quality=self.quality, lossless=self.lossless, method=4)
+                else:
+                    image.save(output, source_format, quality=self.quality)
+        except Exception as e:
+            logger.warning(f"图片重新编码失败，按原图保存: {str(e)}")
+            return data
+        return output.getvalue()
+
+    def put(self, data, ext="jpg"):
+        """
+        保存图片，库中已有时直接复用
+
+        Args:
+            data (bytes): 图片内容
+            ext (str): 原图扩展名
+
+        Returns:
+            tuple: (相对图片库根目录的路径, 是否新写入)
+        """
+        stored_name = self._stored_name(data, ext)
+        path = os.path.join(self.root, stored_name)
+        if os.path.exists(path):
+            # 复用时刷新修改时间，垃圾回收的min_age保护同样覆盖结果文件尚未落盘的复用图片
+            try:
+                os.utime(path)
+                return stored_name, False
+            except FileNotFoundError:
+                pass  # 恰好被垃圾回收删除，重新写入
+            except OSError as e:
+                logger.warning(f"刷新图片修改时间失败: {str(e)}")
+                return stored_name, False
+
+        if self.reencodes:
+            data = self._encode(data)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 先写临时文件再原子替换，多个进程同时写入同一图片也不会留下半个文件
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return stored_name, True
+
+    def link(self, stored_name, from_dir):
+        """图片相对from_dir（markdown所在目录）的引用路径"""
+        return os.path.relpath(os.path.join(self.root, stored_name), from_dir).replace(os.sep, "/")
+
+    def iter_files(self):
+        """遍历图片库中的所有图片，产出(绝对路径, 文件名)"""
+        for dir_path, _, file_names in os.walk(self.root):
+            for file_name in file_names:
+                if _STORED_NAME_PATTERN.fullmatch(file_name):
+                    yield os.path.join(dir_path, file_name), file_name
+
+    def stats(self):
+        count = 0
+        total_bytes = 0
+        for path, _ in self.iter_files():
+            count += 1
+            total_bytes += os.path.getsize(path)
+        return {"images": count, "bytes": total_bytes}
+
+
+class ImageStoreWriter:
+    """
+    与MinerU的DataWriter接口兼容的写入器，把裁剪图片写入图片库
+
+    Args:
+        store (ImageStore): 图片库
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.paths = {}  # MinerU图片文件名 → 图片库中的相对路径
+        self.written = 0
+        self.reused = 0
+
+    def write(self, path, data):
+        ext = os.path.splitext(path)[1].lstrip(".") or "jpg"
+        stored_name, created = self.store.put(data, ext)
+        self.paths[path] = stored_name
+        if created:
+            self.written += 1
+        else:
+            self.reused += 1
+
+    def write_string(self, path, data):
+        self.write(path, data.encode("utf-8"))
+
+
+def _read_img_paths(path):
+    """读取Parquet/Arrow IPC文件中img_path和source_images列的图片路径，没有这些列时返回空列表"""
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+
+    if path.endswith(".parquet"):
+        columns = [name for name in _IMAGE_COLUMNS if name in pq.read_schema(path).names]
+        if not columns:
+            return []
+        table = pq.read_table(path, columns=columns)
+    else:
+        with pa.memory_map(path) as source:
+            try:
+                table = pa.ipc.open_file(source).read_all()
+            except pa.ArrowInvalid:
+                # 不是IPC文件格式时按流格式读取
+                source.seek(0)
+                table = pa.ipc.open_stream(source).read_all()
+
+    paths = []
+    for name in _IMAGE_COLUMNS:
+        if name not in table.column_names:
+            continue
+        for value in table.column(name).to_pylist():
+            paths.extend(value if isinstance(value, list) else [value])
+    return paths
+
+
+def _referenced_in_file(path):
+    """读取结果文件中引用的图片库文件名"""
+    names = set()
+    if path.endswith(_COLUMNAR_SUFFIXES):
+        # Parquet/Arrow为二进制列式文件，需按列读取img_path
+        try:
+            values = _read_img_paths(path)
+        except ImportError:
+            logger.warning(f"未安装pyarrow，跳过 {path}")
+            return names
+        for value in values:
+            names.update(_STORED_NAME_PATTERN.findall(value or ""))
+        return names
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            names.update(_STORED_NAME_PATTERN.findall(line))
+    return names
+
+
+def collect_references(results_dirs, skip_dir=None):
+    """
+    扫描结果目录中的markdown/JSON/Parquet/Arrow文件，收集仍被引用的图片文件名
+
+    Args:
+        results_dirs (list): 结果目录列表
+        skip_dir (str, optional): 跳过的目录（图片库本身）
+
+    Returns:
+        set: 被引用的图片文件名
+    """
+    skip_dir = os.path.abspath(skip_dir) if skip_dir else None
+    references = set()
+    for results_dir in results_dirs:
+        for dir_path, dir_names, file_names in os.walk(results_dir):
+            if skip_dir:
+                dir_names[:] = [name for name in dir_names if os.path.abspath(os.path.join(dir_path, name)) != skip_dir]
+            for file_name in file_names:
+                if file_name.endswith(_REFERENCE_SUFFIXES + _COLUMNAR_SUFFIXES):
+                    references.update(_referenced_in_file(os.path.join(dir_path, file_name)))
+    return references
+
+
+def collect_garbage(store, results_dirs, min_age_hours=DEFAULT_GC_MIN_AGE_HOURS, dry_run=False):
+    """
+    删除不再被任何结果文件引用的图片
+
+    Args:
+        store (ImageStore): 图片库
+        results_dirs (list): 需要扫描引用的结果目录
+        min_age_hours (float): 只删除写入时间早于此时长的图片
+        dry_run (bool): 只统计不删除
+
+    Returns:
+        dict: {"kept": 保留数, "removed": 删除数, "freed_bytes": 释放字节数}
+    """
+    references = collect_references(results_dirs, skip_dir=store.root)
+    cutoff = time.time() - min_age_hours * 3600
+    kept = removed = freed_bytes = 0
+    for path, file_name in store.iter_files():
+        if file_name in references or os.path.getmtime(path) > cutoff:
+            kept += 1
+            continue
+        freed_bytes += os.path.getsize(path)
+        removed += 1
+        if not dry_run:
+            os.remove(path)
+
+    if not dry_run:
+        # 清理空的分片目录
+        for dir_path, _, _ in sorted(os.walk(store.root), key=lambda entry: len(entry[0]), reverse=True):
+            if dir_path != store.root and not os.listdir(dir_path):
+                os.rmdir(dir_path)
+    return {"kept": kept, "removed": removed, "freed_bytes": freed_bytes}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="表格截图图片库管理")
+    parser.add_argument("--store", default=None, help="图片库目录，默认读取config.yaml的images.path")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    gc_parser = subparsers.add_parser("gc", help="删除不再被任何结果引用的图片")
+    gc_parser.add_argument("--results", nargs="+", default=None, help="需要扫描引用的结果目录，默认为Results")
+    gc_parser.add_argument("--min-age-hours", type=float, default=DEFAULT_GC_MIN_AGE_HOURS,
+                           help="只删除写入时间早于此时长的图片")
+    gc_parser.add_argument("--dry-run", action="store_true", help="只统计不删除")
+
+    subparsers.add_parser("stats", help="统计图片数量和占用空间")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    image_store = ImageStore(root=args.store) if args.store else ImageStore.from_config()
+
+    if args.command == "stats":
+        store_stats = image_store.stats()
+        print(f"图片库 {image_store.root}：{store_stats['images']} 张图片，{store_stats['bytes'] / 1024 / 1024:.1f}MB")
+    else:
+        from useMinerU import RESULTS_DIR
+
+        result = collect_garbage(image_store, args.results or [RESULTS_DIR], min_age_hours=args.min_age_hours,
+                                 dry_run=args.dry_run)
+        action = "可删除" if args.dry_run else "已删除"
+        print(f"保留 {result['kept']} 张，{action} {result['removed']} 张，"
+              f"释放 {result['freed_bytes'] / 1024 / 1024:.1f}MB")
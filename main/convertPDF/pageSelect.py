@@ -0,0 +1,180 @@
+import re
+
+# 财务数字：1,234 / (1,234) / 12.5% / -3.2
+_NUMBER_PATTERN = re.compile(r'^\(?-?[\d,]+(\.\d+)?\)?%?$')
+
+# 判定为表格页的阈值
+MIN_RULING_LINES = 3
+MIN_NUMERIC_WORDS = 20
+# 视为有文字层的最少字符数，低于此值的页面无法判断，保守地保留
+MIN_TEXT_CHARS = 20
+# 文字层中乱码字符（替换符、私用区、控制字符）占比超过此值视为无可用文字层
+MAX_GARBLED_RATIO = 0.1
+_GARBLED_PATTERN = re.compile(r'[\ufffd\ue000-\uf8ff\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+ROUTE_TXT = "txt"
+ROUTE_OCR = "ocr"
+
+
+def _open_pdf(pdf_bytes):
+    """打开内存中的PDF；fitz按需导入，不预扫描时无需加载"""
+    import fitz  # PyMuPDF，MinerU的依赖
+
+    return fitz.open(stream=pdf_bytes, filetype="pdf")
+
+
+def parse_page_range(page_range, page_count):
+    """
+    解析页码范围字符串（1开始，如 "3-10,15"）为0开始的页索引列表
+
+    Args:
+        page_range (str): 页码范围，为空表示全部页面
+        page_count (int): 文档总页数
+
+    Returns:
+        list: 升序去重的页索引列表
+    """
+    if not page_range:
+        return list(range(page_count))
+
+    pages = set()
+    for part in page_range.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = part.split('-', 1)
+            start = int(start) if start.strip() else 1
+            end = int(end) if end.strip() else page_count
+        else:
+            start = end = int(part)
+        pages.update(range(max(start, 1) - 1, min(end, page_count)))
+    return sorted(pages)
+
+
+def _count_ruling_lines(page):
+    """统计页面中较长的水平/垂直线段（包括细长矩形）数量"""
+    min_length = page.rect.width * 0.2
+    count = 0
+    for drawing in page.get_drawings():
+        for item in drawing.get("items", []):
+            if item[0] == "l":
+                p1, p2 = item[1], item[2]
+                if abs(p1.y - p2.y) < 1 and abs(p1.x - p2.x) >= min_length:
+                    count += 1
+                elif abs(p1.x - p2.x) < 1 and abs(p1.y - p2.y) >= min_length / 4:
+                    count += 1
+            elif item[0] == "re":
+                rect = item[1]
+                if rect.height < 2 and rect.width >= min_length:
+                    count += 1
+    return count
+
+
+def is_likely_table_page(page):
+    """
+    根据文字层和矢量线条判断页面是否可能包含表格
+
+    无文字层的页面（扫描件）无法判断，返回True交给版面模型处理。
+    """
+    words = page.get_text("words")
+    if sum(len(word[4]) for word in words) < MIN_TEXT_CHARS:
+        return True
+    if _count_ruling_lines(page) >= MIN_RULING_LINES:
+        return True
+    numeric_words = sum(1 for word in words if _NUMBER_PATTERN.match(word[4]))
+    return numeric_words >= MIN_NUMERIC_WORDS
+
+
+def classify_page(page):
+    """
+    判断单页应走文字层（txt）还是OCR路线
+
+    文字过少（扫描页）或文字层乱码比例过高（字体缺少ToUnicode映射）时走OCR。
+
+    Returns:
+        tuple: (路线, 文字层非空白字符数)
+    """
+    text = "".join(page.get_text("text").split())
+    if len(text) < MIN_TEXT_CHARS:
+        return ROUTE_OCR, len(text)
+    if len(_GARBLED_PATTERN.findall(text)) / len(text) > MAX_GARBLED_RATIO:
+        return ROUTE_OCR, len(text)
+    return ROUTE_TXT, len(text)
+
+
+def classify_pages(pdf_bytes):
+    """
+    逐页判断解析路线
+
+    Args:
+        pdf_bytes (bytes): PDF内容
+
+    Returns:
+        list: 每页一个 {"route": "txt"/"ocr", "text_chars": 文字层字符数}
+    """
+    with _open_pdf(pdf_bytes) as doc:
+        routes = []
+        for page in doc:
+            route, text_chars = classify_page(page)
+            routes.append({"route": route, "text_chars": text_chars})
+        return routes
+
+
+def route_segments(routes):
+    """
+    将逐页路线合并为连续的同路线片段，片段按页码顺序排列
+
+    按连续片段而不是按路线分组，拼接各片段的markdown时页面顺序保持不变。
+
+    Args:
+        routes (list): 每页的路线字符串
+
+    Returns:
+        list: [(路线, [页索引, ...]), ...]
+    """
+    segments = []
+    for idx, route in enumerate(routes):
+        if segments and segments[-1][0] == route:
+            segments[-1][1].append(idx)
+        else:
+            segments.append((route, [idx]))
+    return segments
+
+
+def detect_table_pages(pdf_bytes, page_indices=None):
+    """
+    预扫描PDF，返回可能包含表格的页索引
+
+    Args:
+        pdf_bytes (bytes): PDF内容
+        page_indices (list, optional): 仅扫描这些页，默认扫描全部页面
+
+    Returns:
+        list: 可能含表格的页索引列表
+    """
+    with _open_pdf(pdf_bytes) as doc:
+        if page_indices is None:
+            page_indices = range(doc.page_count)
+        return [idx for idx in page_indices if is_likely_table_page(doc[idx])]
+
+
+def page_count(pdf_bytes):
+    with _open_pdf(pdf_bytes) as doc:
+        return doc.page_count
+
+
+def select_pages(pdf_bytes, page_indices):
+    """
+    生成只包含指定页面的新PDF
+
+    Args:
+        pdf_bytes (bytes): 原PDF内容
+        page_indices (list): 保留的页索引（升序）
+
+    Returns:
+        bytes: 新PDF内容，第i页对应原文档的page_indices[i]
+    """
+    with _open_pdf(pdf_bytes) as doc:
+        doc.select(list(page_indices))
+        return doc.tobytes()
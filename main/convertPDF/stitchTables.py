@@ -0,0 +1,161 @@
+import os
+import re
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "common"))
+from htmlTable import parse_table_html
+from metrics import span
+
+# 续表表题，如"合并资产负债表（续）"、"Balance sheet (continued)"
+_CONTINUATION_CAPTION_PATTERN = re.compile(r'[（(]\s*(?:续|續|continued|cont\'d)\s*[)）]\s*$', re.IGNORECASE)
+_ROW_PATTERN = re.compile(r'<tr[\s>].*?</tr>', re.IGNORECASE | re.DOTALL)
+_TABLE_END_PATTERN = re.compile(r'</table>', re.IGNORECASE)
+
+# 续表开头重复的表头最多行数
+MAX_REPEATED_HEADER_ROWS = 3
+
+
+def _caption_text(table):
+    return " ".join(caption.strip() for caption in table.get("table_caption") or []).strip()
+
+
+def _normalize_row(row):
+    return ["".join(cell.split()) for cell in row]
+
+
+def is_continuation(previous, table, previous_grid, grid):
+    """
+    判断表格是否为上一个表格的跨页续表
+
+    条件：位于上一片段最后一页的下一页；没有表题（或表题以"（续）"结尾）；
+    上一片段没有脚注（有脚注说明表格已结束）；列数相同；并且续表开头重复了首个片段的表头，
+    或表题带有"（续）"标记。只有列数相同不足以判断，相邻页上列数相同的独立表格很常见。
+
+    Args:
+        previous (dict): 上一个（可能已拼接的）表格
+        table (dict): 当前表格
+        previous_grid (list): 上一个表格的单元格网格
+        grid (list): 当前表格的单元格网格
+
+    Returns:
+        bool: 是否为续表
+    """
+    last_page = (previous.get("source_pages") or [previous.get("page_idx", 0)])[-1]
+    if table.get("page_idx", 0) != last_page + 1:
+        return False
+    caption = _caption_text(table)
+    marked = bool(_CONTINUATION_CAPTION_PATTERN.search(caption))
+    if caption and not marked:
+        return False
+    if any(footnote.strip() for footnote in previous.get("table_footnote") or []):
+        return False
+    if not grid or not previous_grid or len(grid[0]) != len(previous_grid[0]):
+        return False
+    return marked or repeated_header_rows(previous_grid, grid) > 0
+
+
+def repeated_header_rows(previous_grid, grid):
+    """续表开头与首个片段表头相同的行数（至少保留一行表体）"""
+    count = 0
+    limit = min(MAX_REPEATED_HEADER_ROWS, len(previous_grid), len(grid) - 1)
+    while count < limit and _normalize_row(grid[count]) == _normalize_row(previous_grid[count]):
+        count += 1
+    return count
+
+
+def merge_tables(previous, table, skip_rows=0):
+    """
+    将续表的行追加到上一个表格的HTML中，保留各片段的页码和截图
+
+    Args:
+        previous (dict): 上一个表格（不修改）
+        table (dict): 续表
+        skip_rows (int): 续表开头需要丢弃的重复表头行数
+
+    Returns:
+        dict: 合并后的表格，page_idx为首页，source_pages/source_images记录各片段
+    """
+    rows = _ROW_PATTERN.findall(table.get("table_body", ""))[skip_rows:]
+    body = previous.get("table_body", "")
+    match = None
+    for match in _TABLE_END_PATTERN.finditer(body):
+        pass
+    if match is not None:
+        body = body[:match.start()] + "".join(rows) + body[match.start():]
+    else:
+        body += "".join(rows)
+
+    merged = dict(previous)
+    merged["table_body"] = body
+    merged["table_footnote"] = list(previous.get("table_footnote") or []) + list(table.get("table_footnote") or [])
+    merged["source_pages"] = (previous.get("source_pages") or [previous.get("page_idx", 0)]) + [table.get("page_idx", 0)]
+    merged["source_images"] = (previous.get("source_images") or [previous.get("img_path", "")]) + [table.get("img_path", "")]
+    return merged
+
+
+def iter_stitched_tables(content_list):
+    """
+    逐个产出拼接后的表格，只缓存当前尚未结束的一个表格，可用于流式处理
+
+    遍历完整的content_list：两个表格片段之间出现正文、标题等任何非表格条目时，
+    说明前一个表格已经结束，不再拼接。
+
+    Args:
+        content_list (iterable): 按文档顺序排列的MinerU内容条目
+
+    Yields:
+        dict: 独立表格或由多个跨页片段拼接成的表格
+    """
+    pending = None
+    pending_grid = None
+    for table in content_list:
+        if table.get("type") != "table":
+            if pending is not None:
+                yield pending
+            pending = pending_grid = None
+            continue
+        grid = parse_table_html(table.get("table_body", ""))
+        if pending is not None and is_continuation(pending, table, pending_grid, grid):
+            skip_rows = repeated_header_rows(pending_grid, grid)
+            pending = merge_tables(pending, table, skip_rows=skip_rows)
+            pending_grid = pending_grid + grid[skip_rows:]
+            continue
+        if pending is not None:
+            yield pending
+        pending, pending_grid = table, grid
+    if pending is not None:
+        yield pending
+
+
+def stitch_tables(content_list):
+    """
+    从content_list中提取表格并拼接跨页续表
+
+    Args:
+        content_list (list): MinerU输出的内容列表（tables_only模式下仍保留正文和标题条目）
+
+    Returns:
+        list: 拼接后的表格列表
+    """
+    with span("stitch_tables", items=len(content_list)):
+        return list(iter_stitched_tables(content_list))
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    from extractTables import origin_tables_path
+
+    parser = argparse.ArgumentParser(description="从content_list中提取表格并拼接跨页续表")
+    parser.add_argument("input", help="_content_list.json路径")
+    parser.add_argument("-o", "--output", default=None, help="输出路径，默认为同目录下的_origin_tables.json")
+    args = parser.parse_args()
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        content_list = json.load(f)
+    stitched = stitch_tables(content_list)
+    with open(args.output or origin_tables_path(args.input), 'w', encoding='utf-8') as f:
+        json.dump(stitched, f, ensure_ascii=False, indent=4)
+    fragments = sum(1 for item in content_list if item.get("type") == "table")
+    print(f"{fragments}个表格片段拼接为{len(stitched)}个表格")
@@ -1,60 +1,372 @@
 import os
 import sys
+import glob
+import json
+import time
 import uuid
 import datetime
-from magic_pdf.data.data_reader_writer import FileBasedDataWriter, FileBasedDataReader
-from magic_pdf.data.dataset import PymuDocDataset
-from magic_pdf.model.doc_analyze_by_custom_model import doc_analyze
-from magic_pdf.config.enums import SupportedPdfParseMethod
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from imageStore import ImageStoreWriter
+from pageSelect import (ROUTE_OCR, ROUTE_TXT, classify_pages, detect_table_pages, page_count,
+                        parse_page_range, route_segments, select_pages)
 
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "common"))
+from metrics import registry, span
+
+# 输出根目录
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "Results")
+DEFAULT_MANIFEST_PATH = os.path.join(RESULTS_DIR, "batch_manifest.jsonl")
+
+# 解析路线：page逐页判断文字层/扫描页，document按MinerU对整篇文档的分类
+ROUTING_MODES = ("page", "document")
+# 每个解析进程常驻一套MinerU模型，默认进程数按物理内存估算，且不超过该上限
+PARSE_WORKER_MEMORY_GB = 6
+MAX_DEFAULT_PARSE_WORKERS = 2
+
+
+class TableImageWriter:
+    """暂存裁剪图片，只在确认被表格条目引用后才交给实际的写入器写盘"""
+
+    def __init__(self, writer):
+        self._writer = writer
+        self._pending = {}
+
+    def write(self, path, data):
+        self._pending[path] = data
+
+    def write_string(self, path, data):
+        self.write(path, data.encode("utf-8"))
+
+    def flush(self, keep_paths):
+        for path in keep_paths:
+            if path in self._pending:
+                self._writer.write(path, self._pending.pop(path))
+        self._pending.clear()
+
+
+def warm_up_models(routes=(ROUTE_TXT, ROUTE_OCR)):
+    """
+    预先加载指定解析路线的MinerU模型，之后同一进程内的解析不再重复加载
+
+    未预加载的路线在第一次解析到对应页面时由doc_analyze加载，同样只加载一次。
+
+    Args:
+        routes (tuple): 需要加载的路线（txt/ocr）
+    """
+    from magic_pdf.model.doc_analyze_by_custom_model import ModelSingleton
+    model_manager = ModelSingleton()
+    for route in routes:
+        model_manager.get_model(route == ROUTE_OCR, False)
+
+
+def analyze_pdf(pdf_file_path, write_outputs=True, page_range=None, tables_only=False,
+                detect_tables=False, routing="page", image_store=None):
+    """
+    解析PDF并返回内存中的content_list
+
+    逐页路由时，有文字层的页面走txt路线，扫描页才走OCR；连续的同路线页面组成一个
+    子文档分别解析，结果按原页码合并。每页的路线和（按片段均摊的）耗时记录在
+    metrics的page_events中。
+
+    Args:
+        pdf_file_path (str): PDF文件路径
+        write_outputs (bool): 是否写出markdown和content_list.json（图片总会写出）
+        page_range (str, optional): 页码范围（1开始，如 "3-10,15"），默认全部页面
+        tables_only (bool): 去掉图片条目（保留表格和正文），跳过markdown输出和非表格图片写盘
+        detect_tables (bool): 先用PyMuPDF预扫描，只把可能含表格的页面送入版面/OCR模型
+        routing (str): "page"逐页选择txt/ocr路线，"document"整篇文档统一使用classify的结果
+        image_store (ImageStore, optional): 共享图片库，图片按内容哈希存放且只写入新图片，
+            img_path改写为相对输出目录的图片库路径；默认写入本次输出目录的images目录
+
+    Returns:
+        tuple: (输出目录, PDF文件名（不含扩展名）, content_list)
+    """
+    # MinerU及其模型依赖导入耗时较长，只在真正解析时加载（之后由import缓存）
+    from magic_pdf.config.enums import SupportedPdfParseMethod
+    from magic_pdf.data.data_reader_writer import FileBasedDataReader, FileBasedDataWriter
+    from magic_pdf.data.dataset import PymuDocDataset
+    from magic_pdf.model.doc_analyze_by_custom_model import doc_analyze
 
-def process_pdf(pdf_file_path):
     # 生成时间戳和UUID
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
     unique_id = str(uuid.uuid4())[:8]
 
     # 创建输出目录
-    output_base_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "Results")
-    output_dir = os.path.join(output_base_dir, f"{timestamp}_{unique_id}")
+    output_dir = os.path.join(RESULTS_DIR, f"{timestamp}_{unique_id}")
     local_image_dir = os.path.join(output_dir, "images")
 
     # 确保目录存在
-    os.makedirs(local_image_dir, exist_ok=True)
+    os.makedirs(output_dir if image_store is not None else local_image_dir, exist_ok=True)
 
     # 获取PDF文件名（不含扩展名）
     name_without_suff = os.path.splitext(os.path.basename(pdf_file_path))[0]
 
-    # 设置相对图片路径
-    image_dir = "images"
-
     # 创建数据写入器
-    image_writer = FileBasedDataWriter(local_image_dir)
     md_writer = FileBasedDataWriter(output_dir)
 
     # 读取PDF文件
     reader = FileBasedDataReader("")
     pdf_bytes = reader.read(pdf_file_path)
 
-    # 创建数据集实例
-    ds = PymuDocDataset(pdf_bytes)
+    # 按页码范围和表格预扫描筛选页面，只把选中的页面交给模型
+    page_map = None
+    if page_range or detect_tables:
+        with span("mineru.page_select", pdf=name_without_suff):
+            page_map = parse_page_range(page_range, page_count(pdf_bytes))
+            if detect_tables:
+                page_map = detect_table_pages(pdf_bytes, page_map)
+        print(f"选中 {len(page_map)} 页送入版面分析")
+        if not page_map:
+            return output_dir, name_without_suff, []
+        pdf_bytes = select_pages(pdf_bytes, page_map)
+
+    # 确定每页的解析路线，连续同路线的页面合并为一个片段
+    document_ds = None
+    with span("mineru.classify", pdf=name_without_suff, routing=routing):
+        if routing == "page":
+            page_info = classify_pages(pdf_bytes)
+        else:
+            document_ds = PymuDocDataset(pdf_bytes)
+            route = ROUTE_OCR if document_ds.classify() == SupportedPdfParseMethod.OCR else ROUTE_TXT
+            page_info = [{"route": route} for _ in range(len(document_ds))]
+        segments = route_segments([info["route"] for info in page_info])
+    if len(segments) > 1:
+        routes = [info["route"] for info in page_info]
+        print(f"逐页路由：txt {routes.count(ROUTE_TXT)} 页，ocr {routes.count(ROUTE_OCR)} 页，共 {len(segments)} 个片段")
+
+    content_list = []
+    parts = []  # [(图片写入器, 相对图片目录, pipe_result, 图片库写入器)]
+    for segment_no, (route, pages) in enumerate(segments):
+        ocr = route == ROUTE_OCR
+        # 各片段的页码都从0开始，MinerU按页码和坐标命名裁剪图片，分目录存放避免重名覆盖
+        image_dir = "images" if segment_no == 0 else f"images/part{segment_no}"
+        store_writer = None
+        if image_store is not None:
+            image_writer = store_writer = ImageStoreWriter(image_store)
+        else:
+            os.makedirs(os.path.join(output_dir, image_dir), exist_ok=True)
+            image_writer = FileBasedDataWriter(os.path.join(output_dir, image_dir))
+        if tables_only:
+            image_writer = TableImageWriter(image_writer)
+
+        start_time = time.perf_counter()
+        if document_ds is not None:
+            ds = document_ds
+        else:
+            ds = PymuDocDataset(pdf_bytes if len(segments) == 1 else select_pages(pdf_bytes, pages))
+        with span("mineru.doc_analyze", pdf=name_without_suff, pages=len(pages), ocr=ocr):
+            infer_result = ds.apply(doc_analyze, ocr=ocr)
+        with span("mineru.pipe", pdf=name_without_suff, ocr=ocr):
+            if ocr:
+                pipe_result = infer_result.pipe_ocr_mode(image_writer)
+            else:
+                pipe_result = infer_result.pipe_txt_mode(image_writer)
+            segment_content = pipe_result.get_content_list(image_dir)
+        seconds = time.perf_counter() - start_time
+
+        # 片段页码 → 筛选后文档页码 → 原文档页码
+        original_pages = [page_map[idx] for idx in pages] if page_map is not None else pages
+        for item in segment_content:
+            item["page_idx"] = original_pages[item["page_idx"]]
+        content_list.extend(segment_content)
+        parts.append((image_writer, image_dir, pipe_result, store_writer))
+        # 模型按批处理整个片段，单页耗时按片段均摊
+        for idx, original_idx in zip(pages, original_pages):
+            registry.record_page(original_idx, route, seconds / len(pages), **{
+                key: value for key, value in page_info[idx].items() if key != "route"
+            })
+
+    with span("mineru.dump", pdf=name_without_suff):
+        if tables_only:
+            # 去掉图片条目；正文和标题条目保留，拼接跨页续表时据此判断两个表格片段之间是否隔有内容
+            content_list = [item for item in content_list if item['type'] != 'image']
+            for image_writer, image_dir, _, _ in parts:
+                image_writer.flush([
+                    os.path.basename(item["img_path"]) for item in content_list
+                    if item['type'] == 'table' and os.path.dirname(item.get("img_path") or "") == image_dir
+                ])
+
+        # 图片库中的图片：img_path改写为相对输出目录的路径
+        image_links = {}
+        if image_store is not None:
+            for _, image_dir, _, store_writer in parts:
+                for name, stored_name in store_writer.paths.items():
+                    image_links[f"{image_dir}/{name}"] = image_store.link(stored_name, output_dir)
+            for item in content_list:
+                if item.get("img_path") in image_links:
+                    item["img_path"] = image_links[item["img_path"]]
+            written = sum(part[3].written for part in parts)
+            reused = sum(part[3].reused for part in parts)
+            print(f"图片库：新写入 {written} 张，复用 {reused} 张")
 
-    # 根据PDF类型进行处理
-    if ds.classify() == SupportedPdfParseMethod.OCR:
-        infer_result = ds.apply(doc_analyze, ocr=True)
-        pipe_result = infer_result.pipe_ocr_mode(image_writer)
-    else:
-        infer_result = ds.apply(doc_analyze, ocr=False)
-        pipe_result = infer_result.pipe_txt_mode(image_writer)
+        # 只输出content_list.json和markdown文件
+        if write_outputs:
+            if tables_only or page_map is not None or len(parts) > 1 or image_links:
+                # 筛选、重映射或合并后的结果需自行序列化
+                md_writer.write_string(f"{name_without_suff}_content_list.json",
+                                       json.dumps(content_list, ensure_ascii=False, indent=4))
+            else:
+                parts[0][2].dump_content_list(md_writer, f"{name_without_suff}_content_list.json", parts[0][1])
+            if not tables_only:
+                # 片段按页码顺序排列，依次拼接即为整篇markdown
+                markdown = "\n\n".join(pipe_result.get_markdown(image_dir) for _, image_dir, pipe_result, _ in parts)
+                for image_path, link in image_links.items():
+                    markdown = markdown.replace(image_path, link)
+                md_writer.write_string(f"{name_without_suff}.md", markdown)
 
-    # 只输出content_list.json和markdown文件
-    pipe_result.dump_md(md_writer, f"{name_without_suff}.md", image_dir)
-    pipe_result.dump_content_list(md_writer, f"{name_without_suff}_content_list.json", image_dir)
+    return output_dir, name_without_suff, content_list
 
+
+def process_pdf(pdf_file_path, **options):
+    output_dir, _, _ = analyze_pdf(pdf_file_path, **options)
     print(f"处理完成！输出文件保存在: {output_dir}")
     return output_dir
 
 
+def default_worker_count():
+    """按当前进程可用的CPU核数确定进程池大小"""
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return max(1, os.cpu_count() or 1)
+
+
+def default_parse_workers(worker_memory_gb=PARSE_WORKER_MEMORY_GB):
+    """
+    常驻解析进程的默认数量：按物理内存能容纳的模型副本数估算，限制在1到MAX_DEFAULT_PARSE_WORKERS之间
+
+    Args:
+        worker_memory_gb (float): 每个解析进程预计占用的内存（GB）
+    """
+    try:
+        memory_gb = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 1024 ** 3
+    except (AttributeError, ValueError, OSError):
+        # 无法读取物理内存的平台只用一个进程
+        return 1
+    return max(1, min(MAX_DEFAULT_PARSE_WORKERS, default_worker_count(), int(memory_gb // worker_memory_gb)))
+
+
+def collect_pdfs(inputs):
+    """
+    将目录、glob模式或文件路径展开为去重后的PDF文件列表
+
+    Args:
+        inputs (list): 目录/glob/文件路径列表
+
+    Returns:
+        list: PDF绝对路径列表（保持输入顺序）
+    """
+    pdf_paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = sorted(glob.glob(os.path.join(item, "**", "*.pdf"), recursive=True))
+        else:
+            matches = sorted(glob.glob(item)) or [item]
+        pdf_paths.extend(os.path.abspath(path) for path in matches if path.lower().endswith(".pdf"))
+    return list(dict.fromkeys(pdf_paths))
+
+
+def load_manifest(manifest_path):
+    """读取批处理清单，返回每个PDF最近一次的记录"""
+    records = {}
+    if not os.path.exists(manifest_path):
+        return records
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # 中断时可能残留半行，跳过
+                continue
+            records[record["pdf"]] = record
+    return records
+
+
+def _init_worker():
+    """进程池初始化：每个工作进程只加载一次MinerU模型"""
+    warm_up_models()
+
+
+def _process_one(pdf_path, options):
+    """工作进程中处理单个PDF，异常转换为失败记录"""
+    start_time = time.time()
+    record = {"pdf": pdf_path}
+    try:
+        record["output_dir"] = process_pdf(pdf_path, **options)
+        record["status"] = "done"
+    except Exception as e:
+        record["status"] = "failed"
+        record["error"] = str(e)
+    record["seconds"] = round(time.time() - start_time, 2)
+    record["finished_at"] = datetime.datetime.now().isoformat(timespec="seconds")
+    return record
+
+
+def process_batch(inputs, workers=None, manifest_path=DEFAULT_MANIFEST_PATH, **options):
+    """
+    批量处理PDF，已在清单中标记完成的文件会被跳过以支持断点续跑
+
+    Args:
+        inputs (list): 目录/glob/文件路径列表
+        workers (int, optional): 进程数，默认为可用CPU核数
+        manifest_path (str): JSONL清单路径，记录每个文件的状态与耗时
+        **options: 透传给analyze_pdf的选项（page_range/tables_only/detect_tables）
+
+    Returns:
+        list: 本次运行产生的记录列表
+    """
+    pdf_paths = collect_pdfs(inputs)
+    finished = {path for path, record in load_manifest(manifest_path).items() if record.get("status") == "done"}
+    pending = [path for path in pdf_paths if path not in finished]
+    print(f"共 {len(pdf_paths)} 个PDF，已完成 {len(pdf_paths) - len(pending)} 个，待处理 {len(pending)} 个")
+    if not pending:
+        return []
+
+    workers = min(workers or default_worker_count(), len(pending))
+    os.makedirs(os.path.dirname(os.path.abspath(manifest_path)), exist_ok=True)
+    records = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor, \
+            open(manifest_path, 'a', encoding='utf-8') as manifest:
+        futures = [executor.submit(_process_one, path, options) for path in pending]
+        for done_count, future in enumerate(as_completed(futures), start=1):
+            record = future.result()
+            # 每完成一个文件立即落盘，保证中断后可续跑
+            manifest.write(json.dumps(record, ensure_ascii=False) + "\n")
+            manifest.flush()
+            records.append(record)
+            print(f"[{done_count}/{len(pending)}] {record['status']} {record['seconds']}s {record['pdf']}")
+    return records
+
+
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="使用MinerU解析PDF")
+    parser.add_argument("inputs", nargs="*", help="PDF文件、目录或glob模式；为空时交互输入单个文件")
+    parser.add_argument("--workers", type=int, default=None, help="进程数，默认为可用CPU核数")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST_PATH, help="批处理清单路径")
+    parser.add_argument("--pages", default=None, help="页码范围（1开始），如 3-10,15")
+    parser.add_argument("--tables-only", action="store_true", help="去掉图片条目，跳过markdown和非表格图片")
+    parser.add_argument("--detect-tables", action="store_true", help="预扫描可能含表格的页面，只解析这些页面")
+    parser.add_argument("--routing", choices=ROUTING_MODES, default="page",
+                        help="page：逐页选择txt/ocr路线；document：整篇文档统一分类")
+    parser.add_argument("--image-store", action="store_true",
+                        help="图片写入按内容哈希寻址的共享图片库（config.yaml的images节），不再每次写入images目录")
+    args = parser.parse_args()
+    options = {"page_range": args.pages, "tables_only": args.tables_only, "detect_tables": args.detect_tables,
+               "routing": args.routing}
+    if args.image_store:
+        from imageStore import ImageStore
+        options["image_store"] = ImageStore.from_config()
+
+    if args.inputs:
+        batch_records = process_batch(args.inputs, workers=args.workers, manifest_path=args.manifest, **options)
+        failed = [r for r in batch_records if r["status"] != "done"]
+        print(f"批处理结束：成功 {len(batch_records) - len(failed)} 个，失败 {len(failed)} 个")
+        sys.exit(1 if failed else 0)
+
     # 直接在这里指定PDF文件路径
     pdf_path = input("请输入PDF文件路径: ")
 
@@ -62,5 +374,5 @@ if __name__ == "__main__":
         print(f"错误: 文件 '{pdf_path}' 不存在")
         sys.exit(1)
 
-    output_path = process_pdf(pdf_path)
+    output_path = process_pdf(pdf_path, **options)
     print(f"输出目录: {output_path}")
@@ -0,0 +1,619 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import socket
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from tablesnap import generate_markdown, summaries_checkpoint_path
+from extractTables import extract_tables
+from imageStore import ImageStore
+from stitchTables import stitch_tables
+from responseCache import ResponseCache
+from tableDedup import FingerprintStore
+from useMinerU import PARSE_WORKER_MEMORY_GB, RESULTS_DIR, analyze_pdf, collect_pdfs, default_parse_workers
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "common"))
+from metrics import registry
+
+logger = logging.getLogger("tablesnap.scheduler")
+
+DEFAULT_DB_PATH = os.path.join(RESULTS_DIR, "jobs.sqlite")
+DEFAULT_LLM_WORKERS = 2
+DEFAULT_QUEUE_SIZE = 2
+DEFAULT_POLL_INTERVAL = 5.0
+# 监视目录中最近修改过的文件可能仍在写入，稳定后再入队
+WATCH_SETTLE_SECONDS = 2.0
+# 处理中的任务超过该时长没有心跳，视为所属调度进程已退出，重新排队
+DEFAULT_STALE_SECONDS = 300.0
+# 解析进程异常退出（如内存不足被杀）时任务重新排队；无法确定是哪个任务导致的，
+# 受影响的任务之后单独解析，单独解析时仍多次导致进程池损坏的任务标记为失败
+MAX_POOL_CRASHES = 2
+
+STATUS_QUEUED = "queued"
+STATUS_PARSING = "parsing"
+STATUS_PARSED = "parsed"
+STATUS_SUMMARIZING = "summarizing"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+ACTIVE_STATUSES = (STATUS_PARSING, STATUS_PARSED, STATUS_SUMMARIZING)
+
+JOB_OPTIONS = ("pages", "detect_tables", "routing", "batch_summaries", "mode", "dedup", "keep_intermediate",
+               "no_stitch", "no_image_store")
+
+
+def load_scheduler_config(config_path="config.yaml"):
+    """加载scheduler节配置（队列路径、并发数、监视间隔）"""
+    import yaml
+
+    try:
+        with open(config_path, 'r') as f:
+            return (yaml.safe_load(f) or {}).get('scheduler', {}) or {}
+    except Exception as e:
+        logger.warning(f"读取调度配置失败，使用默认值: {str(e)}")
+        return {}
+
+
+def file_signature(pdf_path):
+    """文件大小和修改时间，同一路径的文件被替换后视为新任务"""
+    stat = os.stat(pdf_path)
+    return f"{stat.st_size}:{int(stat.st_mtime)}"
+
+
+def _owner_alive(owner):
+    """owner为本机进程时检查其是否仍在运行；其他主机的进程无法判断，视为存活"""
+    host, _, pid = (owner or "").rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class JobQueue:
+    """
+    基于SQLite的持久化任务队列
+
+    同一路径且内容签名（大小+修改时间）相同的PDF只入队一次；按优先级从高到低、
+    同优先级先入先出出队。领取的任务记录所属调度进程（owner），处理期间由该进程定期更新
+    heartbeat_at，多个调度进程共享同一队列时只回收心跳超时的任务。只应在创建它的线程中使用。
+
+    Args:
+        path (str): 数据库文件路径
+        owner (str, optional): 调度进程标识，默认为"主机名:进程号"
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH, owner=None):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+        self._conn = sqlite3.connect(path, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY,
+                pdf TEXT NOT NULL,
+                signature TEXT NOT NULL,
+                priority INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL,
+                options TEXT NOT NULL DEFAULT '{}',
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                parse_seconds REAL,
+                llm_seconds REAL,
+                tables INTEGER,
+                output_dir TEXT,
+                markdown TEXT,
+                error TEXT,
+                owner TEXT,
+                heartbeat_at REAL,
+                UNIQUE (pdf, signature)
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs (status, priority DESC, id);
+        """)
+        # 旧版本创建的队列没有owner/heartbeat_at列
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        with self._conn:
+            for column, column_type in (("owner", "TEXT"), ("heartbeat_at", "REAL")):
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+
+    @classmethod
+    def from_config(cls, config_path="config.yaml"):
+        return cls(load_scheduler_config(config_path).get("db", DEFAULT_DB_PATH))
+
+    def enqueue(self, pdf_path, priority=0, options=None):
+        """
+        添加任务，已存在相同文件的任务时不重复添加
+
+        Returns:
+            tuple: (任务ID, 是否新添加)
+        """
+        pdf_path = os.path.abspath(pdf_path)
+        signature = file_signature(pdf_path)
+        now = time.time()
+        with self._conn:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO jobs (pdf, signature, priority, status, options, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (pdf_path, signature, priority, STATUS_QUEUED, json.dumps(options or {}, ensure_ascii=False), now, now)
+            )
+        if cursor.rowcount:
+            return cursor.lastrowid, True
+        row = self._conn.execute("SELECT id FROM jobs WHERE pdf = ? AND signature = ?", (pdf_path, signature)).fetchone()
+        return row["id"], False
+
+    def claim_next(self):
+        """
+        取出优先级最高的排队任务，标记为解析中并记录为本进程所有
+
+        Returns:
+            dict: 任务记录，队列为空时返回None
+        """
+        with self._conn:
+            # IMMEDIATE事务保证多个调度进程不会领取同一任务
+            self._conn.execute("BEGIN IMMEDIATE")
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY priority DESC, id LIMIT 1", (STATUS_QUEUED,)
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, updated_at = ?, error = NULL, owner = ?, "
+                "heartbeat_at = ? WHERE id = ?",
+                (STATUS_PARSING, now, now, self.owner, now, row["id"])
+            )
+        job = dict(row)
+        job.update(status=STATUS_PARSING, owner=self.owner, heartbeat_at=now)
+        job["options"] = json.loads(job["options"])
+        return job
+
+    def update(self, job_id, **fields):
+        """更新任务字段（status/parse_seconds/markdown/error等）"""
+        fields["updated_at"] = time.time()
+        if fields.get("status") in (STATUS_DONE, STATUS_FAILED):
+            fields["finished_at"] = fields["updated_at"]
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        with self._conn:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def heartbeat(self):
+        """刷新本进程所有处理中任务的心跳时间，返回刷新的任务数"""
+        placeholders = ", ".join("?" for _ in ACTIVE_STATUSES)
+        with self._conn:
+            return self._conn.execute(
+                f"UPDATE jobs SET heartbeat_at = ? WHERE owner = ? AND status IN ({placeholders})",
+                (time.time(), self.owner, *ACTIVE_STATUSES)
+            ).rowcount
+
+    def requeue_stale(self, stale_seconds=DEFAULT_STALE_SECONDS):
+        """
+        将所属调度进程已退出的处理中任务重新排队
+
+        心跳超时、没有心跳记录，或所属进程在本机且已不存在的任务视为已退出；
+        后者不必等待超时，中断后在同一台机器上重新运行即可立即恢复。
+
+        Args:
+            stale_seconds (float): 心跳超时时长（秒）
+
+        Returns:
+            int: 重新排队的任务数
+        """
+        placeholders = ", ".join("?" for _ in ACTIVE_STATUSES)
+        now = time.time()
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            rows = self._conn.execute(
+                f"SELECT id, owner, heartbeat_at FROM jobs WHERE status IN ({placeholders})", ACTIVE_STATUSES
+            ).fetchall()
+            stale_ids = [
+                row["id"] for row in rows
+                if row["owner"] != self.owner and (
+                    row["heartbeat_at"] is None or row["heartbeat_at"] < now - stale_seconds
+                    or not _owner_alive(row["owner"])
+                )
+            ]
+            self._conn.executemany(
+                "UPDATE jobs SET status = ?, updated_at = ?, owner = NULL, heartbeat_at = NULL WHERE id = ?",
+                [(STATUS_QUEUED, now, job_id) for job_id in stale_ids]
+            )
+        return len(stale_ids)
+
+    def get(self, job_id):
+        row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list(self, status=None, limit=50):
+        """按ID倒序列出任务，可按状态筛选"""
+        if status:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY id DESC LIMIT ?", (status, limit)
+            ).fetchall()
+        else:
+            rows = self._conn.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def counts(self):
+        """各状态的任务数"""
+        return dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def requeue(self, job_id=None, statuses=(STATUS_FAILED,)):
+        """
+        将指定状态的任务重新排队
+
+        Args:
+            job_id (int, optional): 只处理该任务，默认处理所有匹配状态的任务
+            statuses (tuple): 需要重新排队的状态
+
+        Returns:
+            int: 重新排队的任务数
+        """
+        placeholders = ", ".join("?" for _ in statuses)
+        query = f"UPDATE jobs SET status = ?, updated_at = ? WHERE status IN ({placeholders})"
+        params = [STATUS_QUEUED, time.time(), *statuses]
+        if job_id is not None:
+            query += " AND id = ?"
+            params.append(job_id)
+        with self._conn:
+            return self._conn.execute(query, params).rowcount
+
+    def close(self):
+        self._conn.close()
+
+
+def parse_job(pdf_path, options):
+    """
+    工作进程中解析PDF并提取表格（CPU密集的前半段）
+
+    Returns:
+        tuple: (输出目录, 文档名, 表格列表, 耗时)
+    """
+    start_time = time.perf_counter()
+    # 工作进程长期复用，调度器不输出运行报告，每个任务开始前清空指标避免持续累积
+    registry.reset()
+    output_dir, name, content_list = analyze_pdf(
+        pdf_path, write_outputs=bool(options.get("keep_intermediate")), page_range=options.get("pages"),
+        tables_only=True, detect_tables=bool(options.get("detect_tables")),
+        routing=options.get("routing") or "page",
+        image_store=None if options.get("no_image_store") else ImageStore.from_config()
+    )
+    if options.get("no_stitch"):
+        tables = extract_tables(content_list)
+    else:
+        tables = stitch_tables(content_list)
+    return output_dir, name, tables, time.perf_counter() - start_time
+
+
+class PipelineScheduler:
+    """
+    多文档流水线调度器：进程池解析PDF，异步任务并发调用LLM
+
+    解析结果经有界队列交给LLM阶段，队列满时暂停领取新任务（背压），
+    因此第N+1个文档解析的同时第N个文档在生成标题和摘要，内存中最多积压queue_size个文档。
+
+    Args:
+        queue (JobQueue): 任务队列
+        parse_workers (int, optional): 解析进程数，默认按物理内存估算（1-2个）
+        llm_workers (int): 同时处于LLM阶段的文档数
+        queue_size (int): 已解析待总结文档的队列上限
+        cache (ResponseCache, optional): LLM响应缓存
+        watch_dir (str, optional): 监视目录，新PDF自动入队，调度器持续运行
+        poll_interval (float): 队列为空时的轮询间隔（秒）
+        watch_options (dict, optional): 监视目录入队任务的选项
+        watch_priority (int): 监视目录入队任务的优先级
+        stale_seconds (float): 处理中任务的心跳超时时长，超时的任务（包括其他调度进程的）重新排队
+    """
+
+    def __init__(self, queue, parse_workers=None, llm_workers=DEFAULT_LLM_WORKERS, queue_size=DEFAULT_QUEUE_SIZE,
+                 cache=None, watch_dir=None, poll_interval=DEFAULT_POLL_INTERVAL, watch_options=None,
+                 watch_priority=0, stale_seconds=DEFAULT_STALE_SECONDS):
+        self.queue = queue
+        self.parse_workers = parse_workers or default_parse_workers()
+        self.llm_workers = llm_workers
+        self.queue_size = queue_size
+        self.cache = cache
+        self.watch_dir = watch_dir
+        self.poll_interval = poll_interval
+        self.watch_options = watch_options or {}
+        self.watch_priority = watch_priority
+        self.stale_seconds = stale_seconds
+        self._executor = None
+        # 进程池损坏时在解析的任务 → 单独解析时导致损坏的次数
+        self._pool_crashes = {}
+        self._pool_state = None
+        self._in_flight = 0
+        self._exclusive = False
+
+    def scan_watch_dir(self):
+        """将监视目录中已写入完成的新PDF加入队列，返回新增任务数"""
+        added = 0
+        now = time.time()
+        for pdf_path in collect_pdfs([self.watch_dir]):
+            try:
+                if now - os.path.getmtime(pdf_path) < WATCH_SETTLE_SECONDS:
+                    continue
+                job_id, created = self.queue.enqueue(pdf_path, priority=self.watch_priority,
+                                                   options=self.watch_options)
+            except OSError as e:
+                logger.warning(f"跳过无法读取的文件 {pdf_path}: {e}")
+                continue
+            if created:
+                added += 1
+                logger.info(f"[任务{job_id}] 已入队 {pdf_path}")
+        return added
+
+    def _new_executor(self):
+        # 不预加载模型：每个进程在解析到txt/ocr页面时才加载对应的模型，只需文字层的任务不会加载OCR模型
+        return ProcessPoolExecutor(max_workers=self.parse_workers)
+
+    def _replace_broken_executor(self, executor):
+        """进程池损坏后所有待执行任务都会失败，替换为新的进程池；多个解析协程只替换一次"""
+        if self._executor is executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._new_executor()
+            logger.warning("解析进程异常退出，已重建进程池")
+
+    @contextlib.asynccontextmanager
+    async def _pool_slot(self, exclusive=False):
+        """占用进程池提交一个解析任务；exclusive时等其他任务解析完后单独占用，期间不提交其他任务"""
+        async with self._pool_state:
+            await self._pool_state.wait_for(
+                lambda: not self._exclusive and (not exclusive or self._in_flight == 0)
+            )
+            self._in_flight += 1
+            self._exclusive = exclusive
+        try:
+            yield
+        finally:
+            async with self._pool_state:
+                self._in_flight -= 1
+                if exclusive:
+                    self._exclusive = False
+                self._pool_state.notify_all()
+
+    async def _parse_loop(self, parsed_queue):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = self.queue.claim_next()
+            if job is None:
+                if self.watch_dir is None:
+                    return
+                if not self.scan_watch_dir():
+                    await asyncio.sleep(self.poll_interval)
+                continue
+
+            logger.info(f"[任务{job['id']}] 开始解析 {job['pdf']}")
+            # 曾遇到进程池损坏的任务单独解析，以确定是否由它导致
+            exclusive = job["id"] in self._pool_crashes
+            try:
+                async with self._pool_slot(exclusive):
+                    executor = self._executor
+                    output_dir, name, tables, seconds = await loop.run_in_executor(
+                        executor, parse_job, job["pdf"], job["options"]
+                    )
+            except BrokenProcessPool as e:
+                self._replace_broken_executor(executor)
+                crashes = self._pool_crashes.setdefault(job["id"], 0)
+                if exclusive:
+                    crashes = self._pool_crashes[job["id"]] = crashes + 1
+                if crashes < MAX_POOL_CRASHES:
+                    logger.warning(f"[任务{job['id']}] 解析进程异常退出，重新排队")
+                    self.queue.update(job["id"], status=STATUS_QUEUED)
+                else:
+                    logger.error(f"[任务{job['id']}] 单独解析时解析进程{crashes}次异常退出，标记为失败")
+                    self.queue.update(job["id"], status=STATUS_FAILED, error=f"{type(e).__name__}: {e}")
+                continue
+            except Exception as e:
+                logger.error(f"[任务{job['id']}] 解析失败: {e}")
+                self.queue.update(job["id"], status=STATUS_FAILED, error=f"{type(e).__name__}: {e}")
+                continue
+            self.queue.update(job["id"], status=STATUS_PARSED, parse_seconds=round(seconds, 3),
+                              tables=len(tables), output_dir=output_dir)
+            # 队列满时在此等待，解析进程不再领取新任务
+            await parsed_queue.put((job, output_dir, name, tables))
+
+    def _summarize(self, job, output_dir, name, tables):
+        """在线程中运行LLM阶段；指纹库的SQLite连接不能跨线程，按任务打开"""
+        options = job["options"]
+        dedup_store = FingerprintStore.from_config() if options.get("dedup") else None
+        try:
+            output_md, _ = generate_markdown(
+                tables, output_dir, name, cache=self.cache, batch_summaries=options.get("batch_summaries"),
+                mode=options.get("mode") or "two-pass", dedup_store=dedup_store,
+                keep_intermediate=bool(options.get("keep_intermediate")),
+                checkpoint_path=summaries_checkpoint_path(job["pdf"])
+            )
+        finally:
+            if dedup_store is not None:
+                dedup_store.close()
+        return output_md
+
+    async def _llm_loop(self, parsed_queue):
+        while True:
+            item = await parsed_queue.get()
+            if item is None:
+                return
+            job, output_dir, name, tables = item
+            self.queue.update(job["id"], status=STATUS_SUMMARIZING)
+            start_time = time.perf_counter()
+            try:
+                output_md = await asyncio.to_thread(self._summarize, job, output_dir, name, tables)
+            except Exception as e:
+                logger.error(f"[任务{job['id']}] 标题/摘要生成失败: {e}")
+                self.queue.update(job["id"], status=STATUS_FAILED, error=f"{type(e).__name__}: {e}",
+                                  llm_seconds=round(time.perf_counter() - start_time, 3))
+                continue
+            finally:
+                # 调度器不输出运行报告，清空本进程累积的LLM调用指标，常驻监视时内存不再增长
+                registry.reset()
+            self.queue.update(job["id"], status=STATUS_DONE, markdown=output_md,
+                              llm_seconds=round(time.perf_counter() - start_time, 3))
+            logger.info(f"[任务{job['id']}] 完成，结果文件：{output_md}")
+
+    async def _heartbeat_loop(self):
+        """定期刷新本进程任务的心跳，并回收已退出的调度进程遗留的任务"""
+        while True:
+            await asyncio.sleep(self.stale_seconds / 4)
+            self.queue.heartbeat()
+            recovered = self.queue.requeue_stale(self.stale_seconds)
+            if recovered:
+                logger.info(f"{recovered} 个所属调度进程已退出的任务已重新排队")
+
+    async def run(self):
+        """
+        运行调度器：无监视目录时处理完队列后返回，否则持续运行直到被中断
+
+        异常退出的调度进程遗留的处理中任务在心跳超时后重新排队；其他仍在运行的调度进程的任务不受影响。
+        """
+        recovered = self.queue.requeue_stale(self.stale_seconds)
+        if recovered:
+            logger.info(f"{recovered} 个未完成的任务已重新排队")
+        if self.watch_dir is not None:
+            self.scan_watch_dir()
+
+        parsed_queue = asyncio.Queue(maxsize=self.queue_size)
+        self._executor = self._new_executor()
+        self._pool_state = asyncio.Condition()
+        parsers = [asyncio.create_task(self._parse_loop(parsed_queue)) for _ in range(self.parse_workers)]
+        summarizers = [asyncio.create_task(self._llm_loop(parsed_queue)) for _ in range(self.llm_workers)]
+        heartbeat = asyncio.create_task(self._heartbeat_loop())
+        try:
+            await asyncio.gather(*parsers)
+            for _ in summarizers:
+                await parsed_queue.put(None)
+            await asyncio.gather(*summarizers)
+        finally:
+            heartbeat.cancel()
+            self._executor.shutdown()
+            self._executor = None
+        return self.queue.counts()
+
+
+def format_job(job):
+    """单行显示任务状态"""
+    timings = " ".join(
+        f"{label}={job[key]:.1f}s" for key, label in (("parse_seconds", "解析"), ("llm_seconds", "LLM"))
+        if job.get(key) is not None
+    )
+    detail = job.get("error") or job.get("markdown") or ""
+    tables = f"{job['tables']}表" if job.get("tables") is not None else ""
+    return f"{job['id']:>5} {job['status']:<11} p={job['priority']:<3} {tables:<6} {timings:<22} {job['pdf']}  {detail}"
+
+
+def _job_options(args):
+    return {key: getattr(args, key) for key in JOB_OPTIONS if getattr(args, key, None) not in (None, False)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TableSnap多文档流水线调度器")
+    parser.add_argument("--db", default=None, help="任务队列数据库路径，默认读取config.yaml或使用Results/jobs.sqlite")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_job_options(sub_parser):
+        sub_parser.add_argument("--priority", type=int, default=0, help="优先级，数值越大越先处理")
+        sub_parser.add_argument("--pages", default=None, help="页码范围（1开始），如 3-10,15")
+        sub_parser.add_argument("--detect-tables", action="store_true")
+        sub_parser.add_argument("--routing", choices=["page", "document"], default=None)
+        sub_parser.add_argument("--batch-summaries", action="store_true", default=None)
+        sub_parser.add_argument("--mode", choices=["two-pass", "fused"], default=None)
+        sub_parser.add_argument("--dedup", action="store_true")
+        sub_parser.add_argument("--keep-intermediate", action="store_true")
+        sub_parser.add_argument("--no-stitch", action="store_true", help="不拼接跨页续表")
+        sub_parser.add_argument("--no-image-store", action="store_true", help="表格截图写入本次输出目录")
+
+    add_parser = subparsers.add_parser("add", help="添加PDF任务")
+    add_parser.add_argument("inputs", nargs="+", help="PDF文件、目录或glob模式")
+    add_job_options(add_parser)
+
+    run_parser = subparsers.add_parser("run", help="运行调度器")
+    run_parser.add_argument("--parse-workers", type=int, default=None, help="解析进程数，默认按物理内存估算（1-2个）")
+    run_parser.add_argument("--llm-workers", type=int, default=None, help="同时生成标题/摘要的文档数")
+    run_parser.add_argument("--queue-size", type=int, default=None, help="已解析待总结文档的上限")
+    run_parser.add_argument("--watch", default=None, help="监视目录，新PDF自动入队并持续运行")
+    run_parser.add_argument("--poll-interval", type=float, default=None)
+    run_parser.add_argument("--stale-seconds", type=float, default=None,
+                            help="处理中任务的心跳超时时长，超时后重新排队")
+    run_parser.add_argument("--no-cache", action="store_true", help="忽略并且不写入响应缓存")
+    add_job_options(run_parser)
+
+    status_parser = subparsers.add_parser("status", help="查询任务状态")
+    status_parser.add_argument("job_id", nargs="?", type=int, help="任务ID，省略时列出最近的任务")
+    status_parser.add_argument("--status", default=None, help="按状态筛选")
+    status_parser.add_argument("--limit", type=int, default=50)
+    status_parser.add_argument("--json", action="store_true", help="以JSON输出")
+
+    retry_parser = subparsers.add_parser("retry", help="重新排队失败的任务")
+    retry_parser.add_argument("job_id", nargs="?", type=int, help="任务ID，省略时重试所有失败任务")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    config = load_scheduler_config()
+    job_queue = JobQueue(args.db or config.get("db", DEFAULT_DB_PATH))
+    try:
+        if args.command == "add":
+            pdf_paths = collect_pdfs(args.inputs)
+            if not pdf_paths:
+                print("错误: 未找到PDF文件")
+                sys.exit(1)
+            for pdf_path in pdf_paths:
+                job_id, created = job_queue.enqueue(pdf_path, priority=args.priority, options=_job_options(args))
+                print(f"{'已入队' if created else '已存在'} 任务{job_id}: {pdf_path}")
+
+        elif args.command == "run":
+            cache = None if args.no_cache else ResponseCache.from_config()
+            scheduler = PipelineScheduler(
+                job_queue,
+                parse_workers=args.parse_workers or config.get("parse_workers") or default_parse_workers(
+                    config.get("worker_memory_gb", PARSE_WORKER_MEMORY_GB)
+                ),
+                llm_workers=args.llm_workers or config.get("llm_workers", DEFAULT_LLM_WORKERS),
+                queue_size=args.queue_size or config.get("queue_size", DEFAULT_QUEUE_SIZE),
+                cache=cache,
+                watch_dir=args.watch,
+                poll_interval=args.poll_interval or config.get("poll_interval", DEFAULT_POLL_INTERVAL),
+                watch_options=_job_options(args),
+                watch_priority=args.priority,
+                stale_seconds=args.stale_seconds or config.get("stale_seconds", DEFAULT_STALE_SECONDS),
+            )
+            try:
+                counts = asyncio.run(scheduler.run())
+                print(f"调度结束：{counts}")
+            except KeyboardInterrupt:
+                print("已中断，未完成的任务将在下次运行时重新排队")
+            finally:
+                if cache is not None:
+                    cache.close()
+
+        elif args.command == "status":
+            if args.job_id is not None:
+                jobs = [job for job in [job_queue.get(args.job_id)] if job]
+                if not jobs:
+                    print(f"错误: 任务{args.job_id}不存在")
+                    sys.exit(1)
+            else:
+                jobs = job_queue.list(status=args.status, limit=args.limit)
+            if args.json:
+                print(json.dumps(jobs, ensure_ascii=False, indent=2))
+            else:
+                print(f"各状态任务数: {job_queue.counts()}")
+                for job in jobs:
+                    print(format_job(job))
+
+        elif args.command == "retry":
+            print(f"{job_queue.requeue(args.job_id)} 个任务已重新排队")
+    finally:
+        job_queue.close()
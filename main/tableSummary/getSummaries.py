@@ -1,143 +1,43 @@
-from openai import OpenAI
 import os
+import sys
 import json
-import re
+import hashlib
 import logging
 import time
-from tqdm import tqdm
-import yaml  # 新增导入
-
-# 设置日志
-logging.basicConfig(level=logging.INFO, 
-                    format='%(asctime)s - %(levelname)s - %(message)s',
-                    handlers=[
-                        logging.StreamHandler()
-                    ])
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from jsonExtract import extract_json_from_response
+from modelRouter import get_router
+from responseCache import ResponseCache, make_cache_key
+from tableEncoder import encode_table
+from tokenBudget import estimate_tokens, pack_batches
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "common"))
+from jsonStream import JsonlWriter, iter_jsonl
+from tableModel import ParsedTable, format_key_metrics
+
 logger = logging.getLogger(__name__)
 
-def extract_json_from_response(response_text, target_field=None, logger=None):
-    """
-    从API响应中提取JSON数据，具有多层级回退策略
-    
-    Args:
-        response_text (str): 原始响应文本
-        target_field (str, optional): 需要提取的特定字段，不指定则返回整个JSON
-        logger (logging.Logger, optional): 日志记录器
-    
-    Returns:
-        dict/str: 提取的JSON数据或指定字段值
-    
-    Raises:
-        ValueError: 当所有提取方法都失败时抛出
-    """
-    if logger is None:
-        import logging
-        logger = logging.getLogger(__name__)
-    
-    logger.debug("开始从响应中提取JSON")
-    
-    # 策略1: 尝试提取```json和```之间的内容
-    try:
-        # 处理可能存在的多种代码块格式
-        json_pattern = r"```(?:json)?\s*([\s\S]*?)```"
-        matches = re.findall(json_pattern, response_text)
-        
-        if matches:
-            for match in matches:
-                try:
-                    json_str = match.strip()
-                    content_json = json.loads(json_str)
-                    logger.debug("成功从代码块中提取JSON字符串")
-                    return content_json[target_field] if target_field else content_json
-                except:
-                    continue
-    except Exception as e:
-        logger.warning(f"从代码块提取JSON失败: {str(e)}")
-    
-    # 策略2: 尝试直接解析整个响应
-    try:
-        content_json = json.loads(response_text)
-        logger.debug("成功解析整个响应为JSON")
-        return content_json[target_field] if target_field else content_json
-    except Exception as e:
-        logger.warning(f"直接解析响应为JSON失败: {str(e)}")
-    
-    # 策略3: 尝试查找和提取JSON对象
-    try:
-        pattern = r'{[\s\S]*}'
-        match = re.search(pattern, response_text)
-        if match:
-            json_str = match.group(0)
-            content_json = json.loads(json_str)
-            logger.debug("通过正则表达式提取JSON对象成功")
-            return content_json[target_field] if target_field else content_json
-    except Exception as e:
-        logger.warning(f"通过正则表达式提取JSON对象失败: {str(e)}")
-    
-    # 策略4: 如果指定了目标字段，尝试直接提取该字段
-    if target_field:
-        try:
-            # 尝试匹配 "field": "value" 或 "field":"value" 模式
-            pattern = f'"{target_field}"\\s*:\\s*"([^"]*)"'
-            match = re.search(pattern, response_text)
-            if match:
-                extracted_value = match.group(1)
-                logger.debug(f"通过正则表达式成功提取 {target_field} 字段")
-                return extracted_value
-                
-            # 尝试匹配 "field": 数值 模式
-            pattern = f'"{target_field}"\\s*:\\s*([0-9.]+)'
-            match = re.search(pattern, response_text)
-            if match:
-                extracted_value = match.group(1)
-                try:
-                    # 尝试转换为数值
-                    if '.' in extracted_value:
-                        return float(extracted_value)
-                    else:
-                        return int(extracted_value)
-                except:
-                    return extracted_value
-        except Exception as e:
-            logger.warning(f"通过正则表达式提取字段失败: {str(e)}")
-    
-    # 记录详细的错误信息
-    logger.error("所有JSON提取方法均失败")
-    logger.error(f"原始响应: {response_text[:100]}...")
-    
-    raise ValueError(f"无法从响应中提取有效的JSON数据或{target_field}字段")
+# 默认并发请求数（可通过config.yaml中的api.max_workers覆盖）
+DEFAULT_MAX_WORKERS = 8
 
-# 新增配置加载函数
-def load_config(config_path="config.yaml"):
-    try:
-        with open(config_path, 'r') as f:
-            config = yaml.safe_load(f)
-            return config.get('api', {})
-    except Exception as e:
-        logging.error(f"加载配置文件失败: {str(e)}")
-        return {}
+# 批量摘要模式的默认参数（可通过config.yaml中的summary节覆盖）
+DEFAULT_BATCH_TOKEN_BUDGET = 3000
+DEFAULT_MAX_BATCH_TABLES = 8
 
-def generate_table_summary(json_file_path):
-    # 加载配置
-    api_config = load_config()
-    
-    client = OpenAI(
-        api_key=api_config.get("key"),  # 从配置获取
-        base_url=api_config.get("base_url")  # 从配置获取
-    )
-    
-    logger.info(f"开始处理JSON文件: {json_file_path}")
-    
-    try:
-        with open(json_file_path, 'r', encoding='utf-8') as file:
-            # 修正点：获取tables数组
-            data = json.load(file)
-            tables_data = data.get("tables", [])  # 从根对象获取tables数组
-        
-        valid_tables = [(idx, t) for idx, t in enumerate(tables_data) if t['type'] == 'table']
-        
-        # 新增分析prompt模板
-        analysis_prompt_template = """
+FAILED_SUMMARY = "分析生成失败"
+
+# 附加到prompt的预计算同比指标上限
+DEFAULT_MAX_KEY_METRICS = 20
+# 启用预计算指标时追加的说明（同时参与缓存键计算）
+KEY_METRICS_NOTE = """
+        表格数据末尾的"同比指标"已由程序预先计算，可直接引用，无需自行计算增长率。
+        """
+
+SUMMARY_MODEL = "qwen-plus"
+SUMMARY_TEMPERATURE = 0.2
+
+# 分析prompt模板
+SUMMARY_PROMPT_TEMPLATE = """
         请分析以下财务表格，生成包含以下要素的100-200字摘要：
         1. 表格主要内容（损益/资产负债/现金流等）
         2. 关键数据指标（收入/利润/增长率等） 
@@ -150,7 +50,7 @@ def generate_table_summary(json_file_path):
         - 突出关键数据变化
         - 避免重复表格标题内容
         
-        表格数据：
+        表格数据（单元格以|分隔）：
         {table_data}
         
         请返回JSON格式：
@@ -159,60 +59,388 @@ def generate_table_summary(json_file_path):
         }}
         """
 
-        # 新增进度条
-        progress_bar = tqdm(
-            valid_tables, 
-            desc="分析表格进度", 
-            unit="table",
-            dynamic_ncols=True
-        )
+# 批量分析prompt模板
+BATCH_SUMMARY_PROMPT_TEMPLATE = """
+        请分别分析以下{table_count}个财务表格，为每个表格生成包含以下要素的100-200字摘要：
+        1. 表格主要内容（损益/资产负债/现金流等）
+        2. 关键数据指标（收入/利润/增长率等） 
+        3. 时间范围对比（如有）
+        4. 业务板块表现（如有）
+        5. 重要财务比率（如有）
+        
+        要求：
+        - 使用专业财务术语但保持简洁
+        - 突出关键数据变化
+        - 避免重复表格标题内容
+        - 每个表格单独成段，不要合并多个表格
+        
+        表格数据列表（每个表格以[索引]开头，单元格以|分隔）：
+        {table_data}
+        
+        请返回JSON格式，必须包含全部{table_count}个索引：
+        {{
+            "summaries": {{
+                "0": "该表展示......",
+                "1": "该表展示......"
+            }}
+        }}
+        """
 
-        for table_idx, table in progress_bar:
+# 新增配置加载函数
+def load_config(config_path="config.yaml"):
+    import yaml
+
+    try:
+        with open(config_path, 'r') as f:
+            config = yaml.safe_load(f)
+            return config.get('api', {})
+    except Exception as e:
+        logging.error(f"加载配置文件失败: {str(e)}")
+        return {}
+
+def load_summary_config(config_path="config.yaml"):
+    """加载summary节配置（批量模式开关与打包参数）"""
+    import yaml
+
+    try:
+        with open(config_path, 'r') as f:
+            return (yaml.safe_load(f) or {}).get('summary', {}) or {}
+    except Exception as e:
+        logging.error(f"加载配置文件失败: {str(e)}")
+        return {}
+
+def encode_summary_table(table, key_metrics=False, max_metrics=DEFAULT_MAX_KEY_METRICS):
+    """
+    编码摘要prompt中的表格数据，可附带预先计算的同比指标
+
+    Args:
+        table (dict): 表格字典
+        key_metrics (bool): 是否附加同比指标
+        max_metrics (int): 最多附加的指标数
+
+    Returns:
+        str: 表格紧凑文本
+    """
+    table_data = encode_table(table)
+    if not key_metrics:
+        return table_data
+    try:
+        metrics = ParsedTable.from_table(table).key_metrics(limit=max_metrics)
+    except ImportError as e:
+        logger.warning(f"跳过同比指标计算: {str(e)}")
+        return table_data
+    if metrics:
+        table_data += "\n同比指标:\n" + format_key_metrics(metrics)
+    return table_data
+
+def table_content(table):
+    """
+    表格内容的紧凑文本，作为缓存键和检查点键的输入
+
+    只包含表题、表体和脚注，不含LLM生成的title以及summary、img_path、page_idx，
+    因此重新生成标题、回填失败标记或图片路径变化都不会改变键。
+    """
+    return encode_table({field: table.get(field) for field in ("table_caption", "table_body", "table_footnote")})
+
+def table_checkpoint_key(table):
+    """表格内容的哈希，用于确认检查点记录对应同一表格"""
+    return hashlib.sha256(table_content(table).encode('utf-8')).hexdigest()
+
+def apply_checkpoint(tables_data, checkpoint_path):
+    """
+    将JSONL检查点中的结果回填到表格列表
+
+    同一表格有多条记录时，成功的摘要优先于失败标记。
+
+    Args:
+        tables_data (list): 表格列表（原地补充summary字段）
+        checkpoint_path (str): 检查点文件路径
+
+    Returns:
+        set: 已成功生成摘要的表格索引
+    """
+    done = set()
+    if not checkpoint_path or not os.path.exists(checkpoint_path):
+        return done
+
+    keys = {}
+    for record in iter_jsonl(checkpoint_path):
+        idx = record.get("idx")
+        if not isinstance(idx, int) or not 0 <= idx < len(tables_data):
+            continue
+        if idx not in keys:
+            keys[idx] = table_checkpoint_key(tables_data[idx])
+        if record.get("key") != keys[idx]:
+            continue
+        summary = record.get("summary", FAILED_SUMMARY)
+        if summary != FAILED_SUMMARY:
+            tables_data[idx]["summary"] = summary
+            done.add(idx)
+        elif idx not in done:
+            tables_data[idx]["summary"] = FAILED_SUMMARY
+    return done
+
+def summarize_tables(tables_data, max_workers=None, cache=None, checkpoint_path=None, batch_mode=None):
+    """
+    并发为内存中的表格列表生成摘要
+
+    指定检查点时，每个表格完成后立即追加到JSONL检查点；重新运行时跳过已成功的表格，
+    只重新请求缺失或标记为"分析生成失败"的表格。
+
+    批量模式下，小表格按token预算打包进同一请求，返回 {"summaries": {"0": ...}}；
+    响应中缺失的索引会逐个单独重新请求。
+
+    Args:
+        tables_data (list): 表格列表（原地补充summary字段）
+        max_workers (int, optional): 最大并发请求数，不指定则读取config.yaml中的api.max_workers
+        cache (ResponseCache, optional): 响应缓存，命中时跳过API调用
+        checkpoint_path (str, optional): JSONL检查点文件路径
+        batch_mode (bool, optional): 是否启用批量模式，不指定则读取config.yaml中的summary.batch_mode
+
+    Returns:
+        list: 按原顺序补充summary字段后的表格列表
+    """
+    from tqdm import tqdm
+
+    # 加载配置
+    api_config = load_config()
+    
+    # 按任务和prompt大小选择模型、在端点间故障转移的客户端
+    client = get_router(
+        api_key=api_config.get("key"),  # 从配置获取
+        base_url=api_config.get("base_url")  # 从配置获取
+    )
+    # 并发上限：优先使用传入参数，其次使用配置文件
+    max_workers = max(1, int(max_workers or api_config.get("max_workers", DEFAULT_MAX_WORKERS)))
+    summary_config = load_summary_config()
+    if batch_mode is None:
+        batch_mode = summary_config.get("batch_mode", False)
+    key_metrics = summary_config.get("key_metrics", False)
+    max_metrics = summary_config.get("max_key_metrics", DEFAULT_MAX_KEY_METRICS)
+    prompt_note = KEY_METRICS_NOTE if key_metrics else ""
+    
+    try:
+        done = apply_checkpoint(tables_data, checkpoint_path)
+        valid_tables = [(idx, t) for idx, t in enumerate(tables_data) if t['type'] == 'table' and idx not in done]
+        if done:
+            logger.info(f"从检查点恢复 {len(done)} 个表格，剩余 {len(valid_tables)} 个待处理")
+        
+        def summary_cache_key(table, label):
+            # 批量与单表模式共用按表格计算的缓存键，包含实际处理请求的模型和端点
+            return make_cache_key(label, SUMMARY_TEMPERATURE, SUMMARY_PROMPT_TEMPLATE + prompt_note,
+                                  table_content(table))
+
+        def parse_summary(response_content):
+            summary = extract_json_from_response(response_content, target_field="summary")
+            if not isinstance(summary, str) or not summary.strip():
+                raise ValueError("响应中的summary字段为空")
+            return summary
+
+        def summary_messages(table):
+            return [
+                {"role": "system", "content": "你是财务分析师，擅长提炼表格核心信息"},
+                {"role": "user", "content": SUMMARY_PROMPT_TEMPLATE.format(
+                    table_data=encode_summary_table(table, key_metrics, max_metrics)
+                ) + prompt_note}
+            ]
+
+        def single_route(table):
+            # 单表请求的路由参数，批量模式按它查找和写入缓存
+            return {"task": "summary", "model": SUMMARY_MODEL, "messages": summary_messages(table)}
+
+        def analyze_table(table, check_cache=True):
+            # 单个表格分析（在工作线程中执行），路由器选定候选后先查该候选的缓存
+            summary, _ = client.complete(
+                parse_summary,
+                cache=cache,
+                cache_key=lambda label: summary_cache_key(table, label),
+                use_cached=check_cache,
+                task="summary",
+                model=SUMMARY_MODEL,
+                temperature=SUMMARY_TEMPERATURE,  # 适当提高创造性
+                response_format={"type": "json_object"},
+                messages=summary_messages(table),
+            )
+            return summary
+
+        def analyze_one(table_idx, table, check_cache=True):
+            try:
+                return [(table_idx, analyze_table(table, check_cache))]
+            except Exception as e:
+                logger.error(f"表格{table_idx}分析失败: {str(e)}")
+                return [(table_idx, FAILED_SUMMARY)]
+
+        def analyze_batch(batch):
+            # 多表格合并为一次请求，缓存命中的表格不再发送
+            results, pending = [], []
+            for table_idx, table in batch:
+                cached = client.cached(
+                    cache, lambda label: summary_cache_key(table, label), parse_summary,
+                    **single_route(table)
+                ) if cache is not None else None
+                if cached is not None:
+                    results.append((table_idx, cached[0]))
+                else:
+                    pending.append((table_idx, table))
+            if len(pending) <= 1:
+                for table_idx, table in pending:
+                    results.extend(analyze_one(table_idx, table, check_cache=False))
+                return results
+
+            summaries, label = {}, None
             try:
-                # 更新进度条描述
-                progress_bar.set_postfix({"当前表格": f"{table_idx+1}/{len(valid_tables)}"})
-                
-                # 单个表格分析
-                response = client.chat.completions.create(
-                    model="qwen-plus",
-                    temperature=0.2,  # 适当提高创造性
+                summaries, label = client.complete(
+                    lambda content: extract_json_from_response(content, target_field="summaries"),
+                    task="summary",
+                    model=SUMMARY_MODEL,
+                    temperature=SUMMARY_TEMPERATURE,
                     response_format={"type": "json_object"},
                     messages=[
                         {"role": "system", "content": "你是财务分析师，擅长提炼表格核心信息"},
-                        {"role": "user", "content": analysis_prompt_template.format(
-                            table_data=json.dumps(table, ensure_ascii=False)
-                        )}
+                        {"role": "user", "content": BATCH_SUMMARY_PROMPT_TEMPLATE.format(
+                            table_count=len(pending),
+                            table_data="\n\n".join(
+                                f"[{local_idx}]\n{encode_summary_table(table, key_metrics, max_metrics)}"
+                                for local_idx, (_, table) in enumerate(pending)
+                            )
+                        ) + prompt_note}
                     ],
                 )
-                analysis_result = json.loads(response.choices[0].message.content)
-                
-                # 新增summary字段
-                tables_data[table_idx]["summary"] = analysis_result.get("summary", "分析生成失败")
-
             except Exception as e:
-                logger.error(f"表格{table_idx}分析失败: {str(e)}")
-                tables_data[table_idx]["summary"] = "分析生成失败"
-        
+                logger.error(f"批量分析失败，{len(pending)}个表格改为单独请求: {str(e)}")
+
+            missing = []
+            for local_idx, (table_idx, table) in enumerate(pending):
+                summary = summaries.get(str(local_idx)) if isinstance(summaries, dict) else None
+                if isinstance(summary, str) and summary.strip():
+                    results.append((table_idx, summary.strip()))
+                    if cache is not None:
+                        # 按单表响应的格式、单表请求的路由标签缓存，与上面的查找及单表模式一致；
+                        # 批量请求路由到单表档位之外的模型时，记在单表档位的首选标签下
+                        labels = client.route_labels(**single_route(table))
+                        cache.put(summary_cache_key(table, label if label in labels else labels[0]),
+                                  json.dumps({"summary": summary.strip()}, ensure_ascii=False))
+                else:
+                    missing.append((table_idx, table))
+            # 校验：缺失的索引逐个单独重新请求
+            if missing and summaries:
+                logger.warning(f"批量响应缺少{len(missing)}个索引，单独重新请求")
+            for table_idx, table in missing:
+                results.extend(analyze_one(table_idx, table, check_cache=False))
+            return results
+
+        def run_task(task):
+            return analyze_one(*task[0]) if len(task) == 1 else analyze_batch(task)
+
+        if batch_mode:
+            # 按表格大小自适应打包：小表格多装，大表格独占一个请求
+            tasks = pack_batches(
+                valid_tables,
+                lambda item: estimate_tokens(encode_summary_table(item[1], key_metrics, max_metrics)),
+                summary_config.get("batch_token_budget", DEFAULT_BATCH_TOKEN_BUDGET),
+                max_items=summary_config.get("max_batch_tables", DEFAULT_MAX_BATCH_TABLES)
+            )
+            logger.info(f"批量模式：{len(valid_tables)}个表格合并为{len(tasks)}个请求")
+        else:
+            tasks = [[item] for item in valid_tables]
+
+        # 新增进度条（按完成顺序推进）
+        progress_bar = tqdm(
+            total=len(valid_tables), 
+            desc="分析表格进度", 
+            unit="table",
+            dynamic_ncols=True
+        )
+
+        checkpoint = JsonlWriter(checkpoint_path) if checkpoint_path else None
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(run_task, task) for task in tasks]
+                done_count = 0
+                for future in as_completed(futures):
+                    for table_idx, summary in future.result():
+                        # 按原始索引回填，保证输出顺序与输入一致
+                        tables_data[table_idx]["summary"] = summary
+                        # 每完成一个表格立即写入检查点
+                        if checkpoint is not None:
+                            checkpoint.write({
+                                "idx": table_idx,
+                                "key": table_checkpoint_key(tables_data[table_idx]),
+                                "summary": summary,
+                            })
+                        done_count += 1
+                        progress_bar.update(1)
+                        progress_bar.set_postfix({"已完成": f"{done_count}/{len(valid_tables)}"})
+        finally:
+            if checkpoint is not None:
+                checkpoint.close()
+        progress_bar.close()
         return tables_data
 
+    except Exception as e:
+        logger.error(f"生成表格摘要失败: {str(e)}")
+        raise
+
+def load_tables(json_file_path):
+    """读取含tables数组的JSON文件"""
+    with open(json_file_path, 'r', encoding='utf-8') as file:
+        # 修正点：获取tables数组
+        data = json.load(file)
+        return data.get("tables", [])  # 从根对象获取tables数组
+
+def generate_table_summary(json_file_path, max_workers=None, cache=None, checkpoint_path=None, batch_mode=None):
+    """
+    从JSON文件并发生成表格摘要
+
+    Args:
+        json_file_path (str): 含tables数组的JSON文件路径
+        max_workers (int, optional): 最大并发请求数，不指定则读取config.yaml中的api.max_workers
+        cache (ResponseCache, optional): 响应缓存，命中时跳过API调用
+        checkpoint_path (str, optional): JSONL检查点文件路径，用于中断后续跑
+        batch_mode (bool, optional): 是否将多个小表格合并为一次请求
+
+    Returns:
+        list: 按原顺序补充summary字段后的表格列表
+    """
+    logger.info(f"开始处理JSON文件: {json_file_path}")
+    
+    try:
+        tables_data = load_tables(json_file_path)
     except Exception as e:
         logger.error(f"处理JSON文件失败: {str(e)}")
         raise
 
+    return summarize_tables(tables_data, max_workers=max_workers, cache=cache,
+                            checkpoint_path=checkpoint_path, batch_mode=batch_mode)
+
 # 更新主函数
 if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="表格摘要生成工具")
+    parser.add_argument("--no-cache", action="store_true", help="忽略并且不写入响应缓存")
+    parser.add_argument("--checkpoint", default=None, help="JSONL检查点路径，默认与输出文件同目录")
+    parser.add_argument("--batch", action="store_true", default=None, help="将多个小表格合并为一次请求")
+    args = parser.parse_args()
+
     # 设置输入输出路径
     input_json_path = "/home/curio/workspace/python-projects/TableSnap/output/20250425_183046_73b4d7c7/康师傅2024_table_titles.json"
     output_json_path = "/home/curio/workspace/python-projects/TableSnap/output/20250425_183046_73b4d7c7/康师傅2024_table_summaries.json"
+    checkpoint_path = args.checkpoint or f"{os.path.splitext(output_json_path)[0]}_checkpoint.jsonl"
     
     logger.info("表格摘要生成工具启动")
+    cache = None if args.no_cache else ResponseCache.from_config()
     
     try:
         # 生成摘要
         start_time = time.time()
-        summaries = generate_table_summary(input_json_path)
+        generate_table_summary(input_json_path, cache=cache, checkpoint_path=checkpoint_path, batch_mode=args.batch)
         
-        # 保存结果
+        # 由检查点重建最终结果并保存
+        summaries = load_tables(input_json_path)
+        apply_checkpoint(summaries, checkpoint_path)
         with open(output_json_path, 'w', encoding='utf-8') as f:
             json.dump({"tables": summaries}, f, ensure_ascii=False, indent=2)
             
@@ -222,8 +450,12 @@ if __name__ == "__main__":
         time_used = time.time() - start_time
         
         logger.info(f"处理完成！成功处理 {success_count}/{total_tables} 个表格")
-        logger.info(f"平均处理速度：{time_used/total_tables:.2f}秒/表格")
+        logger.info(f"平均处理速度：{time_used/max(total_tables, 1):.2f}秒/表格")
         logger.info(f"结果文件已保存至：{output_json_path}")
+        logger.info(cache.stats() if cache is not None else "缓存已禁用")
         
     except Exception as e:
         logger.exception(f"主流程执行失败: {e}")
+    finally:
+        if cache is not None:
+            cache.close()
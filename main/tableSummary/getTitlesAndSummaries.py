@@ -0,0 +1,239 @@
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from getSummaries import FAILED_SUMMARY, load_config
+from getTitles import clean_title
+from jsonExtract import extract_json_from_response
+from modelRouter import get_router
+from responseCache import ResponseCache, make_cache_key
+from tableEncoder import encode_table, encode_table_list
+from tokenBudget import estimate_tokens, pack_batches
+
+logger = logging.getLogger(__name__)
+
+FUSED_MODEL = "qwen-plus"
+FUSED_TEMPERATURE = 0.2
+FAILED_TITLE = "标题生成失败"
+
+# 单批次输入token预算与表格数上限（可通过config.yaml中的fused节覆盖）
+DEFAULT_TOKEN_BUDGET = 6000
+DEFAULT_MAX_BATCH_TABLES = 8
+DEFAULT_MAX_WORKERS = 8
+
+# 标题+摘要合并prompt模板
+FUSED_PROMPT_TEMPLATE = """
+        请为以下{table_count}个财务表格分别生成标题和摘要，严格按照JSON格式返回，必须包含全部索引：
+        {{
+          "results": {{
+            "0": {{"title": "表格1标题", "summary": "该表展示......"}},
+            "1": {{"title": "表格2标题", "summary": "该表展示......"}}
+          }}
+        }}
+
+        标题要求：
+        1. 10-20个连续中文字符（不要使用空格或符号分隔）
+        2. 包含关键财务指标（如合并损益表/资产负债表等）
+        3. 体现时间范围（2024年度/2023-2024等）
+        4. 业务板块信息（如有：方便面/饮料/其他业务）
+
+        摘要要求（100-200字）：
+        1. 表格主要内容（损益/资产负债/现金流等）
+        2. 关键数据指标（收入/利润/增长率等）
+        3. 时间范围对比、业务板块表现、重要财务比率（如有）
+        - 使用专业财务术语但保持简洁，突出关键数据变化，避免重复标题内容
+
+        表格数据列表（每个表格以[索引]开头，单元格以|分隔）：
+        {table_data}
+        """
+
+
+def load_fused_config(config_path="config.yaml"):
+    """加载fused节配置"""
+    import yaml
+
+    try:
+        with open(config_path, 'r') as f:
+            return (yaml.safe_load(f) or {}).get('fused', {}) or {}
+    except Exception as e:
+        logging.error(f"加载配置文件失败: {str(e)}")
+        return {}
+
+
+def _valid_result(result):
+    return (
+        isinstance(result, dict)
+        and isinstance(result.get("title"), str) and result["title"].strip()
+        and isinstance(result.get("summary"), str) and result["summary"].strip()
+    )
+
+
+def request_fused_batch(client, batch_tables, cache=None):
+    """
+    为单个批次请求标题和摘要
+
+    Args:
+        client (ModelRouter): 模型路由器
+        batch_tables (list): 批次内的表格数据列表，批次内索引从0开始
+        cache (ResponseCache, optional): 响应缓存
+
+    Returns:
+        dict: 批次内索引字符串到 {"title", "summary"} 的映射，只包含有效条目
+    """
+    def parse_results(response_content):
+        results = extract_json_from_response(response_content, target_field="results")
+        if not isinstance(results, dict):
+            results = {}
+        return {key: value for key, value in results.items() if _valid_result(value)}
+
+    # 缓存键包含实际处理请求的模型和端点；只有全部索引有效时才缓存整批响应
+    valid, _ = client.complete(
+        parse_results,
+        cache=cache,
+        cache_key=lambda label: make_cache_key(label, FUSED_TEMPERATURE, FUSED_PROMPT_TEMPLATE, batch_tables),
+        cacheable=lambda valid_results: len(valid_results) == len(batch_tables),
+        task="fused",
+        model=FUSED_MODEL,
+        temperature=FUSED_TEMPERATURE,
+        response_format={"type": "json_object"},
+        messages=[
+            {"role": "system", "content": "你是财务分析师，为表格生成紧凑无空格的中文标题并提炼核心信息"},
+            {"role": "user", "content": FUSED_PROMPT_TEMPLATE.format(
+                table_count=len(batch_tables),
+                table_data=encode_table_list(batch_tables)
+            )}
+        ],
+    )
+    return valid
+
+
+def generate_titles_and_summaries(tables_data, cache=None, max_workers=None):
+    """
+    单次结构化调用同时生成标题和摘要，省去一整轮LLM调用
+
+    标题沿用getTitles的清洗与编号规则（"序号.标题"），输出可直接交给
+    toMarkdown.json_to_markdown。批次响应中缺失的索引会逐个单独重新请求。
+
+    Args:
+        tables_data (list): 表格列表（原地补充title/summary字段）
+        cache (ResponseCache, optional): 响应缓存
+        max_workers (int, optional): 最大并发批次数，不指定则读取config.yaml中的api.max_workers
+
+    Returns:
+        list: 补充title/summary字段后的表格列表
+    """
+    from tqdm import tqdm
+
+    api_config = load_config()
+    fused_config = load_fused_config()
+    client = get_router(api_key=api_config.get("key"), base_url=api_config.get("base_url"))
+    max_workers = max(1, int(max_workers or api_config.get("max_workers", DEFAULT_MAX_WORKERS)))
+
+    valid_tables = [(idx, t) for idx, t in enumerate(tables_data) if t['type'] == 'table']
+    if not valid_tables:
+        logger.warning("未找到有效表格数据")
+        return []
+
+    # 批次元素为(全局序号, (原始索引, 表格))
+    batches = pack_batches(
+        list(enumerate(valid_tables)),
+        lambda item: estimate_tokens(encode_table(item[1][1])),
+        fused_config.get("token_budget", DEFAULT_TOKEN_BUDGET),
+        max_items=fused_config.get("max_batch_tables", DEFAULT_MAX_BATCH_TABLES)
+    )
+    logger.info(f"合并模式：{len(valid_tables)}个表格分为{len(batches)}个批次")
+
+    def run_batch(batch):
+        tables = [item[1][1] for item in batch]
+        try:
+            results = request_fused_batch(client, tables, cache)
+        except Exception as e:
+            logger.error(f"批量标题摘要生成失败，{len(batch)}个表格改为单独请求: {str(e)}")
+            results = {}
+
+        merged = []
+        for local_idx, item in enumerate(batch):
+            result = results.get(str(local_idx))
+            if result is None and len(batch) > 1:
+                # 缺失的索引单独重新请求
+                try:
+                    result = request_fused_batch(client, [item[1][1]], cache).get("0")
+                except Exception as e:
+                    logger.error(f"表格{item[1][0]}标题摘要生成失败: {str(e)}")
+            merged.append((item, result))
+        return merged
+
+    progress_bar = tqdm(total=len(valid_tables), desc="标题摘要进度", unit="table", dynamic_ncols=True)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(run_batch, batch) for batch in batches]
+        for future in as_completed(futures):
+            for (orig_idx, (table_idx, table)), result in future.result():
+                result = result or {}
+                # 使用英文点号作为序号分隔符
+                tables_data[table_idx]["title"] = f"{orig_idx+1}.{clean_title(result.get('title', FAILED_TITLE))}"
+                tables_data[table_idx]["summary"] = result.get("summary", FAILED_SUMMARY).strip()
+                progress_bar.update(1)
+    progress_bar.close()
+    return tables_data
+
+
+def generate_table_summary(json_file_path, cache=None, max_workers=None):
+    """
+    从_origin_tables.json生成标题和摘要
+
+    Args:
+        json_file_path (str): JSON文件路径
+        cache (ResponseCache, optional): 响应缓存
+        max_workers (int, optional): 最大并发批次数
+
+    Returns:
+        list: 补充title/summary字段后的表格列表
+    """
+    logger.info(f"开始处理JSON文件: {json_file_path}")
+    try:
+        with open(json_file_path, 'r', encoding='utf-8') as file:
+            tables_data = json.load(file)
+    except Exception as e:
+        logger.error(f"处理JSON文件失败: {str(e)}")
+        raise
+    return generate_titles_and_summaries(tables_data, cache=cache, max_workers=max_workers)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="表格标题与摘要合并生成工具")
+    parser.add_argument("--no-cache", action="store_true", help="忽略并且不写入响应缓存")
+    args = parser.parse_args()
+
+    # 设置输入输出路径
+    input_json_path = "/home/curio/workspace/python-projects/TableSnap/output/20250425_183046_73b4d7c7/康师傅2024_origin_tables.json"
+    output_json_path = "/home/curio/workspace/python-projects/TableSnap/output/20250425_183046_73b4d7c7/康师傅2024_table_summaries.json"
+
+    logger.info("表格标题与摘要合并生成工具启动")
+    cache = None if args.no_cache else ResponseCache.from_config()
+
+    try:
+        start_time = time.time()
+        summaries = generate_table_summary(input_json_path, cache=cache)
+
+        with open(output_json_path, 'w', encoding='utf-8') as f:
+            json.dump({"tables": summaries}, f, ensure_ascii=False, indent=2)
+
+        success_count = len([s for s in summaries if s.get("summary") != FAILED_SUMMARY])
+        total_tables = len(summaries)
+        time_used = time.time() - start_time
+
+        logger.info(f"处理完成！成功处理 {success_count}/{total_tables} 个表格")
+        logger.info(f"平均处理速度：{time_used/max(total_tables, 1):.2f}秒/表格")
+        logger.info(f"结果文件已保存至：{output_json_path}")
+        logger.info(cache.stats() if cache is not None else "缓存已禁用")
+
+    except Exception as e:
+        logger.exception(f"主流程执行失败: {e}")
+    finally:
+        if cache is not None:
+            cache.close()
@@ -0,0 +1,185 @@
+import json
+import logging
+import re
+from functools import lru_cache
+
+_FENCE_PATTERN = re.compile(r"```(?:json|JSON)?[ \t]*\n?(.*?)```", re.DOTALL)
+_CLOSERS = {'{': '}', '[': ']'}
+_DECODER = json.JSONDecoder()
+_MISSING = object()
+
+_default_logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=32)
+def _field_patterns(target_field):
+    """按字段名缓存预编译的字符串/数值提取正则"""
+    escaped = re.escape(target_field)
+    return (
+        re.compile(rf'"{escaped}"\s*:\s*"((?:[^"\\]|\\.)*)"'),
+        re.compile(rf'"{escaped}"\s*:\s*(-?[0-9]+(?:\.[0-9]+)?)'),
+    )
+
+
+def _loads(text):
+    """解析JSON，失败返回_MISSING；过深的嵌套会触发RecursionError，同样视为解析失败"""
+    try:
+        return json.loads(text)
+    except (ValueError, RecursionError):
+        return _MISSING
+
+
+def _loads_prefix(text):
+    """从第一个"{"开始解析一个完整对象并忽略其后的文本，适用于"说明文字+JSON+说明文字"的常见响应"""
+    pos = text.find('{')
+    if pos < 0:
+        return _MISSING
+    try:
+        return _DECODER.raw_decode(text, pos)[0]
+    except (ValueError, RecursionError):
+        return _MISSING
+
+
+def iter_json_objects(text, repair_truncated=True):
+    """
+    线性扫描文本，按出现顺序产出括号平衡的JSON对象候选
+
+    扫描时跟踪字符串和转义状态，字符串内的括号不计入深度；每层括号记录其内部已闭合的
+    直接子对象。最外层候选无法解析、括号不匹配或到文本末尾仍未闭合（如说明文字中的
+    孤立"{"）时，改为尝试这些子对象，因此其后的合法对象不会丢失。文本在对象中途结束时
+    （响应被截断），可选地先补齐缺失的引号和括号再尝试解析。
+
+    Args:
+        text (str): 待扫描文本
+        repair_truncated (bool): 是否尝试修复末尾被截断的对象
+
+    Yields:
+        dict: 成功解析的JSON对象
+    """
+    def parse_spans(spans):
+        for span_start, span_end in spans:
+            value = _loads(text[span_start:span_end])
+            if isinstance(value, dict):
+                yield value
+
+    def orphans(levels):
+        # 未闭合的各层中已闭合的子对象，互不重叠
+        for _, _, children in levels:
+            yield from parse_spans(children)
+
+    stack = []  # [(期望的闭括号, 起始位置, 已闭合的直接子对象区间)]
+    in_string = False
+    escaped = False
+    for pos, char in enumerate(text):
+        if not stack:
+            if char == '{':
+                stack.append(('}', pos, []))
+                in_string = escaped = False
+            continue
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+        elif char in _CLOSERS:
+            stack.append((_CLOSERS[char], pos, []))
+        elif char in '}]':
+            if char != stack[-1][0]:
+                # 括号不匹配，放弃当前候选，改为尝试其中已闭合的子对象
+                yield from orphans(stack)
+                stack = []
+                continue
+            closer, open_pos, children = stack.pop()
+            if stack:
+                if closer == '}':
+                    stack[-1][2].append((open_pos, pos + 1))
+                continue
+            value = _loads(text[open_pos:pos + 1])
+            if isinstance(value, dict):
+                yield value
+            else:
+                yield from parse_spans(children)
+
+    if not stack:
+        return
+    if repair_truncated:
+        candidate = text[stack[0][1]:].rstrip().rstrip(',')
+        if in_string:
+            candidate += '"'
+        value = _loads(candidate + ''.join(closer for closer, _, _ in reversed(stack)))
+        if isinstance(value, dict):
+            yield value
+    yield from orphans(stack)
+
+
+def _select(value, target_field):
+    if target_field is None:
+        return True, value
+    if isinstance(value, dict) and target_field in value:
+        return True, value[target_field]
+    return False, None
+
+
+def extract_json_from_response(response_text, target_field=None, logger=None):
+    """
+    从API响应中提取JSON数据
+
+    依次尝试：整段直接解析 → ```代码块```及全文的整体/前缀解析 → 线性扫描括号平衡的对象（可修复截断）
+    → 指定字段的正则提取。整个过程不做回溯式正则匹配，只有全部失败时才记录日志。
+
+    Args:
+        response_text (str): 原始响应文本
+        target_field (str, optional): 需要提取的特定字段，不指定则返回整个JSON
+        logger (logging.Logger, optional): 日志记录器
+
+    Returns:
+        dict/str: 提取的JSON数据或指定字段值
+
+    Raises:
+        ValueError: 当所有提取方法都失败时抛出
+    """
+    logger = logger or _default_logger
+    text = response_text or ""
+
+    # 快速路径：整段即为合法JSON
+    value = _loads(text)
+    if value is not _MISSING:
+        found, value = _select(value, target_field)
+        if found:
+            return value
+
+    # 代码块优先，其次全文；每个区域先整体解析、再从第一个"{"解析，最后才逐字符扫描
+    regions = [match.group(1) for match in _FENCE_PATTERN.finditer(text)]
+    regions.append(text)
+    for region in regions:
+        for parse in (_loads, _loads_prefix):
+            value = parse(region)
+            if value is not _MISSING:
+                found, selected = _select(value, target_field)
+                if found:
+                    return selected
+    for region in regions:
+        for value in iter_json_objects(region):
+            found, selected = _select(value, target_field)
+            if found:
+                return selected
+
+    # 最后按字段名直接提取
+    if target_field:
+        string_pattern, number_pattern = _field_patterns(target_field)
+        if match := string_pattern.search(text):
+            try:
+                return json.loads(f'"{match.group(1)}"')
+            except ValueError:
+                return match.group(1)
+        if match := number_pattern.search(text):
+            number = match.group(1)
+            return float(number) if '.' in number else int(number)
+
+    logger.error(f"所有JSON提取方法均失败，原始响应: {text[:100]}...")
+    raise ValueError(f"无法从响应中提取有效的JSON数据或{target_field}字段")
@@ -0,0 +1,364 @@
+import email.utils
+import logging
+import os
+import random
+import sys
+import threading
+import time
+
+from tokenBudget import estimate_tokens
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "common"))
+from metrics import record_llm_call
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 60.0
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30.0
+
+# get_client复用的客户端，按(api_key, base_url, 配置文件, 配置修改时间)区分
+_shared_clients = {}
+_shared_lock = threading.Lock()
+
+
+class CircuitOpenError(RuntimeError):
+    """熔断器打开期间拒绝请求"""
+
+
+class TokenBucket:
+    """
+    线程安全的自适应令牌桶，按每分钟配额匀速补充
+
+    遇到限流时速率减半，之后每次成功缓慢恢复到配置值。
+
+    Args:
+        per_minute (float): 每分钟配额
+        min_ratio (float): 自适应降速的下限（相对配置值）
+    """
+
+    def __init__(self, per_minute, min_ratio=0.1):
+        self.capacity = float(per_minute)
+        self.max_rate = per_minute / 60.0
+        self.min_rate = self.max_rate * min_ratio
+        self.rate = self.max_rate
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self, amount=1):
+        """阻塞直到获得指定数量的令牌，单次请求超过容量时按容量计"""
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def consume(self, amount):
+        """事后按实际用量扣减（允许为负，后续请求将等待补足）"""
+        with self._lock:
+            self._refill()
+            self.tokens -= amount
+
+    def penalize(self):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+
+    def reward(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate * 1.05)
+
+
+class CircuitBreaker:
+    """
+    连续失败达到阈值后打开，冷却后进入半开状态放行一个试探请求
+
+    Args:
+        failure_threshold (int): 触发熔断的连续失败次数
+        reset_timeout (float): 打开状态持续秒数
+    """
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        with self._lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < self.reset_timeout or self._trial_in_flight:
+                raise CircuitOpenError("API连续失败，熔断器已打开，暂停请求")
+            # 半开：放行一个试探请求
+            self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_flight or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self._trial_in_flight:
+                    logger.warning(f"连续失败 {self.failures} 次，熔断 {self.reset_timeout} 秒")
+                self.opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def release_trial(self):
+        """试探请求未得出结论（如被中断）时释放半开名额，保持打开状态，下一个请求可再次试探"""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+def _retry_after_seconds(error):
+    """从响应头读取Retry-After（秒数或HTTP日期），没有则返回None"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    if value := headers.get("retry-after-ms"):
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        # 格式错误的响应头按没有处理，退回计算的退避时长
+        return None
+    return max(0.0, retry_at.timestamp() - time.time()) if retry_at else None
+
+
+def _is_retryable(error):
+    import openai  # 构造客户端时已加载
+
+    if isinstance(error, (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+class RateLimitedClient:
+    """
+    OpenAI兼容客户端封装：请求/令牌限流、指数退避重试和熔断
+
+    Args:
+        api_key (str): API密钥
+        base_url (str): API基础URL
+        rpm (int, optional): 每分钟请求数上限
+        tpm (int, optional): 每分钟token数上限（输入按估算值预扣，返回后按实际用量校正）
+        max_retries (int): 429/5xx/超时的最大重试次数
+        base_delay (float): 退避基础时长（秒）
+        max_delay (float): 单次退避上限（秒）
+        breaker (CircuitBreaker, optional): 熔断器
+        timeout (float, optional): 单次请求超时（秒）
+    """
+
+    def __init__(self, api_key, base_url, rpm=None, tpm=None, max_retries=DEFAULT_MAX_RETRIES,
+                 base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY, breaker=None, timeout=None):
+        # openai导入耗时较长，延迟到首次创建客户端时
+        from openai import OpenAI
+
+        # 关闭SDK自带重试，由本类统一调度
+        self.client = OpenAI(api_key=api_key, base_url=base_url, max_retries=0, timeout=timeout)
+        self.request_bucket = TokenBucket(rpm) if rpm else None
+        self.token_bucket = TokenBucket(tpm) if tpm else None
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker or CircuitBreaker()
+        self.retry_count = 0
+
+    @classmethod
+    def from_config(cls, api_key=None, base_url=None, config_path="config.yaml"):
+        """根据config.yaml的api节创建客户端，传入的api_key/base_url优先"""
+        import yaml
+
+        try:
+            with open(config_path, 'r') as f:
+                api_config = (yaml.safe_load(f) or {}).get('api', {}) or {}
+        except Exception as e:
+            logger.error(f"加载配置文件失败: {str(e)}")
+            api_config = {}
+        return cls.from_settings(api_config, api_key=api_key, base_url=base_url)
+
+    @classmethod
+    def from_settings(cls, api_config, api_key=None, base_url=None):
+        """根据与config.yaml的api节结构相同的字典创建客户端，传入的api_key/base_url优先"""
+        rate_limit = api_config.get('rate_limit', {}) or {}
+        retry = api_config.get('retry', {}) or {}
+        breaker = api_config.get('circuit_breaker', {}) or {}
+        return cls(
+            api_key=api_key or api_config.get("key"),
+            base_url=base_url or api_config.get("base_url"),
+            rpm=rate_limit.get("rpm"),
+            tpm=rate_limit.get("tpm"),
+            max_retries=retry.get("max_retries", DEFAULT_MAX_RETRIES),
+            base_delay=retry.get("base_delay", DEFAULT_BASE_DELAY),
+            max_delay=retry.get("max_delay", DEFAULT_MAX_DELAY),
+            breaker=CircuitBreaker(
+                failure_threshold=breaker.get("failure_threshold", DEFAULT_FAILURE_THRESHOLD),
+                reset_timeout=breaker.get("reset_timeout", DEFAULT_RESET_TIMEOUT),
+            ),
+            timeout=api_config.get("timeout"),
+        )
+
+    def _backoff_delay(self, attempt, error):
+        retry_after = _retry_after_seconds(error)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        # 指数退避 + 全抖动
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def create(self, max_retries=None, **kwargs):
+        """
+        发送chat.completions请求，参数与OpenAI SDK一致
+
+        Args:
+            max_retries (int, optional): 本次请求的最大重试次数，默认使用客户端配置
+
+        Returns:
+            ChatCompletion: SDK响应对象
+
+        Raises:
+            CircuitOpenError: 熔断器打开时
+            openai.APIError: 不可重试的错误或重试次数耗尽
+        """
+        import openai  # 构造客户端时已加载
+
+        max_retries = self.max_retries if max_retries is None else max_retries
+        estimated_tokens = sum(estimate_tokens(m.get("content") or "") for m in kwargs.get("messages", []))
+        start_time = time.perf_counter()
+        attempt = 0
+
+        def record(status, usage=None):
+            # 记录整次调用（含重试）的耗时与token用量
+            record_llm_call(
+                kwargs.get("model"), time.perf_counter() - start_time,
+                prompt_tokens=getattr(usage, "prompt_tokens", 0),
+                completion_tokens=getattr(usage, "completion_tokens", 0),
+                status=status, retries=attempt
+            )
+
+        while True:
+            try:
+                self.breaker.before_request()
+            except CircuitOpenError as e:
+                record(type(e).__name__)
+                raise
+            # 每条退出路径都要结算熔断器，否则半开试探名额会一直被占用
+            settled = False
+            try:
+                if self.request_bucket is not None:
+                    self.request_bucket.acquire(1)
+                if self.token_bucket is not None:
+                    self.token_bucket.acquire(estimated_tokens)
+                try:
+                    response = self.client.chat.completions.create(**kwargs)
+                except Exception as e:
+                    # 不可重试的客户端错误（如400）说明端点可达，按成功结算
+                    if _is_retryable(e):
+                        self.breaker.record_failure()
+                    else:
+                        self.breaker.record_success()
+                    settled = True
+                    raise
+                self.breaker.record_success()
+                settled = True
+            except Exception as e:
+                if not settled or not _is_retryable(e):
+                    record(type(e).__name__)
+                    raise
+                if isinstance(e, openai.RateLimitError):
+                    for bucket in (self.request_bucket, self.token_bucket):
+                        if bucket is not None:
+                            bucket.penalize()
+                if attempt >= max_retries:
+                    record(type(e).__name__)
+                    raise
+                delay = self._backoff_delay(attempt, e)
+                attempt += 1
+                self.retry_count += 1
+                logger.warning(f"请求失败（{type(e).__name__}），{delay:.1f}秒后第{attempt}次重试")
+                time.sleep(delay)
+                continue
+            finally:
+                if not settled:
+                    self.breaker.release_trial()
+
+            for bucket in (self.request_bucket, self.token_bucket):
+                if bucket is not None:
+                    bucket.reward()
+            usage = getattr(response, "usage", None)
+            if self.token_bucket is not None and usage is not None:
+                # 按实际用量校正预扣的token
+                self.token_bucket.consume(max(0, usage.total_tokens - estimated_tokens))
+            record("ok", usage)
+            return response
+
+
+def shared_key(api_key=None, base_url=None, config_path="config.yaml"):
+    """
+    共享客户端/路由器的缓存键：(api_key, base_url, 配置文件, 配置修改时间)
+
+    未传入的api_key/base_url按配置文件的api节补全，不带参数的调用（如状态查询、预热）
+    与传入配置值的调用（各生成阶段）得到同一个键，不会互相淘汰。
+    """
+    try:
+        mtime = os.path.getmtime(config_path)
+    except OSError:
+        mtime = None
+    if api_key is None or base_url is None:
+        import yaml
+
+        try:
+            with open(config_path, 'r') as f:
+                api_config = (yaml.safe_load(f) or {}).get('api', {}) or {}
+        except Exception:
+            api_config = {}
+        api_key = api_key or api_config.get("key")
+        base_url = base_url or api_config.get("base_url")
+    return api_key, base_url, os.path.abspath(config_path), mtime
+
+
+def get_client(api_key=None, base_url=None, config_path="config.yaml"):
+    """
+    获取进程内共享的客户端，参数与from_config相同
+
+    同一进程中多次运行流程（如常驻服务）时复用HTTP连接池、限流和熔断状态；
+    配置文件修改后自动创建新客户端。
+
+    Returns:
+        RateLimitedClient: 共享客户端
+    """
+    key = shared_key(api_key, base_url, config_path)
+    with _shared_lock:
+        client = _shared_clients.get(key)
+        if client is None:
+            client = RateLimitedClient.from_config(api_key=api_key, base_url=base_url, config_path=config_path)
+            _shared_clients.clear()
+            _shared_clients[key] = client
+        return client
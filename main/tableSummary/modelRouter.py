@@ -0,0 +1,425 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from llmClient import CircuitOpenError, RateLimitedClient, get_client, shared_key
+from tokenBudget import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# config.yaml中api节对应的端点名
+DEFAULT_ENDPOINT = "default"
+# 候选顺序：priority按配置顺序，latency按滚动平均延迟从低到高
+STRATEGIES = ("priority", "latency")
+
+DEFAULT_WINDOW = 50
+DEFAULT_MIN_SAMPLES = 5
+DEFAULT_MAX_ERROR_RATE = 0.5
+DEFAULT_PROBE_INTERVAL = 30.0
+# 还有后备候选时每个候选的重试次数，失败后尽快转移，不必等完客户端的全部退避重试
+DEFAULT_CANDIDATE_RETRIES = 1
+
+# get_router复用的路由器，按shared_key区分
+_shared_routers = {}
+_shared_lock = threading.Lock()
+
+
+def parse_candidate(spec):
+    """解析"模型@端点"，省略端点时使用api节的默认端点"""
+    model, _, endpoint = spec.partition("@")
+    return model.strip(), endpoint.strip() or DEFAULT_ENDPOINT
+
+
+def route_label(candidate):
+    """候选的"模型@端点"标签，默认端点只写模型名（与未配置路由时的缓存键一致）"""
+    model, endpoint = candidate
+    return model if endpoint == DEFAULT_ENDPOINT else f"{model}@{endpoint}"
+
+
+_MISS = object()
+
+
+def _prompt_tokens(kwargs):
+    return sum(estimate_tokens(m.get("content") or "") for m in kwargs.get("messages", []))
+
+
+def _parse_cached(cache, key, parse):
+    """读取并解析缓存的响应，未命中或无法解析时返回_MISS"""
+    cached = cache.get(key)
+    if cached is None:
+        return _MISS
+    try:
+        return parse(cached)
+    except Exception as e:
+        logger.warning(f"缓存的响应无法解析，重新请求: {str(e)}")
+        return _MISS
+
+
+class EndpointHealth:
+    """
+    单个(模型, 端点)候选最近若干次请求的延迟和成败
+
+    Args:
+        window (int): 滚动窗口大小（请求数）
+    """
+
+    def __init__(self, window=DEFAULT_WINDOW):
+        self.samples = deque(maxlen=window)  # (耗时, 是否成功)
+        self.requests = 0
+        self.failovers = 0
+        self.last_attempt = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds, ok):
+        with self._lock:
+            self.samples.append((seconds, ok))
+            self.requests += 1
+
+    def reset(self):
+        """降级候选试探成功后清空窗口，不必等旧的失败/慢请求样本滑出窗口"""
+        with self._lock:
+            self.samples.clear()
+
+    def snapshot(self):
+        with self._lock:
+            samples = list(self.samples)
+        latencies = sorted(seconds for seconds, ok in samples if ok)
+        errors = sum(1 for _, ok in samples if not ok)
+        return {
+            "samples": len(samples),
+            "error_rate": errors / len(samples) if samples else 0.0,
+            "mean_latency": sum(latencies) / len(latencies) if latencies else None,
+            "p95_latency": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else None,
+        }
+
+
+class ModelRouter:
+    """
+    按任务和估算的prompt大小选择模型，并在端点之间故障转移
+
+    每个任务配置若干档位，按prompt的估算token数选择第一个max_prompt_tokens不小于它的档位
+    （未配置上限的档位兜底）。档位内的候选"模型@端点"按健康状况排序：滚动窗口内错误率
+    超过max_error_rate、p95延迟超过max_latency或熔断器打开的候选视为降级，排在健康候选之后；
+    降级候选每隔probe_interval秒放行一次试探请求，恢复后回到原位置。请求失败时依次尝试下一个候选；
+    还有后备候选时每个候选只重试candidate_retries次，最后一个候选使用客户端配置的重试次数。
+    没有为任务配置路由时使用调用方传入的模型和默认端点，与直接使用客户端相同。
+
+    Args:
+        clients (dict): 端点名 → RateLimitedClient，必须包含DEFAULT_ENDPOINT
+        routes (dict, optional): 任务名 → [{"max_prompt_tokens": int或None, "models": ["模型@端点", ...]}]
+        strategy (str): "priority"健康候选按配置顺序，"latency"按滚动平均延迟
+        window (int): 健康统计的滚动窗口（请求数）
+        min_samples (int): 判定降级所需的最少样本数
+        max_error_rate (float): 错误率上限
+        max_latency (float, optional): p95延迟上限（秒）
+        probe_interval (float): 降级候选的试探间隔（秒）
+        candidate_retries (int): 还有后备候选时每个候选的重试次数
+    """
+
+    def __init__(self, clients, routes=None, strategy="priority", window=DEFAULT_WINDOW,
+                 min_samples=DEFAULT_MIN_SAMPLES, max_error_rate=DEFAULT_MAX_ERROR_RATE, max_latency=None,
+                 probe_interval=DEFAULT_PROBE_INTERVAL, candidate_retries=DEFAULT_CANDIDATE_RETRIES):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"不支持的路由策略: {strategy}")
+        self.clients = clients
+        self.routes = {}
+        for task, tiers in (routes or {}).items():
+            parsed = []
+            for tier in tiers:
+                candidates = [parse_candidate(spec) for spec in tier.get("models", [])]
+                for _, endpoint in candidates:
+                    if endpoint not in clients:
+                        raise ValueError(f"任务{task}的路由引用了未配置的端点: {endpoint}")
+                if candidates:
+                    parsed.append((tier.get("max_prompt_tokens"), candidates))
+            self.routes[task] = parsed
+        self.strategy = strategy
+        self.window = window
+        self.min_samples = min_samples
+        self.max_error_rate = max_error_rate
+        self.max_latency = max_latency
+        self.probe_interval = probe_interval
+        self.candidate_retries = candidate_retries
+        self.health = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, api_key=None, base_url=None, config_path="config.yaml"):
+        """
+        根据config.yaml的router节创建路由器
+
+        router.endpoints中的端点继承api节的限流、重试和熔断配置并可逐项覆盖；
+        api节本身是名为default的端点，使用get_client的共享客户端。
+        """
+        import yaml
+
+        try:
+            with open(config_path, 'r') as f:
+                config = yaml.safe_load(f) or {}
+        except Exception as e:
+            logger.error(f"加载配置文件失败: {str(e)}")
+            config = {}
+        api_config = config.get('api', {}) or {}
+        router_config = config.get('router', {}) or {}
+
+        clients = {DEFAULT_ENDPOINT: get_client(api_key=api_key, base_url=base_url, config_path=config_path)}
+        for name, endpoint_config in (router_config.get('endpoints', {}) or {}).items():
+            if name == DEFAULT_ENDPOINT:
+                continue
+            clients[name] = RateLimitedClient.from_settings({**api_config, **(endpoint_config or {})})
+        return cls(
+            clients,
+            routes=router_config.get('routes', {}) or {},
+            strategy=router_config.get('strategy', "priority"),
+            window=router_config.get('window', DEFAULT_WINDOW),
+            min_samples=router_config.get('min_samples', DEFAULT_MIN_SAMPLES),
+            max_error_rate=router_config.get('max_error_rate', DEFAULT_MAX_ERROR_RATE),
+            max_latency=router_config.get('max_latency'),
+            probe_interval=router_config.get('probe_interval', DEFAULT_PROBE_INTERVAL),
+            candidate_retries=router_config.get('candidate_retries', DEFAULT_CANDIDATE_RETRIES),
+        )
+
+    def _health(self, candidate):
+        with self._lock:
+            health = self.health.get(candidate)
+            if health is None:
+                health = self.health[candidate] = EndpointHealth(self.window)
+            return health
+
+    def is_degraded(self, candidate):
+        """候选的熔断器打开，或滚动窗口内错误率/延迟超过阈值"""
+        if self.clients[candidate[1]].breaker.opened_at is not None:
+            return True
+        stats = self._health(candidate).snapshot()
+        if stats["samples"] < self.min_samples:
+            return False
+        if stats["error_rate"] > self.max_error_rate:
+            return True
+        return self.max_latency is not None and (stats["p95_latency"] or 0) > self.max_latency
+
+    def select_tier(self, task, prompt_tokens):
+        """按估算的prompt token数选择档位，返回候选列表；任务未配置路由时返回None"""
+        tiers = self.routes.get(task)
+        if not tiers:
+            return None
+        for max_prompt_tokens, candidates in tiers:
+            if max_prompt_tokens is None or prompt_tokens <= max_prompt_tokens:
+                return candidates
+        return tiers[-1][1]
+
+    def candidates(self, task, prompt_tokens, model=None):
+        """
+        本次请求依次尝试的候选
+
+        Args:
+            task (str): 任务名（title/summary/fused）
+            prompt_tokens (int): 估算的输入token数
+            model (str, optional): 任务未配置路由时使用的模型
+
+        Returns:
+            list: [(模型, 端点名), ...]
+        """
+        tier = self.select_tier(task, prompt_tokens)
+        if tier is None:
+            return [(model, DEFAULT_ENDPOINT)]
+
+        now = time.monotonic()
+        healthy, degraded = [], []
+        for candidate in tier:
+            if not self.is_degraded(candidate):
+                healthy.append(candidate)
+                continue
+            health = self._health(candidate)
+            with health._lock:
+                probe = now - health.last_attempt >= self.probe_interval
+                if probe:
+                    # 降级候选定期放行一次试探请求，成功即清空窗口恢复
+                    health.last_attempt = now
+            (healthy if probe else degraded).append(candidate)
+
+        if self.strategy == "latency":
+            # 没有样本的候选排在最前，先测出延迟
+            healthy.sort(key=lambda candidate: self._health(candidate).snapshot()["mean_latency"] or 0.0)
+        degraded.sort(key=lambda candidate: self._health(candidate).snapshot()["error_rate"])
+        return healthy + degraded
+
+    def _call(self, candidates, attempt, kwargs):
+        """
+        向第attempt个候选发送请求并记录健康统计；还有后备候选时限制重试次数
+
+        Raises:
+            Exception: 请求失败，记录故障转移后原样抛出
+        """
+        candidate = candidates[attempt]
+        candidate_model, endpoint = candidate
+        health = self._health(candidate)
+        health.last_attempt = time.monotonic()
+        client = self.clients[endpoint]
+        max_retries = min(self.candidate_retries, client.max_retries) if attempt + 1 < len(candidates) else None
+        start_time = time.perf_counter()
+        try:
+            response = client.create(model=candidate_model, max_retries=max_retries, **kwargs)
+        except Exception as e:
+            # 熔断拒绝的请求未到达端点，不计入延迟和错误率
+            if not isinstance(e, CircuitOpenError):
+                health.record(time.perf_counter() - start_time, False)
+            if attempt + 1 < len(candidates):
+                health.failovers += 1
+                next_model, next_endpoint = candidates[attempt + 1]
+                logger.warning(f"{candidate_model}@{endpoint} 请求失败（{type(e).__name__}），"
+                               f"转由 {next_model}@{next_endpoint} 处理")
+            raise
+        seconds = time.perf_counter() - start_time
+        health.record(seconds, True)
+        # 延迟仍超过上限的成功请求不算恢复
+        if self.is_degraded(candidate) and (self.max_latency is None or seconds <= self.max_latency):
+            logger.info(f"{candidate_model}@{endpoint} 请求成功，恢复为健康状态")
+            health.reset()
+        return response
+
+    def create(self, task=None, model=None, **kwargs):
+        """
+        发送chat.completions请求，由路由决定模型和端点，参数与RateLimitedClient.create一致
+
+        Args:
+            task (str, optional): 任务名，用于查找路由
+            model (str, optional): 任务未配置路由时使用的模型
+
+        Returns:
+            ChatCompletion: SDK响应对象
+
+        Raises:
+            Exception: 所有候选都失败时抛出最后一个候选的异常
+        """
+        candidates = self.candidates(task, _prompt_tokens(kwargs), model=model)
+        last_error = None
+        for attempt in range(len(candidates)):
+            try:
+                return self._call(candidates, attempt, kwargs)
+            except Exception as e:
+                last_error = e
+        raise last_error
+
+    def route_labels(self, task=None, model=None, **kwargs):
+        """
+        不发送请求时该请求可能使用的路由标签，按档位内的配置顺序排列，不考虑健康状态
+
+        Args:
+            task (str, optional): 任务名
+            model (str, optional): 任务未配置路由时使用的模型
+            **kwargs: 与create相同的请求参数，用于估算prompt大小
+
+        Returns:
+            list: 路由标签（见route_label）
+        """
+        tier = self.select_tier(task, _prompt_tokens(kwargs)) or [(model, DEFAULT_ENDPOINT)]
+        return [route_label(candidate) for candidate in tier]
+
+    def cached(self, cache, cache_key, parse, task=None, model=None, **kwargs):
+        """
+        只查找缓存、不发送请求：按档位内的配置顺序依次查找各候选的缓存响应
+
+        Args:
+            cache (ResponseCache): 响应缓存
+            cache_key (callable): 路由标签（见route_label） → 缓存键
+            parse (callable): 响应文本 → 结果，无法解析时抛出异常
+            task (str, optional): 任务名
+            model (str, optional): 任务未配置路由时使用的模型
+            **kwargs: 与create相同的请求参数，用于估算prompt大小
+
+        Returns:
+            tuple: (结果, 路由标签)，没有可用的缓存时返回None
+        """
+        for label in self.route_labels(task, model, **kwargs):
+            if (result := _parse_cached(cache, cache_key(label), parse)) is not _MISS:
+                return result, label
+        return None
+
+    def complete(self, parse, cache=None, cache_key=None, cacheable=None, use_cached=True, task=None, model=None,
+                 **kwargs):
+        """
+        发送请求并解析响应文本；缓存按实际处理请求的(模型, 端点)区分
+
+        依次处理各候选：先查该候选的缓存，未命中再请求，失败时转移到下一个候选。
+        换用其他模型或端点时不会读到另一个模型生成的缓存。
+
+        Args:
+            parse (callable): 响应文本 → 结果，无法解析时抛出异常（不缓存，也不转移）
+            cache (ResponseCache, optional): 响应缓存
+            cache_key (callable, optional): 路由标签（见route_label） → 缓存键，提供cache时必填
+            cacheable (callable, optional): 结果 → 是否缓存响应，默认解析成功即缓存
+            use_cached (bool): 是否读取缓存，False时只写入
+            task (str, optional): 任务名
+            model (str, optional): 任务未配置路由时使用的模型
+            **kwargs: 与create相同的请求参数
+
+        Returns:
+            tuple: (结果, 路由标签)
+
+        Raises:
+            Exception: 所有候选都失败时抛出最后一个候选的异常；响应无法解析时抛出parse的异常
+        """
+        candidates = self.candidates(task, _prompt_tokens(kwargs), model=model)
+        last_error = None
+        for attempt, candidate in enumerate(candidates):
+            label = route_label(candidate)
+            key = cache_key(label) if cache is not None else None
+            if key is not None and use_cached and (result := _parse_cached(cache, key, parse)) is not _MISS:
+                return result, label
+            try:
+                response = self._call(candidates, attempt, kwargs)
+            except Exception as e:
+                last_error = e
+                continue
+            content = response.choices[0].message.content
+            result = parse(content)
+            # 解析成功后再写入缓存，避免缓存损坏的响应
+            if key is not None and (cacheable is None or cacheable(result)):
+                cache.put(key, content)
+            return result, label
+        raise last_error
+
+    def status(self):
+        """各候选的请求数、故障转移次数和滚动窗口统计"""
+        with self._lock:
+            items = list(self.health.items())
+        result = {}
+        for (model, endpoint), health in items:
+            stats = health.snapshot()
+            result[f"{model}@{endpoint}"] = {
+                "requests": health.requests,
+                "failovers": health.failovers,
+                "degraded": self.is_degraded((model, endpoint)),
+                "error_rate": round(stats["error_rate"], 3),
+                "mean_latency": round(stats["mean_latency"], 3) if stats["mean_latency"] is not None else None,
+                "p95_latency": round(stats["p95_latency"], 3) if stats["p95_latency"] is not None else None,
+            }
+        return result
+
+
+def get_router(api_key=None, base_url=None, config_path="config.yaml"):
+    """
+    获取进程内共享的路由器，参数与from_config相同
+
+    健康统计在同一进程的多次运行（如常驻服务）之间保留；配置文件修改后自动重建。
+    未传入的api_key/base_url按配置补全（见shared_key），带参数与不带参数的调用共用同一个路由器。
+
+    Returns:
+        ModelRouter: 共享路由器
+    """
+    key = shared_key(api_key, base_url, config_path)
+    with _shared_lock:
+        router = _shared_routers.get(key)
+        if router is None:
+            router = ModelRouter.from_config(api_key=api_key, base_url=base_url, config_path=config_path)
+            _shared_routers.clear()
+            _shared_routers[key] = router
+        return router
+
+
+def shared_router():
+    """当前共享的路由器，尚未创建时返回None；用于状态查询，不会重建或淘汰正在使用的路由器"""
+    with _shared_lock:
+        return next(iter(_shared_routers.values()), None)
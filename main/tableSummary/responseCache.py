@@ -0,0 +1,141 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+# 默认缓存位置：仓库根目录下的.cache目录
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    ".cache", "llm_responses.sqlite"
+)
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512MB
+DEFAULT_MAX_AGE_DAYS = 90
+
+
+def make_cache_key(model, temperature, prompt_template, payload):
+    """
+    根据模型名、温度、prompt模板和表格数据生成内容寻址的缓存键
+
+    Args:
+        model (str): 模型名称
+        temperature (float): 采样温度
+        prompt_template (str): prompt模板原文
+        payload: 表格数据（可JSON序列化的对象）
+
+    Returns:
+        str: sha256十六进制摘要
+    """
+    material = json.dumps(
+        [model, temperature, prompt_template, payload],
+        ensure_ascii=False, sort_keys=True, separators=(',', ':')
+    )
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """
+    基于SQLite的LLM响应持久化缓存，支持按容量和时间淘汰
+
+    Args:
+        path (str): SQLite数据库文件路径
+        max_bytes (int): 缓存总大小上限，超出后按最近访问时间淘汰
+        max_age_days (float): 条目最大保留天数
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES, max_age_days=DEFAULT_MAX_AGE_DAYS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # 工作线程共享同一连接，由锁保证串行访问
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON responses(accessed_at)")
+        self._conn.commit()
+        self.evict()
+
+    @classmethod
+    def from_config(cls, config_path="config.yaml"):
+        """从config.yaml的cache节创建缓存实例，配置缺失时使用默认值"""
+        import yaml
+
+        try:
+            with open(config_path, 'r') as f:
+                cache_config = (yaml.safe_load(f) or {}).get('cache', {}) or {}
+        except Exception as e:
+            logger.warning(f"读取缓存配置失败，使用默认值: {str(e)}")
+            cache_config = {}
+        return cls(
+            path=cache_config.get("path", DEFAULT_CACHE_PATH),
+            max_bytes=int(cache_config.get("max_mb", DEFAULT_MAX_BYTES / 1024 / 1024) * 1024 * 1024),
+            max_age_days=cache_config.get("max_age_days", DEFAULT_MAX_AGE_DAYS),
+        )
+
+    def get(self, key):
+        """读取缓存，未命中返回None"""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            return row[0]
+
+    def put(self, key, value):
+        """写入缓存，超出容量时触发淘汰"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value.encode('utf-8')), now, now)
+            )
+            self._conn.commit()
+        self.evict()
+
+    def evict(self):
+        """删除过期条目，并在总大小超限时按最近访问时间淘汰旧条目"""
+        with self._lock:
+            if self.max_age_days:
+                cutoff = time.time() - self.max_age_days * 86400
+                self._conn.execute("DELETE FROM responses WHERE created_at < ?", (cutoff,))
+
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if self.max_bytes and total > self.max_bytes:
+                rows = self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall()
+                stale_keys = []
+                for key, size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    stale_keys.append((key,))
+                    total -= size
+                self._conn.executemany("DELETE FROM responses WHERE key = ?", stale_keys)
+            self._conn.commit()
+
+    def stats(self):
+        """返回命中/未命中统计文本"""
+        return f"缓存命中 {self.hits} 次，未命中 {self.misses} 次"
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,326 @@
+import glob
+import logging
+import os
+import re
+import sqlite3
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "common"))
+from jsonStream import iter_json_array
+
+logger = logging.getLogger(__name__)
+
+RESULTS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "Results"
+)
+DEFAULT_INDEX_PATH = os.path.join(RESULTS_DIR, "search_index.sqlite")
+SUMMARIES_SUFFIX = "_table_summaries.json"
+
+# 连续的中日韩表意文字；其余文字交给FTS5的unicode61分词器
+_CJK_RUN_PATTERN = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+')
+_TERM_PATTERN = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+|[0-9A-Za-z]+')
+_YEAR_PATTERN = re.compile(r'(?<!\d)((?:19|20)\d{2})(?!\d)')
+
+# bm25列权重：标题、摘要、表题/脚注、元数据（年份/文档名，只用于过滤）
+_RANK_WEIGHTS = (5.0, 1.0, 2.0, 0.0)
+# 索引格式版本，table_no等字段含义变化时递增，旧索引在下次update时全部重建
+_SCHEMA_VERSION = 1
+
+
+def segment(text):
+    """
+    将中文切分为相邻二元组（单字保留原字），其余文本原样保留，用空格分隔
+
+    FTS5内置分词器不切分中文，二元组索引无需词典即可支持任意中文词检索。
+
+    Args:
+        text (str): 原始文本
+
+    Returns:
+        str: 可直接写入FTS5的分词文本
+    """
+    def bigrams(match):
+        run = match.group(0)
+        if len(run) == 1:
+            return f" {run} "
+        return " " + " ".join(run[i:i + 2] for i in range(len(run) - 1)) + " "
+    return _CJK_RUN_PATTERN.sub(bigrams, text or "")
+
+
+def fts_phrase(text):
+    """将任意文本转义为FTS5短语（双引号包围，内部双引号加倍），其中的运算符和语法字符不再生效"""
+    return '"' + str(text).replace('"', '""') + '"'
+
+
+def build_match_query(query):
+    """
+    将用户查询转换为FTS5 MATCH表达式
+
+    每个中文词转换为二元组短语（要求相邻），单个汉字按前缀匹配，
+    字母数字词按前缀匹配，各词之间为AND关系。
+
+    Args:
+        query (str): 用户查询，如"分部收入 2024"
+
+    Returns:
+        str: MATCH表达式，查询中没有可检索词时返回空字符串
+    """
+    terms = []
+    for term in _TERM_PATTERN.findall(query or ""):
+        if _CJK_RUN_PATTERN.fullmatch(term) and len(term) > 1:
+            terms.append('"' + " ".join(term[i:i + 2] for i in range(len(term) - 1)) + '"')
+        else:
+            terms.append(f'"{term}"*')
+    return " AND ".join(terms)
+
+
+class SearchIndex:
+    """
+    基于SQLite FTS5的表格标题/摘要检索索引
+
+    tables表保存原文和元数据，tables_fts保存分词后的文本，两者以rowid对应；
+    documents表记录已索引的结果文件及其修改时间，用于增量更新。
+
+    Args:
+        path (str): 索引数据库路径
+    """
+
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS documents (
+                path TEXT PRIMARY KEY,
+                doc_name TEXT NOT NULL,
+                run_dir TEXT NOT NULL,
+                mtime REAL NOT NULL,
+                size INTEGER NOT NULL,
+                indexed_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS tables (
+                id INTEGER PRIMARY KEY,
+                path TEXT NOT NULL,
+                doc_name TEXT NOT NULL,
+                run_dir TEXT NOT NULL,
+                table_no INTEGER NOT NULL,
+                page_idx INTEGER,
+                title TEXT,
+                summary TEXT,
+                years TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_tables_path ON tables(path);
+            CREATE VIRTUAL TABLE IF NOT EXISTS tables_fts USING fts5(
+                title, summary, extra, meta, tokenize='unicode61'
+            );
+        """)
+        # 预设排序函数，ORDER BY rank可在FTS5内部完成排序
+        self._conn.execute(
+            "INSERT INTO tables_fts (tables_fts, rank) VALUES ('rank', ?)",
+            (f"bm25({', '.join(map(str, _RANK_WEIGHTS))})",)
+        )
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < _SCHEMA_VERSION:
+            self._conn.executescript(f"""
+                DELETE FROM tables_fts;
+                DELETE FROM tables;
+                DELETE FROM documents;
+                PRAGMA user_version = {_SCHEMA_VERSION};
+            """)
+        self._conn.commit()
+
+    def is_current(self, summaries_path):
+        """结果文件自上次索引后是否未变化"""
+        stat = os.stat(summaries_path)
+        row = self._conn.execute(
+            "SELECT mtime, size FROM documents WHERE path = ?", (os.path.abspath(summaries_path),)
+        ).fetchone()
+        return row is not None and row[0] == stat.st_mtime and row[1] == stat.st_size
+
+    def remove(self, summaries_path):
+        """删除某个结果文件的全部索引条目"""
+        path = os.path.abspath(summaries_path)
+        self._conn.execute("DELETE FROM tables_fts WHERE rowid IN (SELECT id FROM tables WHERE path = ?)", (path,))
+        self._conn.execute("DELETE FROM tables WHERE path = ?", (path,))
+        self._conn.execute("DELETE FROM documents WHERE path = ?", (path,))
+
+    def add_document(self, summaries_path):
+        """
+        索引单个_table_summaries.json（已存在则替换）
+
+        Args:
+            summaries_path (str): 结果文件路径
+
+        Returns:
+            int: 索引的表格数量
+        """
+        path = os.path.abspath(summaries_path)
+        doc_name = os.path.basename(path)
+        if doc_name.endswith(SUMMARIES_SUFFIX):
+            doc_name = doc_name[:-len(SUMMARIES_SUFFIX)]
+        run_dir = os.path.basename(os.path.dirname(path))
+        stat = os.stat(path)
+
+        count = 0
+        with self._conn:
+            self.remove(path)
+            # table_no只对表格计数，与toParquet导出的序号一致
+            tables = (t for t in iter_json_array(path, key="tables") if t.get("type") == "table")
+            for table_no, table in enumerate(tables):
+                title = table.get("title", "")
+                summary = table.get("summary", "")
+                extra = " ".join((table.get("table_caption") or []) + (table.get("table_footnote") or []))
+                years = " ".join(sorted(set(_YEAR_PATTERN.findall(" ".join((title, extra, doc_name))))))
+                cursor = self._conn.execute(
+                    "INSERT INTO tables (path, doc_name, run_dir, table_no, page_idx, title, summary, years) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (path, doc_name, run_dir, table_no, table.get("page_idx"), title, summary, years)
+                )
+                # 年份写成y2024形式的独立词，年份/文档名过滤直接走全文索引
+                meta = " ".join([f"y{year}" for year in years.split()] + [segment(doc_name)])
+                self._conn.execute(
+                    "INSERT INTO tables_fts (rowid, title, summary, extra, meta) VALUES (?, ?, ?, ?, ?)",
+                    (cursor.lastrowid, segment(title), segment(summary), segment(extra), meta)
+                )
+                count += 1
+            self._conn.execute(
+                "INSERT INTO documents (path, doc_name, run_dir, mtime, size, indexed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (path, doc_name, run_dir, stat.st_mtime, stat.st_size, time.time())
+            )
+        return count
+
+    def update(self, results_dir=RESULTS_DIR):
+        """
+        增量索引结果目录：只处理新增或修改过的结果文件，并清理已删除的文件
+
+        Args:
+            results_dir (str): 结果根目录（Results/<时间戳>_<uuid>/...）
+
+        Returns:
+            tuple: (新索引的文档数, 新索引的表格数)
+        """
+        paths = {
+            os.path.abspath(p)
+            for p in glob.glob(os.path.join(results_dir, "**", f"*{SUMMARIES_SUFFIX}"), recursive=True)
+        }
+        root = os.path.abspath(results_dir)
+        with self._conn:
+            for (indexed_path,) in self._conn.execute("SELECT path FROM documents").fetchall():
+                if indexed_path.startswith(root + os.sep) and indexed_path not in paths:
+                    self.remove(indexed_path)
+
+        doc_count = table_count = 0
+        for path in sorted(paths):
+            if self.is_current(path):
+                continue
+            try:
+                table_count += self.add_document(path)
+                doc_count += 1
+            except Exception as e:
+                logger.error(f"索引失败 {path}: {str(e)}")
+        return doc_count, table_count
+
+    def search(self, query, year=None, doc=None, limit=10, rank=False):
+        """
+        检索表格
+
+        默认先返回标题命中的表格，再补充摘要/表题命中的表格，同组内按索引时间倒序；
+        这种排序可由FTS5倒排索引直接截断，命中数再多也只读取limit条。rank=True时
+        按bm25相关度排序，需要为全部命中计算得分，命中很多时明显更慢。
+
+        Args:
+            query (str): 检索词，中文无需分词，如"分部收入"
+            year (str/int, optional): 只返回标题/表题/文档名中包含该年份的表格
+            doc (str, optional): 只返回文档名包含该文本的表格
+            limit (int): 最多返回条数
+            rank (bool): 是否按bm25相关度排序
+
+        Returns:
+            list: 结果字典列表
+        """
+        text_query = build_match_query(query)
+        if not text_query:
+            return []
+        filters = ""
+        if year:
+            # 年份来自调用方输入，转义为短语，避免引号或FTS5运算符改变查询结构
+            filters += f" AND meta:{fts_phrase(f'y{str(year).strip()}')}"
+        if doc and (doc_query := build_match_query(doc)):
+            filters += f" AND meta:({doc_query})"
+
+        if rank:
+            hits = self._conn.execute(
+                "SELECT rowid FROM tables_fts WHERE tables_fts MATCH ? ORDER BY rank LIMIT ?",
+                (f"({text_query}){filters}", limit)
+            ).fetchall()
+        else:
+            hits = self._conn.execute(
+                "SELECT rowid FROM tables_fts WHERE tables_fts MATCH ? ORDER BY rowid DESC LIMIT ?",
+                (f"title:({text_query}){filters}", limit)
+            ).fetchall()
+            if len(hits) < limit:
+                found = {rowid for rowid, in hits}
+                more = self._conn.execute(
+                    "SELECT rowid FROM tables_fts WHERE tables_fts MATCH ? ORDER BY rowid DESC LIMIT ?",
+                    (f"({text_query}){filters}", limit + len(found))
+                ).fetchall()
+                hits.extend(row for row in more if row[0] not in found)
+                hits = hits[:limit]
+
+        columns = ("doc_name", "run_dir", "table_no", "page_idx", "title", "summary", "path")
+        results = []
+        for rowid, in hits:
+            row = self._conn.execute(
+                "SELECT doc_name, run_dir, table_no, page_idx, title, summary, path FROM tables WHERE id = ?",
+                (rowid,)
+            ).fetchone()
+            results.append(dict(zip(columns, row)))
+        return results
+
+    def stats(self):
+        documents = self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+        tables = self._conn.execute("SELECT COUNT(*) FROM tables").fetchone()[0]
+        return f"索引共 {documents} 个文档，{tables} 个表格"
+
+    def close(self):
+        self._conn.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="表格标题/摘要全文检索")
+    parser.add_argument("--db", default=DEFAULT_INDEX_PATH, help="索引数据库路径")
+    sub_parsers = parser.add_subparsers(dest="command", required=True)
+
+    index_parser = sub_parsers.add_parser("index", help="增量索引结果目录")
+    index_parser.add_argument("results_dir", nargs="?", default=RESULTS_DIR)
+
+    search_parser = sub_parsers.add_parser("search", help="检索表格")
+    search_parser.add_argument("query")
+    search_parser.add_argument("--year", default=None)
+    search_parser.add_argument("--doc", default=None)
+    search_parser.add_argument("--limit", type=int, default=10)
+    search_parser.add_argument("--rank", action="store_true", help="按bm25相关度排序（命中多时较慢）")
+    args = parser.parse_args()
+
+    index = SearchIndex(args.db)
+    try:
+        if args.command == "index":
+            start_time = time.perf_counter()
+            doc_count, table_count = index.update(args.results_dir)
+            logger.info(f"新索引 {doc_count} 个文档，{table_count} 个表格，"
+                        f"耗时 {time.perf_counter() - start_time:.2f}秒；{index.stats()}")
+        else:
+            start_time = time.perf_counter()
+            results = index.search(args.query, year=args.year, doc=args.doc, limit=args.limit, rank=args.rank)
+            elapsed_ms = (time.perf_counter() - start_time) * 1000
+            for result in results:
+                print(f"[{result['doc_name']} 第{(result['page_idx'] or 0) + 1}页] {result['title']}")
+                print(f"    {result['summary'][:80]}")
+                print(f"    {result['path']}#{result['table_no']}")
+            print(f"共 {len(results)} 条结果，耗时 {elapsed_ms:.2f}毫秒")
+    finally:
+        index.close()
@@ -0,0 +1,278 @@
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import sys
+import time
+import unicodedata
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "common"))
+from htmlTable import parse_table_html
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    ".cache", "table_fingerprints.sqlite"
+)
+# SimHash汉明距离不超过该值视为近似重复
+DEFAULT_MAX_DISTANCE = 7
+SIMHASH_BITS = 64
+_BAND_BITS = 8  # 64位分8段，距离≤7时至少一段完全相同，只需比对同段候选
+# 表体非空行少于该值的表格（空表、只有表头的片段）内容不足以区分，不参与去重
+MIN_BODY_ROWS = 2
+
+_NUMBER_PATTERN = re.compile(r'^(\()?([-+]?)([\d,]*\.?\d+)(\))?(%?)$')
+_TITLE_NUMBER_PATTERN = re.compile(r'^\d+\.')
+
+
+def _normalize_cell(text):
+    """统一全半角、去除空白，并规范数字写法（千分位、括号负数、末尾零）"""
+    text = unicodedata.normalize('NFKC', text)
+    text = re.sub(r'\s+', '', text)
+    match = _NUMBER_PATTERN.match(text)
+    if match and bool(match.group(1)) == bool(match.group(4)):
+        number = match.group(3).replace(',', '')
+        if '.' in number:
+            number = number.rstrip('0').rstrip('.') or '0'
+        negative = bool(match.group(1)) or match.group(2) == '-'
+        return f"{'-' if negative else ''}{number}{match.group(5)}"
+    return text
+
+
+def canonicalize_table(table):
+    """
+    将表格规范化为与排版无关的文本：表题、单元格（按行列展开）和脚注，空白和数字格式统一
+
+    表题和脚注区分单位、口径不同而数字相同的表格（如"单位：千元"与"单位：万元"）。
+    表体非空行少于MIN_BODY_ROWS时返回空字符串，调用方据此跳过去重。
+
+    Args:
+        table (dict): MinerU表格字典
+
+    Returns:
+        str: 规范化文本，行以换行分隔，单元格以制表符分隔；表体过小时为空字符串
+    """
+    grid = parse_table_html(table.get("table_body", ""))
+    rows = ['\t'.join(_normalize_cell(cell) for cell in row) for row in grid]
+    rows = [row for row in rows if row.strip('\t')]
+    if len(rows) < MIN_BODY_ROWS:
+        return ""
+    captions = [_normalize_cell(text) for text in table.get("table_caption") or []]
+    footnotes = [_normalize_cell(text) for text in table.get("table_footnote") or []]
+    return '\n'.join([f"caption:{text}" for text in captions if text] + rows
+                      + [f"footnote:{text}" for text in footnotes if text])
+
+
+def fingerprint(canonical):
+    """规范化文本的sha256指纹，用于精确去重"""
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def simhash(canonical, ngram=3):
+    """基于字符n-gram的64位SimHash，用于发现近似重复表格"""
+    weights = [0] * SIMHASH_BITS
+    text = canonical.replace('\t', '|')
+    for i in range(max(1, len(text) - ngram + 1)):
+        digest = hashlib.blake2b(text[i:i + ngram].encode('utf-8'), digest_size=8).digest()
+        value = int.from_bytes(digest, 'big')
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit in range(SIMHASH_BITS) if weights[bit] > 0)
+
+
+def _bands(value):
+    mask = (1 << _BAND_BITS) - 1
+    return [(band, value >> (band * _BAND_BITS) & mask) for band in range(SIMHASH_BITS // _BAND_BITS)]
+
+
+def _to_signed(value):
+    # SQLite整数为有符号64位
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def strip_title_number(title):
+    """去除标题前的"序号."前缀"""
+    return _TITLE_NUMBER_PATTERN.sub('', title or '', count=1)
+
+
+class FingerprintStore:
+    """
+    跨文档的表格指纹库，保存每个规范化表格已生成的标题和摘要
+
+    Args:
+        path (str): SQLite数据库文件路径
+        max_distance (int): 近似重复的SimHash汉明距离上限
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH, max_distance=DEFAULT_MAX_DISTANCE):
+        self.path = path
+        self.max_distance = max_distance
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS tables (
+                fingerprint TEXT PRIMARY KEY,
+                simhash INTEGER NOT NULL,
+                title TEXT,
+                summary TEXT,
+                source TEXT,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS simhash_bands (
+                band INTEGER NOT NULL,
+                value INTEGER NOT NULL,
+                fingerprint TEXT NOT NULL,
+                PRIMARY KEY (band, value, fingerprint)
+            );
+        """)
+        self._conn.commit()
+
+    @classmethod
+    def from_config(cls, config_path="config.yaml"):
+        """从config.yaml的dedup节创建指纹库"""
+        import yaml
+
+        try:
+            with open(config_path, 'r') as f:
+                dedup_config = (yaml.safe_load(f) or {}).get('dedup', {}) or {}
+        except Exception as e:
+            logger.warning(f"读取去重配置失败，使用默认值: {str(e)}")
+            dedup_config = {}
+        return cls(
+            path=dedup_config.get("path", DEFAULT_STORE_PATH),
+            max_distance=dedup_config.get("max_distance", DEFAULT_MAX_DISTANCE),
+        )
+
+    def lookup(self, table_fingerprint):
+        """精确查找，返回(title, summary, source)或None"""
+        return self._conn.execute(
+            "SELECT title, summary, source FROM tables WHERE fingerprint = ?", (table_fingerprint,)
+        ).fetchone()
+
+    def find_near(self, table_simhash):
+        """查找SimHash距离不超过阈值的已知表格，返回(fingerprint, source, distance)或None"""
+        candidates = set()
+        for band, value in _bands(table_simhash):
+            rows = self._conn.execute(
+                "SELECT fingerprint FROM simhash_bands WHERE band = ? AND value = ?", (band, value)
+            ).fetchall()
+            candidates.update(row[0] for row in rows)
+
+        best = None
+        for candidate in candidates:
+            row = self._conn.execute("SELECT simhash, source FROM tables WHERE fingerprint = ?", (candidate,)).fetchone()
+            distance = bin((row[0] & ((1 << 64) - 1)) ^ table_simhash).count('1')
+            if distance <= self.max_distance and (best is None or distance < best[2]):
+                best = (candidate, row[1], distance)
+        return best
+
+    def record(self, table_fingerprint, table_simhash, title, summary, source):
+        """保存表格的标题和摘要"""
+        self._conn.execute(
+            "INSERT OR REPLACE INTO tables (fingerprint, simhash, title, summary, source, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (table_fingerprint, _to_signed(table_simhash), title, summary, source, time.time())
+        )
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO simhash_bands (band, value, fingerprint) VALUES (?, ?, ?)",
+            [(band, value, table_fingerprint) for band, value in _bands(table_simhash)]
+        )
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+class DedupReport:
+    """去重结果统计"""
+
+    def __init__(self, total):
+        self.total = total
+        self.exact = 0
+        self.near = 0
+
+    def summary(self):
+        return (f"共 {self.total} 个表格：精确重复 {self.exact} 个（复用已有标题和摘要，"
+                f"无需再调用LLM生成 {self.exact} 个表格），近似重复 {self.near} 个（已标记，仍重新生成）")
+
+
+def apply_dedup(tables, store):
+    """
+    为表格计算指纹并复用指纹库中的结果
+
+    精确重复的表格直接写入已存的title（不含序号）、summary和来源reused_from；
+    近似重复的表格只写入near_duplicate_of标记，仍交给LLM重新生成。表体过小的表格不查找。
+
+    Args:
+        tables (list): 表格列表（原地修改）
+        store (FingerprintStore): 指纹库
+
+    Returns:
+        DedupReport: 统计结果
+    """
+    report = DedupReport(len(tables))
+    for table in tables:
+        canonical = canonicalize_table(table)
+        if not canonical:
+            continue
+        if (match := store.lookup(fingerprint(canonical))) is not None:
+            title, summary, source = match
+            table["title"] = title
+            table["summary"] = summary
+            table["reused_from"] = source
+            report.exact += 1
+        elif (near := store.find_near(simhash(canonical))) is not None:
+            table["near_duplicate_of"] = near[1]
+            report.near += 1
+    return report
+
+
+def record_results(tables, store, source, failed_markers=("分析生成失败", "标题生成失败")):
+    """
+    将成功生成的标题和摘要写入指纹库，供后续文档复用；表体过小的表格不入库
+
+    Args:
+        tables (list): 已生成title/summary的表格列表
+        store (FingerprintStore): 指纹库
+        source (str): 来源标识（如文档名）
+        failed_markers (tuple): 表示生成失败的占位文本，命中时不入库
+    """
+    for table in tables:
+        title = strip_title_number(table.get("title", ""))
+        summary = table.get("summary", "")
+        if not title or not summary or table.get("reused_from"):
+            continue
+        if any(marker in (title, summary) for marker in failed_markers):
+            continue
+        canonical = canonicalize_table(table)
+        if not canonical:
+            continue
+        store.record(fingerprint(canonical), simhash(canonical), title, summary, source)
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="检查_origin_tables.json中可复用的表格")
+    parser.add_argument("input", help="_origin_tables.json文件路径")
+    parser.add_argument("--store", default=None, help="指纹库路径，默认读取配置")
+    args = parser.parse_args()
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        origin_tables = [t for t in json.load(f) if t.get('type') == 'table']
+
+    fingerprint_store = FingerprintStore(args.store) if args.store else FingerprintStore.from_config()
+    try:
+        dedup_report = apply_dedup(origin_tables, fingerprint_store)
+        for idx, t in enumerate(origin_tables):
+            if t.get("reused_from"):
+                logger.info(f"表格{idx} 精确重复，来源：{t['reused_from']}")
+            elif t.get("near_duplicate_of"):
+                logger.info(f"表格{idx} 近似重复，参考：{t['near_duplicate_of']}")
+        logger.info(dedup_report.summary())
+    finally:
+        fingerprint_store.close()
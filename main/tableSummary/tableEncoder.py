@@ -0,0 +1,39 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "common"))
+from htmlTable import collapse_whitespace, parse_table_html
+
+
+def encode_table(table):
+    """
+    将MinerU表格字典编码为紧凑的文本表示，用于LLM prompt
+
+    去除img_path/page_idx等与内容无关的字段和HTML标签，表格主体转换为
+    以"|"分隔的行，保留标题、表格标题和脚注。
+
+    Args:
+        table (dict): MinerU输出的表格字典
+
+    Returns:
+        str: 紧凑文本表示
+    """
+    lines = []
+    if title := table.get("title"):
+        lines.append(f"标题:{collapse_whitespace(title)}")
+    for caption in table.get("table_caption") or []:
+        lines.append(f"表题:{collapse_whitespace(caption)}")
+
+    for row in parse_table_html(table.get("table_body", ""), fill_spans=False):
+        # 跳过全空行
+        if any(row):
+            lines.append("|".join(cell.replace("|", "/") for cell in row))
+
+    for footnote in table.get("table_footnote") or []:
+        lines.append(f"脚注:{collapse_whitespace(footnote)}")
+    return "\n".join(lines)
+
+
+def encode_table_list(tables):
+    """将多个表格编码为带批次内索引标记的文本块"""
+    return "\n\n".join(f"[{idx}]\n{encode_table(table)}" for idx, table in enumerate(tables))
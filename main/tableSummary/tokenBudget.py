@@ -0,0 +1,52 @@
+import re
+
+# CJK统一表意文字及全角标点，近似按每字1个token计算
+_CJK_PATTERN = re.compile(r'[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]')
+
+
+def estimate_tokens(text):
+    """
+    粗略估算文本的token数（无需依赖具体分词器）
+
+    中文字符按1个token计，其余字符按约4个字符1个token计。
+
+    Args:
+        text (str): 待估算文本
+
+    Returns:
+        int: 估算的token数
+    """
+    cjk_count = len(_CJK_PATTERN.findall(text))
+    other_count = len(text) - cjk_count
+    return cjk_count + (other_count + 3) // 4
+
+
+def pack_batches(items, cost_fn, token_budget, max_items=None):
+    """
+    按token预算将条目顺序打包成批次
+
+    超出预算的单个条目独占一个批次，批次内保持原有顺序。
+
+    Args:
+        items (list): 待打包条目
+        cost_fn (callable): 计算单个条目token数的函数
+        token_budget (int): 每批次token上限
+        max_items (int, optional): 每批次条目数上限
+
+    Returns:
+        list: 批次列表，每个批次为条目列表
+    """
+    batches = []
+    current, current_cost = [], 0
+    for item in items:
+        cost = cost_fn(item)
+        over_budget = current and current_cost + cost > token_budget
+        over_count = max_items and len(current) >= max_items
+        if over_budget or over_count:
+            batches.append(current)
+            current, current_cost = [], 0
+        current.append(item)
+        current_cost += cost
+    if current:
+        batches.append(current)
+    return batches
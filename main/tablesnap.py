@@ -0,0 +1,248 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+
+MAIN_DIR = os.path.dirname(os.path.abspath(__file__))
+for sub_dir in ("convertPDF", "tableSummary", "convertHTML", "common"):
+    sys.path.append(os.path.join(MAIN_DIR, sub_dir))
+
+from useMinerU import RESULTS_DIR, analyze_pdf
+from imageStore import ImageStore
+from extractTables import extract_tables
+from stitchTables import stitch_tables
+from getTitles import generate_titles, renumber_titles
+from getSummaries import FAILED_SUMMARY, summarize_tables
+from getTitlesAndSummaries import generate_titles_and_summaries
+from toMarkdown import tables_to_markdown
+from responseCache import ResponseCache
+from tableDedup import FingerprintStore, apply_dedup, record_results
+from modelRouter import shared_router
+from metrics import registry
+
+logger = logging.getLogger("tablesnap")
+
+# 摘要检查点目录：每次运行的输出目录都是新建的，检查点按PDF内容存放才能在重跑时续用
+CHECKPOINT_DIR = os.path.join(RESULTS_DIR, "checkpoints")
+
+
+class StageTimer:
+    """记录并输出各阶段耗时"""
+
+    def __init__(self):
+        self.timings = {}
+
+    def run(self, name, func, *args, **kwargs):
+        start_time = time.perf_counter()
+        with registry.span("stage", stage=name):
+            result = func(*args, **kwargs)
+        self.timings[name] = time.perf_counter() - start_time
+        logger.info(f"[{name}] 耗时 {self.timings[name]:.2f}秒")
+        return result
+
+
+def write_json(path, data):
+    """写出中间结果文件"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    logger.info(f"中间结果已保存至：{path}")
+
+
+def load_metrics_config(config_path="config.yaml"):
+    """加载metrics节配置（模型单价、Prometheus输出路径）"""
+    import yaml
+
+    try:
+        with open(config_path, 'r') as f:
+            return (yaml.safe_load(f) or {}).get('metrics', {}) or {}
+    except Exception as e:
+        logger.warning(f"读取指标配置失败，使用默认值: {str(e)}")
+        return {}
+
+
+def summaries_checkpoint_path(pdf_path, checkpoint_dir=CHECKPOINT_DIR):
+    """按PDF内容哈希确定摘要检查点路径，同一文件重跑时找到上次的检查点"""
+    digest = hashlib.sha256()
+    with open(pdf_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    return os.path.join(checkpoint_dir, f"{digest.hexdigest()[:32]}_summaries.jsonl")
+
+
+def generate_markdown(tables, output_dir, name, timer=None, cache=None, batch_summaries=None, mode="two-pass",
+                      dedup_store=None, keep_intermediate=False, checkpoint_path=None):
+    """
+    对已提取的表格去重、生成标题和摘要并写出Markdown（流程中网络I/O为主的后半段）
+
+    Args:
+        tables (list): 表格列表（原地补充title/summary字段）
+        output_dir (str): 输出目录
+        name (str): 文档名（不含扩展名）
+        timer (StageTimer, optional): 阶段计时器，默认新建
+        checkpoint_path (str, optional): 摘要检查点路径（见summaries_checkpoint_path），
+            全部摘要成功后删除，有失败时保留供重跑只请求失败的表格
+        其余参数见run_pipeline
+
+    Returns:
+        tuple: (Markdown文件路径, 调用LLM的表格列表)
+    """
+    timer = timer or StageTimer()
+    # 只有未命中指纹库的表格需要调用LLM；列表元素与tables共享，结果原地写回
+    pending = tables
+    if tables and dedup_store is not None:
+        report = timer.run("表格去重", apply_dedup, tables, dedup_store)
+        logger.info(report.summary())
+        pending = [t for t in tables if not t.get("reused_from")]
+
+    if pending and mode == "fused":
+        timer.run("标题摘要生成", generate_titles_and_summaries, pending, cache=cache)
+    elif pending:
+        timer.run("标题生成", generate_titles, pending, cache=cache)
+        if keep_intermediate:
+            write_json(os.path.join(output_dir, f"{name}_table_titles.json"), {"tables": renumber_titles(tables)})
+
+        timer.run(
+            "摘要生成", summarize_tables, pending, cache=cache, batch_mode=batch_summaries,
+            checkpoint_path=checkpoint_path
+        )
+
+    if tables:
+        renumber_titles(tables)
+        if dedup_store is not None:
+            record_results(pending, dedup_store, source=name)
+    # 摘要结果始终写出，供toParquet导出和searchIndex索引
+    write_json(os.path.join(output_dir, f"{name}_table_summaries.json"), {"tables": tables})
+
+    md_content = timer.run("Markdown生成", tables_to_markdown, tables)
+    output_md = os.path.join(output_dir, f"{name}_表格.md")
+    with open(output_md, 'w', encoding='utf-8') as f:
+        f.writelines(md_content)
+
+    if checkpoint_path and os.path.exists(checkpoint_path) \
+            and not any(t.get("summary") == FAILED_SUMMARY for t in pending):
+        os.remove(checkpoint_path)
+
+    return output_md, pending
+
+
+def run_pipeline(pdf_path, keep_intermediate=False, cache=None, page_range=None, detect_tables=False,
+                 batch_summaries=None, mode="two-pass", dedup_store=None, prometheus_path=None, routing="page",
+                 stitch=True, image_store=None):
+    """
+    在单个进程内运行 PDF → 表格 → 标题 → 摘要 → Markdown 全流程
+
+    各阶段之间直接传递Python对象，不再反复读写JSON文件。MinerU只保留表格条目，
+    不输出整篇markdown和非表格图片。运行报告（各阶段及MinerU子步骤耗时、每页的解析路线、
+    每个模型的调用次数、token用量和延迟，以及模型路由各候选的健康统计）写入输出目录下的 <name>_run_report.json。
+
+    Args:
+        pdf_path (str): PDF文件路径
+        keep_intermediate (bool): 是否写出各阶段的中间JSON文件
+        cache (ResponseCache, optional): LLM响应缓存
+        page_range (str, optional): 页码范围（1开始，如 "3-10,15"）
+        detect_tables (bool): 预扫描可能含表格的页面，只解析这些页面
+        batch_summaries (bool, optional): 摘要阶段是否将多个小表格合并为一次请求，默认读取配置
+        mode (str): "two-pass"分别生成标题和摘要（质量优先），"fused"单次调用同时生成（速度优先）
+        dedup_store (FingerprintStore, optional): 表格指纹库，精确重复的表格直接复用历史标题和摘要
+        prometheus_path (str, optional): 额外以Prometheus文本格式写出指标，默认读取config.yaml中的metrics.prometheus
+        routing (str): "page"逐页选择txt/ocr解析路线，"document"整篇文档统一分类
+        stitch (bool): 将跨页续表拼接为一个表格后再生成标题和摘要
+        image_store (ImageStore, optional): 按内容哈希寻址的共享图片库，默认写入本次输出目录
+
+    Returns:
+        tuple: (Markdown文件路径, 各阶段耗时字典)
+    """
+    timer = StageTimer()
+    registry.reset()
+
+    output_dir, name, content_list = timer.run(
+        "PDF解析", analyze_pdf, pdf_path, write_outputs=keep_intermediate,
+        page_range=page_range, tables_only=True, detect_tables=detect_tables, routing=routing,
+        image_store=image_store
+    )
+    tables = timer.run("表格提取", extract_tables, content_list)
+    logger.info(f"共提取 {len(tables)} 个表格")
+    fragments = len(tables)
+    if stitch:
+        # 拼接需要完整的content_list，据此判断两个表格片段之间是否隔有正文或标题
+        tables = timer.run("跨页表格拼接", stitch_tables, content_list)
+        if len(tables) < fragments:
+            logger.info(f"{fragments} 个表格片段拼接为 {len(tables)} 个表格")
+    if keep_intermediate:
+        write_json(os.path.join(output_dir, f"{name}_origin_tables.json"), tables)
+
+    output_md, pending = generate_markdown(
+        tables, output_dir, name, timer=timer, cache=cache, batch_summaries=batch_summaries, mode=mode,
+        dedup_store=dedup_store, keep_intermediate=keep_intermediate,
+        checkpoint_path=summaries_checkpoint_path(pdf_path)
+    )
+
+    metrics_config = load_metrics_config()
+    # 读取各阶段刚用过的共享路由器，不重新创建
+    router = shared_router()
+    report_path = registry.write_report(
+        os.path.join(output_dir, f"{name}_run_report.json"),
+        prices=metrics_config.get("prices"),
+        pdf=os.path.abspath(pdf_path),
+        tables=len(tables),
+        table_fragments=fragments,
+        llm_tables=len(pending),
+        router=router.status() if pending and router is not None else None,
+        cache={"hits": cache.hits, "misses": cache.misses} if cache is not None else None,
+        stages={stage: round(seconds, 3) for stage, seconds in timer.timings.items()},
+    )
+    logger.info(f"运行报告已保存至：{report_path}")
+    if prometheus_path := prometheus_path or metrics_config.get("prometheus"):
+        registry.write_prometheus(prometheus_path, document=name)
+
+    return output_md, timer.timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TableSnap：从PDF提取表格并生成标题、摘要和Markdown")
+    parser.add_argument("pdf", help="PDF文件路径")
+    parser.add_argument("--keep-intermediate", action="store_true",
+                        help="写出content_list、origin_tables、titles中间文件（summaries始终写出）")
+    parser.add_argument("--no-cache", action="store_true", help="忽略并且不写入响应缓存")
+    parser.add_argument("--pages", default=None, help="页码范围（1开始），如 3-10,15")
+    parser.add_argument("--detect-tables", action="store_true", help="预扫描可能含表格的页面，只解析这些页面")
+    parser.add_argument("--batch-summaries", action="store_true", default=None, help="将多个小表格合并为一次摘要请求")
+    parser.add_argument("--mode", choices=["two-pass", "fused"], default="two-pass",
+                        help="two-pass：标题与摘要分两轮生成；fused：单次调用同时生成")
+    parser.add_argument("--dedup", action="store_true", help="复用历史文档中相同表格的标题和摘要")
+    parser.add_argument("--prometheus", default=None, help="以Prometheus文本格式写出指标的路径（.prom）")
+    parser.add_argument("--routing", choices=["page", "document"], default="page",
+                        help="page：逐页选择txt/ocr路线；document：整篇文档统一分类")
+    parser.add_argument("--no-stitch", action="store_true", help="不拼接跨页续表")
+    parser.add_argument("--no-image-store", action="store_true",
+                        help="表格截图写入本次输出目录，而不是按内容哈希共享的图片库")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if not os.path.exists(args.pdf):
+        print(f"错误: 文件 '{args.pdf}' 不存在")
+        sys.exit(1)
+
+    cache = None if args.no_cache else ResponseCache.from_config()
+    dedup_store = FingerprintStore.from_config() if args.dedup else None
+    image_store = None if args.no_image_store else ImageStore.from_config()
+    try:
+        start_time = time.perf_counter()
+        output_md, timings = run_pipeline(
+            args.pdf, keep_intermediate=args.keep_intermediate, cache=cache,
+            page_range=args.pages, detect_tables=args.detect_tables, batch_summaries=args.batch_summaries,
+            mode=args.mode, dedup_store=dedup_store, prometheus_path=args.prometheus, routing=args.routing,
+            stitch=not args.no_stitch, image_store=image_store
+        )
+        logger.info(f"全流程耗时 {time.perf_counter() - start_time:.2f}秒，结果文件：{output_md}")
+        if cache is not None:
+            logger.info(cache.stats())
+    finally:
+        if cache is not None:
+            cache.close()
+        if dedup_store is not None:
+            dedup_store.close()
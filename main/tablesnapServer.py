@@ -0,0 +1,323 @@
+import argparse
+import http.client
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tablesnap import run_pipeline
+from responseCache import ResponseCache
+from tableDedup import FingerprintStore
+from imageStore import ImageStore
+from modelRouter import get_router, shared_router
+from pageSelect import parse_page_range
+from useMinerU import ROUTING_MODES
+
+logger = logging.getLogger("tablesnap.server")
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MODES = ("two-pass", "fused")
+
+
+class RequestError(Exception):
+    """请求参数无效，对应HTTP 400；流程执行中的其他异常一律返回500"""
+
+
+class PipelineService:
+    """
+    常驻进程中的流程执行器：MinerU模型、API客户端和响应缓存在多次请求间保持加载
+
+    同一时刻只运行一个流程（模型占用显存且指标收集器为进程共享），其余请求排队等待。
+
+    Args:
+        cache (ResponseCache, optional): LLM响应缓存
+        image_store (ImageStore, optional): 共享图片库
+    """
+
+    def __init__(self, cache=None, image_store=None):
+        self.cache = cache
+        self.image_store = image_store
+        self.started_at = time.time()
+        self.processed = 0
+        self.failed = 0
+        self.current = None
+        self.models_warm = False
+        self._lock = threading.Lock()
+
+    def warm_up(self, models=True):
+        """预先导入MinerU并加载模型、创建API客户端，使第一个请求不再承担启动开销"""
+        # 与各生成阶段共用同一个键（见shared_key），预热的就是之后实际使用的路由器和客户端
+        get_router()
+        if not models:
+            return
+        try:
+            from useMinerU import warm_up_models
+            start_time = time.perf_counter()
+            warm_up_models()
+            self.models_warm = True
+            logger.info(f"MinerU模型已加载，耗时 {time.perf_counter() - start_time:.2f}秒")
+        except Exception as e:
+            logger.warning(f"预加载MinerU模型失败，将在首次请求时加载: {str(e)}")
+
+    def status(self):
+        return {
+            "status": "ok",
+            "pid": os.getpid(),
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "processed": self.processed,
+            "failed": self.failed,
+            "busy": self.current is not None,
+            "current": self.current,
+            "models_warm": self.models_warm,
+            # 只读取共享路由器，不在状态查询时重建，避免淘汰正在运行的流程使用的路由器
+            "router": router.status() if (router := shared_router()) is not None else None,
+        }
+
+    def process(self, request):
+        """
+        运行一次全流程
+
+        Args:
+            request (dict): {"pdf": 绝对路径, "pages", "detect_tables", "batch_summaries", "mode", "routing",
+                "dedup", "keep_intermediate", "no_stitch"}，除pdf外均可省略
+
+        Returns:
+            dict: {"markdown": 结果文件路径, "timings": 各阶段耗时, "seconds": 含排队的总耗时}
+
+        Raises:
+            RequestError: 请求参数无效
+        """
+        pdf_path = request.get("pdf")
+        if not isinstance(pdf_path, str) or not os.path.isabs(pdf_path):
+            raise RequestError("pdf必须为绝对路径")
+        if not os.path.exists(pdf_path):
+            raise RequestError(f"文件不存在: {pdf_path}")
+        mode = request.get("mode") or "two-pass"
+        if mode not in MODES:
+            raise RequestError(f"不支持的模式: {mode}")
+        routing = request.get("routing") or "page"
+        if routing not in ROUTING_MODES:
+            raise RequestError(f"不支持的解析路线: {routing}")
+        pages = request.get("pages")
+        if pages is not None:
+            try:
+                # 只检查语法，页码上限在解析时按实际页数截断
+                parse_page_range(pages, 0)
+            except (AttributeError, ValueError):
+                raise RequestError(f"页码范围无效: {pages}")
+
+        start_time = time.perf_counter()
+        with self._lock:
+            self.current = pdf_path
+            # SQLite连接不能跨线程使用，指纹库按请求打开
+            dedup_store = FingerprintStore.from_config() if request.get("dedup") else None
+            try:
+                output_md, timings = run_pipeline(
+                    pdf_path, keep_intermediate=bool(request.get("keep_intermediate")), cache=self.cache,
+                    page_range=pages, detect_tables=bool(request.get("detect_tables")),
+                    batch_summaries=request.get("batch_summaries"), mode=mode, dedup_store=dedup_store,
+                    routing=routing, stitch=not request.get("no_stitch"), image_store=self.image_store
+                )
+                self.processed += 1
+            except Exception:
+                self.failed += 1
+                raise
+            finally:
+                self.current = None
+                if dedup_store is not None:
+                    dedup_store.close()
+        return {
+            "markdown": output_md,
+            "timings": {stage: round(seconds, 3) for stage, seconds in timings.items()},
+            "seconds": round(time.perf_counter() - start_time, 3),
+        }
+
+
+class PipelineRequestHandler(BaseHTTPRequestHandler):
+    """GET /health 查询状态；POST /process 提交PDF并等待结果"""
+
+    server_version = "TableSnap"
+
+    def address_string(self):
+        # Unix socket连接没有客户端地址
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, format, *args):
+        logger.info(f"{self.address_string()} {format % args}")
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, self.server.service.status())
+        else:
+            self._send_json(404, {"error": f"未知路径: {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/process":
+            self._send_json(404, {"error": f"未知路径: {self.path}"})
+            return
+        try:
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError as e:
+                raise RequestError(f"请求体不是有效的JSON: {e}")
+            if not isinstance(request, dict):
+                raise RequestError("请求体必须为JSON对象")
+            self._send_json(200, self.server.service.process(request))
+        except RequestError as e:
+            self._send_json(400, {"error": str(e)})
+        except Exception as e:
+            logger.exception(f"处理失败: {e}")
+            self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """监听Unix socket的HTTP服务，只有本机有权限的用户可以访问"""
+
+    daemon_threads = True
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """通过Unix socket发送HTTP请求"""
+
+    def __init__(self, socket_path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def create_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None):
+    """
+    创建HTTP服务，指定socket_path时监听Unix socket，否则监听host:port
+
+    Returns:
+        socketserver.BaseServer: 已绑定的服务实例，service挂在server.service上
+    """
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = UnixHTTPServer(socket_path, PipelineRequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), PipelineRequestHandler)
+    server.service = service
+    return server
+
+
+def request_server(method, path, payload=None, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None, timeout=None):
+    """
+    向常驻服务发送请求
+
+    Returns:
+        tuple: (HTTP状态码, 响应JSON)
+    """
+    if socket_path:
+        connection = UnixHTTPConnection(socket_path, timeout=timeout)
+    else:
+        connection = http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8") if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        connection.request(method, path, body=body, headers=headers)
+        response = connection.getresponse()
+        return response.status, json.loads(response.read() or b"{}")
+    finally:
+        connection.close()
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None, use_cache=True, warm_models=True,
+          use_image_store=True):
+    """启动常驻服务，直到收到SIGINT/SIGTERM"""
+    cache = ResponseCache.from_config() if use_cache else None
+    image_store = ImageStore.from_config() if use_image_store else None
+    service = PipelineService(cache=cache, image_store=image_store)
+    service.warm_up(models=warm_models)
+    server = create_server(service, host=host, port=port, socket_path=socket_path)
+    # serve_forever阻塞主线程，shutdown需从其他线程调用
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    logger.info(f"TableSnap服务已启动：{socket_path or f'http://{host}:{port}'}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
+        if cache is not None:
+            cache.close()
+        logger.info("TableSnap服务已停止")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TableSnap常驻服务：保持模型和API客户端加载，提交PDF只需处理时间")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--socket", default=None, help="监听/连接Unix socket而不是TCP端口")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="启动服务")
+    serve_parser.add_argument("--no-cache", action="store_true", help="忽略并且不写入响应缓存")
+    serve_parser.add_argument("--no-warmup", action="store_true", help="不预加载MinerU模型，首次请求时再加载")
+    serve_parser.add_argument("--no-image-store", action="store_true", help="表格截图写入各次输出目录")
+
+    submit_parser = subparsers.add_parser("submit", help="提交PDF并等待结果")
+    submit_parser.add_argument("pdf", help="PDF文件路径")
+    submit_parser.add_argument("--keep-intermediate", action="store_true")
+    submit_parser.add_argument("--pages", default=None, help="页码范围（1开始），如 3-10,15")
+    submit_parser.add_argument("--detect-tables", action="store_true")
+    submit_parser.add_argument("--batch-summaries", action="store_true", default=None)
+    submit_parser.add_argument("--mode", choices=MODES, default="two-pass")
+    submit_parser.add_argument("--routing", choices=ROUTING_MODES, default="page")
+    submit_parser.add_argument("--dedup", action="store_true")
+    submit_parser.add_argument("--no-stitch", action="store_true")
+
+    subparsers.add_parser("status", help="查询服务状态")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    address = {"host": args.host, "port": args.port, "socket_path": args.socket}
+
+    if args.command == "serve":
+        serve(use_cache=not args.no_cache, warm_models=not args.no_warmup, use_image_store=not args.no_image_store,
+              **address)
+        sys.exit(0)
+
+    try:
+        if args.command == "status":
+            status, result = request_server("GET", "/health", timeout=10, **address)
+        else:
+            status, result = request_server("POST", "/process", {
+                "pdf": os.path.abspath(args.pdf),
+                "pages": args.pages,
+                "detect_tables": args.detect_tables,
+                "batch_summaries": args.batch_summaries,
+                "mode": args.mode,
+                "routing": args.routing,
+                "dedup": args.dedup,
+                "keep_intermediate": args.keep_intermediate,
+                "no_stitch": args.no_stitch,
+            }, **address)
+    except OSError as e:
+        print(f"错误: 无法连接TableSnap服务: {e}")
+        sys.exit(1)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    sys.exit(0 if status == 200 else 1)